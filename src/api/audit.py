@@ -0,0 +1,330 @@
+"""Audit log of the scored transactions, written to rotating columnar files.
+
+Every scored transaction is kept with its features, prediction, the model version
+that scored it and the request it came in, e.g. for chargeback reconciliation.
+Records are queued in memory by the request handlers and written in batches by a
+background thread, to Parquet or Arrow IPC files rotated by size and age.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+import numpy as np
+from loguru import logger  # type: ignore
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS
+
+# pyarrow is only imported by the writing thread
+
+FILE_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+# Suffix of the file being written, renamed once complete
+IN_PROGRESS_SUFFIX = ".inprogress"
+
+
+@dataclass(frozen=True)
+class AuditRecord:
+    """Transactions scored together, and their results."""
+
+    features: NDArray[np.float32]
+    predictions: NDArray[Any]
+    # Fraud probabilities, NaN for the routes that only predict classes
+    scores: NDArray[np.float64]
+    model_version: str
+    route: str
+    request_id: str
+    received_at_ns: int
+    # From the reception of the request to its predictions
+    latency_s: float
+    # Share of the transactions kept, when the queue is full and records sampled
+    sample_rate: float = 1.0
+
+    def __len__(self) -> int:
+        return len(self.predictions)
+
+
+def records_table(records: list[AuditRecord]) -> Any:
+    """Arrow table with a row per transaction of the records."""
+    import pyarrow as pa  # type: ignore
+
+    counts = np.array([len(record) for record in records])
+
+    def repeat(values: list[Any], type_: Any) -> Any:
+        return pa.array(np.repeat(np.array(values), counts), type=type_)
+
+    features = np.concatenate([record.features for record in records])
+    return pa.table(
+        {
+            "received_at": repeat(
+                [record.received_at_ns for record in records],
+                pa.timestamp("ns", tz="UTC"),
+            ),
+            "request_id": repeat(
+                [record.request_id for record in records], pa.string()
+            ),
+            "route": repeat([record.route for record in records], pa.string()),
+            "model_version": repeat(
+                [record.model_version for record in records], pa.string()
+            ),
+            "latency_s": repeat([record.latency_s for record in records], pa.float64()),
+            "sample_rate": repeat(
+                [record.sample_rate for record in records], pa.float64()
+            ),
+            **{name: features[:, i] for i, name in enumerate(PREDICTORS)},
+            "prediction": np.concatenate([record.predictions for record in records]),
+            "score": np.concatenate([record.scores for record in records]),
+        }
+    )
+
+
+class RotatingWriter:
+    """Writes tables to a series of files, starting a new one by size and age.
+
+    A file is written under a temporary name, and only given its final name once
+    closed, so that readers never see an incomplete file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        file_format: Literal["parquet", "arrow"] = "parquet",
+        rotate_bytes: int = 128 * 2**20,
+        rotate_interval_s: float = 3600.0,
+    ) -> None:
+        self.directory = directory
+        self.file_format = file_format
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.files_written = 0
+        self._sink: Any = None
+        self._writer: Any = None
+        self._path = ""
+        self._opened_at = 0.0
+
+    def write(self, table: Any) -> None:
+        """Append a table to the current file, then close it if it is due."""
+        if self._writer is None:
+            self._open(table.schema)
+        self._writer.write_table(table)
+        if self._sink.tell() >= self.rotate_bytes:
+            self.close()
+        else:
+            self.rotate_if_due()
+
+    def rotate_if_due(self) -> None:
+        """Close the current file if it has been open `rotate_interval_s` seconds."""
+        if (
+            self._writer is not None
+            and time.monotonic() - self._opened_at >= self.rotate_interval_s
+        ):
+            self.close()
+
+    def close(self) -> None:
+        """Complete the current file, if any, and give it its final name."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._sink.close()
+        os.replace(self._path + IN_PROGRESS_SUFFIX, self._path)
+        logger.info(f"Wrote audit file {self._path}")
+        self.files_written += 1
+        self._writer = self._sink = None
+
+    def _open(self, schema: Any) -> None:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = (
+            f"audit-{datetime.now(UTC):%Y%m%dT%H%M%S%f}-{self.files_written:06d}"
+            + FILE_EXTENSIONS[self.file_format]
+        )
+        self._path = os.path.join(self.directory, name)
+        self._sink = pa.OSFile(self._path + IN_PROGRESS_SUFFIX, "wb")
+        if self.file_format == "parquet":
+            self._writer = pq.ParquetWriter(self._sink, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(self._sink, schema)
+        self._opened_at = time.monotonic()
+
+
+class AuditLog:
+    """Queues audit records in memory, written in batches by a background thread.
+
+    Records are written once `flush_rows` transactions are queued, or every
+    `flush_interval_s` seconds. At most `max_queued_rows` transactions are queued:
+    beyond that, with `overflow="wait"`, `submit` waits for the writer to catch up,
+    slowing the requests down rather than losing transactions. With
+    `overflow="sample"`, records are sampled instead once the queue is half full,
+    keeping a share of their transactions that goes down to none as the queue
+    fills up, recorded in their `sample_rate`.
+
+    Args:
+        writer: Writer of the files.
+        max_queued_rows: Transactions queued, beyond which records wait or are
+            dropped.
+        flush_rows: Transactions queued from which they are written.
+        flush_interval_s: Longest time between two writes.
+        overflow: "wait" or "sample", what to do with records once the queue is
+            full.
+    """
+
+    def __init__(
+        self,
+        writer: RotatingWriter,
+        max_queued_rows: int = 1_000_000,
+        flush_rows: int = 65_536,
+        flush_interval_s: float = 5.0,
+        overflow: Literal["wait", "sample"] = "wait",
+    ) -> None:
+        self.writer = writer
+        self.max_queued_rows = max_queued_rows
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.overflow = overflow
+        self._records: list[AuditRecord] = []
+        self._queued_rows = 0
+        # Signals both queued records to the writer, and room to waiting submitters
+        self._condition = threading.Condition()
+        self._stopping = False
+        # Submitters waiting for room, for which the writer flushes at once
+        self._waiting = 0
+        self._thread: threading.Thread | None = None
+        self._rng = np.random.default_rng()
+        self._written_rows = 0
+        self._dropped_rows = 0
+        self._failed_rows = 0
+
+    def start(self) -> None:
+        """Start the background writing thread."""
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write the records still queued, close the current file and stop.
+
+        Records submitted afterwards are dropped.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, record: AuditRecord, block: bool = False) -> bool:
+        """Queue a record.
+
+        Args:
+            record: The scored transactions.
+            block: With `overflow="wait"`, whether to wait for room in the queue
+                when it is full, rather than return False at once.
+
+        Returns:
+            False if the record was not queued because the queue is full and
+            `block` is False; True otherwise, including when it was sampled out.
+        """
+        with self._condition:
+            if self.overflow == "sample":
+                sampled = self._sample(record)
+                if sampled is None:
+                    return True
+                record = sampled
+            elif not self._has_room(len(record)):
+                if not block:
+                    return False
+                self._waiting += 1
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: self._stopping or self._has_room(len(record))
+                )
+                self._waiting -= 1
+            if self._stopping:
+                self._dropped_rows += len(record)
+                return True
+            self._records.append(record)
+            self._queued_rows += len(record)
+            if self._queued_rows >= self.flush_rows:
+                self._condition.notify_all()
+        return True
+
+    def stats(self) -> dict[str, int]:
+        """Number of transactions queued, written, dropped and failed to be written."""
+        with self._condition:
+            return {
+                "queued": self._queued_rows,
+                "written": self._written_rows,
+                "dropped": self._dropped_rows,
+                "failed": self._failed_rows,
+            }
+
+    def _has_room(self, n_rows: int) -> bool:
+        # A record larger than the whole queue still goes in once the queue is empty
+        return (
+            self._queued_rows == 0 or self._queued_rows + n_rows <= self.max_queued_rows
+        )
+
+    def _sample(self, record: AuditRecord) -> AuditRecord | None:
+        free = max(self.max_queued_rows - self._queued_rows, 0)
+        rate = min(1.0, 2 * free / self.max_queued_rows)
+        if rate == 1.0:
+            return record
+        kept = self._rng.random(len(record)) < rate
+        self._dropped_rows += len(record) - int(kept.sum())
+        if not kept.any():
+            return None
+        return replace(
+            record,
+            features=record.features[kept],
+            predictions=record.predictions[kept],
+            scores=record.scores[kept],
+            sample_rate=record.sample_rate * rate,
+        )
+
+    def _write(self, records: list[AuditRecord]) -> None:
+        n_rows = sum(len(record) for record in records)
+        try:
+            self.writer.write(records_table(records))
+        except Exception as e:  # noqa: BLE001
+            # Counted as failed, the writing thread carrying on with later records
+            logger.error(f"Failed to write {n_rows} audit rows: {e}")
+            with self._condition:
+                self._failed_rows += n_rows
+            return
+        with self._condition:
+            self._written_rows += n_rows
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (
+                        self._stopping
+                        or (self._waiting > 0 and self._queued_rows > 0)
+                        or self._queued_rows >= self.flush_rows
+                    ),
+                    timeout=self.flush_interval_s,
+                )
+                records, self._records = self._records, []
+                self._queued_rows = 0
+                stopping = self._stopping
+                # Room for the submitters waiting for it
+                self._condition.notify_all()
+            if records:
+                self._write(records)
+            else:
+                self.writer.rotate_if_due()
+            if stopping:
+                try:
+                    self.writer.close()
+                except Exception as e:  # noqa: BLE001
+                    # Logged, so that a failing file never blocks the shutdown
+                    logger.error(f"Failed to close audit file: {e}")
+                return
@@ -0,0 +1,149 @@
+"""Micro-batching of concurrent single-row predictions."""
+
+import contextlib
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, InvalidStateError
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+ScoreFunction = Callable[[NDArray[np.float32]], NDArray[Any]]
+
+
+class MicroBatcher:
+    """Collects concurrent single-row requests into batches scored in a single call.
+
+    Rows are queued by the request handlers and scored by a background thread. A
+    batch is flushed as soon as it holds `max_batch_size` rows or `max_wait_ms` has
+    elapsed since its first row. The wait is adaptive: it is only paid when the
+    previous batch, or the rows already queued, show that requests are actually
+    arriving concurrently, so a lone request is scored right away.
+    """
+
+    def __init__(
+        self,
+        score: ScoreFunction,
+        n_features: int,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self._score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.SimpleQueue[
+            tuple[NDArray[np.float32], Future[Any]] | None
+        ] = queue.SimpleQueue()
+        self._batch = np.empty((max_batch_size, n_features), dtype=np.float32)
+        self._thread: threading.Thread | None = None
+        self._last_batch_size = 0
+        # Number of flushed batches per batch size
+        self._size_counts = np.zeros(max_batch_size + 1, dtype=np.int64)
+
+    def start(self) -> None:
+        """Start the background scoring thread."""
+        self._thread = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Score the rows still queued, then stop the background thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, row: NDArray[np.float32]) -> "Future[Any]":
+        """Queue a single row for scoring.
+
+        Args:
+            row: A (n_features,) or (1, n_features) float32 row.
+
+        Returns:
+            A future resolved with the score of the row.
+        """
+        future: Future[Any] = Future()
+        self._queue.put((row, future))
+        return future
+
+    def stats(self) -> dict[str, Any]:
+        """Number of batches and rows scored so far, and the batch size histogram."""
+        sizes = np.arange(len(self._size_counts))
+        n_batches = int(self._size_counts.sum())
+        n_rows = int((sizes * self._size_counts).sum())
+        return {
+            "batches": n_batches,
+            "rows": n_rows,
+            "mean_batch_size": n_rows / n_batches if n_batches else 0.0,
+            "batch_sizes": {
+                int(size): int(count)
+                for size, count in zip(sizes, self._size_counts, strict=True)
+                if count
+            },
+        }
+
+    def _collect(
+        self, first: tuple[NDArray[np.float32], Future[Any]]
+    ) -> tuple[list[tuple[NDArray[np.float32], Future[Any]]], bool]:
+        """Gather a batch starting with `first`; also tell whether to stop after it."""
+        items = [first]
+        # Take whatever is already queued without waiting
+        while len(items) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+
+        if len(items) > 1 or self._last_batch_size > 1:
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    return items, True
+                items.append(item)
+        return items, False
+
+    def _flush(self, items: list[tuple[NDArray[np.float32], Future[Any]]]) -> None:
+        n_rows = len(items)
+        batch = self._batch[:n_rows]
+        try:
+            for i, (row, _) in enumerate(items):
+                batch[i] = row.reshape(-1)
+            scores = self._score(batch)
+            if len(scores) != n_rows:
+                raise ValueError(f"Scored {len(scores)} rows out of {n_rows}.")
+            for score, (_, future) in zip(scores, items, strict=True):
+                # A future cancelled by its request is left as is
+                with contextlib.suppress(InvalidStateError):
+                    future.set_result(score)
+        except Exception as e:  # noqa: BLE001
+            # Any failure goes to the requests of the batch, the thread serving on
+            for _, future in items:
+                if not future.done():
+                    with contextlib.suppress(InvalidStateError):
+                        future.set_exception(e)
+        self._last_batch_size = n_rows
+        self._size_counts[n_rows] += 1
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            items, stop = self._collect(first)
+            self._flush(items)
+            if stop:
+                return
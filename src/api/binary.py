@@ -0,0 +1,148 @@
+"""Binary columnar formats for batch scoring: Arrow IPC streams and raw float32.
+
+The raw format is a little-endian header followed by a row-major float32 matrix:
+
+    magic      4 bytes, b"FDM1"
+    n_rows     uint32
+    n_cols     uint32
+    names_len  uint32, size of the names block
+    names      comma-separated UTF-8 column names, NUL-padded to a multiple of 4
+    data       n_rows * n_cols float32, row-major
+"""
+
+import struct
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+RAW_MEDIA_TYPE = "application/vnd.fraud-detector.float32"
+
+MEDIA_TYPES = (ARROW_MEDIA_TYPE, RAW_MEDIA_TYPE)
+OUTPUT_COLUMNS = ["prediction", "probability"]
+
+RAW_MAGIC = b"FDM1"
+_RAW_HEADER = struct.Struct("<4sIII")
+
+
+class BinaryFormatError(ValueError):
+    """Raised when a binary payload is malformed or does not match the schema."""
+
+
+def _check_columns(names: list[str], expected: list[str] = PREDICTORS) -> None:
+    if names != expected:
+        raise BinaryFormatError(
+            f"Columns {names} do not match the expected columns {expected}."
+        )
+
+
+def encode_raw(matrix: NDArray[Any], names: list[str]) -> bytes:
+    """Serialize a 2D matrix and its column names to the raw float32 format."""
+    n_rows, n_cols = matrix.shape
+    names_block = ",".join(names).encode()
+    names_block += b"\0" * (-len(names_block) % 4)
+    header = _RAW_HEADER.pack(RAW_MAGIC, n_rows, n_cols, len(names_block))
+    data = np.ascontiguousarray(matrix, dtype="<f4")
+    return header + names_block + data.tobytes()
+
+
+def decode_raw(body: bytes, columns: list[str] = PREDICTORS) -> NDArray[np.float32]:
+    """Read a matrix from the raw float32 format, without copying it.
+
+    Args:
+        body: The payload.
+        columns: The expected columns, the training `PREDICTORS` by default.
+
+    Returns:
+        A read-only (n_rows, n_columns) float32 view on the payload.
+    """
+    if len(body) < _RAW_HEADER.size:
+        raise BinaryFormatError("Payload is shorter than the raw format header.")
+    magic, n_rows, n_cols, names_len = _RAW_HEADER.unpack_from(body)
+    if magic != RAW_MAGIC:
+        raise BinaryFormatError(f"Unknown raw format magic {magic!r}.")
+
+    names_start = _RAW_HEADER.size
+    data_start = names_start + names_len
+    try:
+        names = body[names_start:data_start].rstrip(b"\0").decode().split(",")
+    except UnicodeDecodeError as e:
+        raise BinaryFormatError(f"Column names are not valid UTF-8: {e}") from e
+    _check_columns(names, columns)
+    if n_cols != len(names):
+        raise BinaryFormatError(
+            f"Header declares {n_cols} columns, but names {len(names)}."
+        )
+
+    if len(body) - data_start != n_rows * n_cols * 4:
+        raise BinaryFormatError(
+            f"Payload holds {len(body) - data_start} data bytes, expected "
+            f"{n_rows * n_cols * 4} for a {n_rows}x{n_cols} float32 matrix."
+        )
+    matrix = np.frombuffer(body, dtype="<f4", count=n_rows * n_cols, offset=data_start)
+    return matrix.reshape(n_rows, n_cols)
+
+
+def decode_arrow(body: bytes) -> NDArray[np.float32]:
+    """Read a feature matrix from an Arrow IPC stream.
+
+    Columns are read without copying; the only copy is the one laying them out as
+    the row-major float32 matrix the model expects.
+    """
+    import pyarrow as pa  # type: ignore
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise BinaryFormatError(f"Invalid Arrow IPC stream: {e}") from e
+    _check_columns(table.column_names)
+    for field in table.schema:
+        if not (pa.types.is_floating(field.type) or pa.types.is_integer(field.type)):
+            raise BinaryFormatError(f"Column {field.name} has type {field.type}.")
+
+    matrix = np.empty((table.num_rows, table.num_columns), dtype=np.float32)
+    for i, column in enumerate(table.columns):
+        offset = 0
+        for chunk in column.chunks:
+            if chunk.null_count:
+                raise BinaryFormatError(f"Column {PREDICTORS[i]} has null values.")
+            values = chunk.to_numpy(zero_copy_only=False)
+            matrix[offset : offset + len(values), i] = values
+            offset += len(values)
+    return matrix
+
+
+def encode_arrow(columns: Mapping[str, NDArray[Any]]) -> bytes:
+    """Serialize named columns to an Arrow IPC stream."""
+    import pyarrow as pa  # type: ignore
+
+    table = pa.table(dict(columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return bytes(sink.getvalue())
+
+
+def decode_features(media_type: str, body: bytes) -> NDArray[np.float32]:
+    """Read a feature matrix from a body in one of the `MEDIA_TYPES`."""
+    if media_type == ARROW_MEDIA_TYPE:
+        return decode_arrow(body)
+    return decode_raw(body)
+
+
+def encode_predictions(
+    media_type: str, predictions: NDArray[Any], probabilities: NDArray[Any]
+) -> bytes:
+    """Serialize predictions and fraud probabilities in one of the `MEDIA_TYPES`."""
+    if media_type == ARROW_MEDIA_TYPE:
+        return encode_arrow(
+            {
+                "prediction": predictions.astype(np.int64),
+                "probability": probabilities.astype(np.float32),
+            }
+        )
+    return encode_raw(np.column_stack([predictions, probabilities]), OUTPUT_COLUMNS)
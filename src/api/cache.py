@@ -0,0 +1,86 @@
+"""Cache of predictions, and deduplication of rows, keyed on canonical features."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def row_keys(features: NDArray[np.float32]) -> NDArray[np.void]:
+    """Canonical bytes of each row of a float32 feature matrix, as a void array.
+
+    Rows scored the same get the same key: -0.0 is written as 0.0 and every NaN
+    as the same NaN.
+    """
+    # Adding 0.0 turns -0.0 into 0.0
+    canonical = np.ascontiguousarray(features, dtype=np.float32) + np.float32(0.0)
+    if np.isnan(canonical).any():
+        canonical[np.isnan(canonical)] = np.nan
+    return canonical.view(
+        np.dtype((np.void, canonical.dtype.itemsize * canonical.shape[1]))
+    ).ravel()
+
+
+def deduplicate_rows(
+    features: NDArray[np.float32],
+) -> tuple[NDArray[np.float32], NDArray[np.intp]]:
+    """Drop the duplicate rows of a feature matrix.
+
+    Returns:
+        The distinct rows, and for every input row the index of its distinct row,
+        so that `scores[inverse]` maps the scores of the distinct rows back.
+    """
+    _, index, inverse = np.unique(
+        row_keys(features), return_index=True, return_inverse=True
+    )
+    return features[index], inverse.reshape(-1)
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions, with a time to live.
+
+    Entries are keyed by the canonical bytes of the scored row. The cache is tied
+    to a model version and emptied as soon as a lookup is made for another one.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float) -> None:
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._version: str | None = None
+        # Row key -> (expiry time, prediction), least recently used first
+        self._entries: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: bytes, version: str) -> Any | None:
+        """Cached prediction of a row for a model version, or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: bytes, version: str, prediction: Any) -> None:
+        """Cache the prediction of a row by a model version."""
+        with self._lock:
+            # Scored by a version swapped out since the lookup
+            if version != self._version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_s, prediction)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
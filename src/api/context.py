@@ -0,0 +1,84 @@
+"""Identification of requests, bound to their logs."""
+
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from loguru import logger  # type: ignore
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # type: ignore
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Longest client request ID kept, longer ones are replaced by a new one
+MAX_REQUEST_ID_LENGTH = 128
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """ID of a request, and when it was received."""
+
+    request_id: str
+    # Wall-clock time, in nanoseconds since the epoch
+    received_at_ns: int
+    # `time.perf_counter` reading, to measure durations from
+    start: float
+
+
+_current: ContextVar[RequestContext | None] = ContextVar(
+    "request_context", default=None
+)
+
+
+def current_request() -> RequestContext | None:
+    """Context of the request being handled, None outside of a request."""
+    return _current.get()
+
+
+def _client_request_id(scope: Scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            request_id = value.decode("latin-1")
+            if (
+                0 < len(request_id) <= MAX_REQUEST_ID_LENGTH
+                and request_id.isascii()
+                and request_id.isprintable()
+            ):
+                return str(request_id)
+            return None
+    return None
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving every request an ID, bound to its logs.
+
+    The ID is the one of the `X-Request-ID` header when the client sends one, so
+    that logs can be matched with the client's, and a new random one otherwise. It
+    is sent back in the `X-Request-ID` header of the response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _client_request_id(scope) or uuid.uuid4().hex
+        token = _current.set(
+            RequestContext(request_id, time.time_ns(), time.perf_counter())
+        )
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            with logger.contextualize(request_id=request_id):
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            _current.reset(token)
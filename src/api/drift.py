@@ -0,0 +1,134 @@
+"""Online drift monitoring of the served traffic, in constant memory."""
+
+import math
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.api.settings import APISettings
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.drift import DriftReference, ks, psi
+
+
+class DriftMonitor:
+    """Histograms of the served traffic over sliding windows, compared with training.
+
+    Time is cut into slots of `slot_s` seconds, each holding the histograms of the
+    rows received during it, in a ring of as many slots as the longest window
+    spans. A batch is binned in a single vectorized pass and added to the current
+    slot, and slots are cleared as they are reused, so that memory does not depend
+    on the traffic. The histograms of a window, the sum of its most recent slots,
+    are only computed when reported.
+
+    Args:
+        reference: Histograms of the training data, saved by `train_model`.
+        windows_s: Duration of every window, in seconds.
+        slot_s: Duration of a slot, the resolution of the windows.
+        psi_threshold: PSI from which a histogram is reported as drifted.
+        clock: Current time, in seconds.
+    """
+
+    def __init__(
+        self,
+        reference: DriftReference,
+        windows_s: Sequence[float] = (300.0, 3600.0),
+        slot_s: float = 60.0,
+        psi_threshold: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.reference = reference
+        self.slot_s = slot_s
+        self.psi_threshold = psi_threshold
+        self._clock = clock
+        # Number of slots of every window, by label
+        self.windows = {
+            f"{window_s:g}s": max(1, math.ceil(window_s / slot_s))
+            for window_s in windows_s
+        }
+        n_slots = max(self.windows.values())
+        self._slots = np.zeros((n_slots, *reference.counts.shape), dtype=np.int64)
+        # Slot number, since the clock's origin, held by every ring entry
+        self._slot_ids = np.full(n_slots, -1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def update(
+        self, features: NDArray[np.float32], scores: NDArray[Any] | None = None
+    ) -> None:
+        """Add a batch to the current slot.
+
+        Args:
+            features: The float32 rows of the batch.
+            scores: Their fraud probabilities, when the route computes them.
+        """
+        counts = self.reference.bin_counts(features, scores)
+        slot = int(self._clock() // self.slot_s)
+        index = slot % len(self._slots)
+        with self._lock:
+            if self._slot_ids[index] != slot:
+                self._slots[index] = 0
+                self._slot_ids[index] = slot
+            self._slots[index] += counts
+
+    def window_counts(self, n_slots: int) -> NDArray[np.int64]:
+        """Histograms of the rows of the last `n_slots` slots, the current one included."""
+        current = int(self._clock() // self.slot_s)
+        with self._lock:
+            in_window = (self._slot_ids > current - n_slots) & (
+                self._slot_ids <= current
+            )
+            return self._slots[in_window].sum(axis=0)
+
+    def report(self) -> dict[str, Any]:
+        """Number of rows, and PSI and KS statistic of every histogram, per window.
+
+        Histograms without rows in a window, e.g. that of the fraud probability
+        when only `/predict_one` is called, are left out of it.
+        """
+        names = self.reference.names
+        windows = {}
+        for label, n_slots in self.windows.items():
+            counts = self.window_counts(n_slots)
+            rows = counts.sum(axis=1)
+            psi_values = psi(self.reference.counts, counts)
+            ks_values = ks(self.reference.counts, counts)
+            histograms = {
+                name: {"psi": float(psi_values[i]), "ks": float(ks_values[i])}
+                for i, name in enumerate(names)
+                if rows[i]
+            }
+            windows[label] = {
+                "rows": int(rows[0]),
+                "scored_rows": int(rows[-1]),
+                "histograms": histograms,
+                "drifted": [
+                    name
+                    for name, stats in histograms.items()
+                    if stats["psi"] >= self.psi_threshold
+                ],
+            }
+        return windows
+
+
+def load_drift_monitor(settings: APISettings, reference_path: str) -> DriftMonitor:
+    """Load a reference saved by `train_model`, and monitor drift against it.
+
+    Args:
+        settings: The API settings, with the windows of the monitor.
+        reference_path: The reference, saved with the version of the model served.
+    """
+    reference = DriftReference.load(reference_path)
+    if reference.feature_names != PREDICTORS:
+        raise RuntimeError(
+            f"Drift reference features {reference.feature_names} do not match the "
+            f"API features {PREDICTORS}."
+        )
+    return DriftMonitor(
+        reference,
+        windows_s=settings.drift_windows_s,
+        slot_s=settings.drift_slot_s,
+        psi_threshold=settings.drift_psi_threshold,
+    )
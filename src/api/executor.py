@@ -0,0 +1,156 @@
+"""Dedicated executor running model inference off the event loop."""
+
+import asyncio
+import contextlib
+import math
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    InvalidStateError,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Literal
+
+import numpy as np
+
+# Engine of the current process, when inference runs in worker processes
+_worker_engine: Any = None
+
+
+def _init_worker(engine: Any) -> None:
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _call_engine(engine: Any, method: str, *args: Any) -> tuple[Any, int]:
+    """Result of an engine method, and the number of rows its model scored."""
+    counted = getattr(engine, f"{method}_counted", None)
+    if counted is not None:
+        return counted(*args)  # type: ignore[no-any-return]
+    return getattr(engine, method)(*args), len(args[0])
+
+
+def _call_worker_engine(method: str, *args: Any) -> tuple[Any, int]:
+    return _call_engine(_worker_engine, method, *args)
+
+
+class InferenceExecutor:
+    """Sized pool of threads or processes dedicated to CPU-bound inference.
+
+    Keeping inference off Starlette's shared threadpool and off the event loop
+    means request parsing and cheap routes such as `/health` never queue behind a
+    large batch, and the amount of inference running at once is bounded by
+    `max_workers`.
+
+    Batches of at least `parallel_min_rows` rows are split into row shards scored
+    in parallel by the workers, smaller ones are scored in a single call.
+
+    The rows scored are counted here, in the serving process, whatever the kind of
+    pool, with those the engine's model actually scored: all of them, unless the
+    engine has a `<method>_counted` variant returning that number with the result,
+    as `CascadeModel` does for the rows its pre-filter does not clear.
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        kind: Literal["thread", "process"],
+        max_workers: int,
+        parallel_min_rows: int = 0,
+    ) -> None:
+        self.kind = kind
+        self.max_workers = max_workers
+        self.parallel_min_rows = parallel_min_rows
+        self._engine = engine
+        self._rows = 0
+        self._model_rows = 0
+        self._lock = threading.Lock()
+        self._pool: Executor
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="inference"
+            )
+        else:
+            # The engine is pickled once per worker process, not once per call
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(engine,)
+            )
+
+    def submit(self, method: str, *args: Any) -> "Future[Any]":
+        """Call `method` of the engine in the pool.
+
+        Args:
+            method: Name of the engine method, e.g. "predict" or "predict_proba".
+            args: Arguments of the method.
+
+        Returns:
+            A future resolved with the result of the call.
+        """
+        if self.kind == "thread":
+            call = self._pool.submit(_call_engine, self._engine, method, *args)
+        else:
+            call = self._pool.submit(_call_worker_engine, method, *args)
+        future: Future[Any] = Future()
+
+        def count(call: "Future[tuple[Any, int]]") -> None:
+            if call.cancelled():
+                future.cancel()
+                return
+            if (error := call.exception()) is not None:
+                with contextlib.suppress(InvalidStateError):
+                    future.set_exception(error)
+                return
+            result, model_rows = call.result()
+            with self._lock:
+                self._rows += len(args[0])
+                self._model_rows += model_rows
+            # Unless cancelled by its caller
+            with contextlib.suppress(InvalidStateError):
+                future.set_result(result)
+
+        call.add_done_callback(count)
+        future.add_done_callback(lambda future: future.cancelled() and call.cancel())
+        return future
+
+    def stats(self) -> dict[str, int]:
+        """Number of rows scored, and of rows scored by the engine's model."""
+        with self._lock:
+            return {"rows": self._rows, "model_rows": self._model_rows}
+
+    def n_shards(self, n_rows: int) -> int:
+        """Number of row shards a batch of `n_rows` is scored in.
+
+        A shard has at least about `parallel_min_rows` rows, so that the dispatch
+        overhead stays small next to the scoring, and there is at most one shard
+        per worker. Sharding is disabled when `parallel_min_rows` is 0.
+        """
+        if self.parallel_min_rows <= 0 or n_rows < self.parallel_min_rows:
+            return 1
+        return min(self.max_workers, math.ceil(n_rows / self.parallel_min_rows))
+
+    async def run(self, method: str, rows: Any) -> Any:
+        """Await `method` of the engine on rows, called in the pool.
+
+        Large batches are scored as row shards, in parallel, whose results are
+        concatenated back in order.
+        """
+        n_shards = self.n_shards(len(rows))
+        if n_shards == 1:
+            return await asyncio.wrap_future(self.submit(method, rows))
+        results = await asyncio.gather(
+            *(
+                asyncio.wrap_future(self.submit(method, shard))
+                for shard in np.array_split(rows, n_shards)
+            )
+        )
+        return np.concatenate(results)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Release the workers once the running calls are done.
+
+        Args:
+            wait: Whether to block until then.
+        """
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,74 @@
+"""Conversion of API inputs to the float32 feature matrix scored by the model."""
+
+from collections.abc import Sequence
+from operator import attrgetter
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.types import PredictionInput, PredictionInputColumns
+
+N_FEATURES = len(PREDICTORS)
+
+# Reads the features of an input as a tuple, in `PREDICTORS` order
+_get_features = attrgetter(*PREDICTORS)
+
+
+def check_feature_order(model: Any) -> None:
+    """Check that the model was fitted on `PREDICTORS`, in that order.
+
+    Done once at startup, so that rows can then be scored as plain arrays without
+    carrying column names around.
+
+    Args:
+        model: The loaded model, a fitted sklearn estimator with its
+            `feature_names_in_`, or a `CompiledForest` with its `feature_names`.
+    """
+    fitted_names = getattr(model, "feature_names_in_", None)
+    if fitted_names is None:
+        fitted_names = getattr(model, "feature_names", None)
+    if fitted_names is not None and list(fitted_names) != PREDICTORS:
+        raise RuntimeError(
+            f"Model features {list(fitted_names)} do not match the API features "
+            f"{PREDICTORS}."
+        )
+
+
+def encode_row(
+    input_data: PredictionInput, out: NDArray[np.float32] | None = None
+) -> NDArray[np.float32]:
+    """Write the features of a single input into a contiguous float32 row.
+
+    Args:
+        input_data: The validated input.
+        out: Preallocated row of `N_FEATURES` float32 to fill, e.g. a row of a batch
+            matrix. A new (1, `N_FEATURES`) matrix is allocated when omitted.
+
+    Returns:
+        The filled row.
+    """
+    if out is None:
+        out = np.empty((1, N_FEATURES), dtype=np.float32)
+    out[...] = _get_features(input_data)
+    return out
+
+
+def encode_rows(inputs: Sequence[PredictionInput]) -> NDArray[np.float32]:
+    """Stack the features of several inputs into a (n_inputs, `N_FEATURES`) matrix."""
+    return np.array(
+        [_get_features(input_data) for input_data in inputs], dtype=np.float32
+    ).reshape(len(inputs), N_FEATURES)
+
+
+def encode_columns(columns: PredictionInputColumns) -> NDArray[np.float32]:
+    """Stack the feature arrays of a columnar batch into a (n_inputs, `N_FEATURES`) matrix.
+
+    Arrays are converted whole, without going through one object per input.
+    """
+    features = np.array(_get_features(columns), dtype=np.float32).reshape(
+        N_FEATURES, len(columns)
+    )
+    # Row-major, as the model scores rows
+    return np.ascontiguousarray(features.T)
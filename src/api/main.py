@@ -1,26 +1,66 @@
 """FastAPI app creation, logger configuration and main API routes."""
 
+import asyncio
 import sys
-import mlflow  # type: ignore
-import mlflow.pyfunc  # type: ignore
-from fastapi import FastAPI, HTTPException  # type: ignore
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import numpy as np
+import orjson  # type: ignore
+from fastapi import (  # type: ignore
+    BackgroundTasks,
+    FastAPI,
+    HTTPException,
+    Request,
+    Response,
+)
 from loguru import logger  # type: ignore
+from numpy.typing import NDArray
 
-from src.api.types import HealthRouteOutput
-import joblib  # type: ignore
+from src.api.audit import AuditLog, AuditRecord, RotatingWriter
+from src.api.batching import MicroBatcher
+from src.api.binary import (
+    MEDIA_TYPES,
+    BinaryFormatError,
+    decode_features,
+    encode_predictions,
+)
+from src.api import metrics
+from src.api.cache import PredictionCache, deduplicate_rows, row_keys
+from src.api.context import RequestContextMiddleware, current_request
+from src.api.drift import DriftMonitor
+from src.api.model_manager import ModelManager, ServedModel, load_shadow_models
+from src.api.shadow import ShadowScorer
+from src.api.streaming import (
+    NDJSON_MEDIA_TYPE,
+    DuplexStreamingResponse,
+    score_ndjson,
+)
+from src.api.features import N_FEATURES, encode_columns, encode_row, encode_rows
+from src.api.settings import APISettings
+from src.fraud_detector.cascade import CascadeModel
+from src.api.types import (
+    BatchingStatsOutput,
+    DriftStatsOutput,
+    HealthRouteOutput,
+    ModelStatusOutput,
+    ReadyRouteOutput,
+    ShadowStatsOutput,
+)
 from src.fraud_detector.types import (
     PredictionInput,
     PredictionOutput,
     PredictionInputBatch,
+    PredictionInputColumns,
     PredictionOutputBatch,
 )
-import pandas as pd  # type: ignore
-from mlflow.pyfunc import PyFuncModel  # Added import
 
 # Remove pre-configured logging handler
 logger.remove(0)
 # Create a new logging handler same as the pre-configured one but with the extra
-# attribute `request_id`
+# attribute `request_id`, bound by `RequestContextMiddleware`
 logger.add(
     sys.stdout,
     level="INFO",
@@ -31,31 +71,109 @@ logger.add(
         "ID: {extra[request_id]} - <level>{message}</level>"
     ),
 )
+# Default for the logs emitted outside of a request
+logger.configure(extra={"request_id": "-"})
+
+
+settings = APISettings()
+
+model_manager = ModelManager(settings)
+
+
+def score_batch(features: Any) -> Any:
+    """Score a micro-batch with the version served when it is flushed."""
+    metrics.BATCH_SIZE.observe(len(features), "/predict_one")
+    with model_manager.lease() as served:
+        return served.executor.submit("predict", features).result()
+
+
+# Concurrent `/predict_one` calls are scored together when batching is enabled
+batcher: MicroBatcher | None = None
+if settings.batching_enabled:
+    batcher = MicroBatcher(
+        score_batch,
+        n_features=N_FEATURES,
+        max_batch_size=settings.batching_max_batch_size,
+        max_wait_ms=settings.batching_max_wait_ms,
+    )
+
+# Predictions of recently seen `/predict_one` rows
+cache: PredictionCache | None = None
+if settings.cache_enabled:
+    cache = PredictionCache(settings.cache_max_size, settings.cache_ttl_s)
 
+# Shadow models scoring the batch routes' batches, once the served model is loaded
+shadow_scorer: ShadowScorer | None = None
 
-def get_latest_model() -> PyFuncModel:
-    """Get the latest model from MLflow Model Registry."""
-    client = mlflow.tracking.MlflowClient()
-    mlflow.set_tracking_uri("http://localhost:5000")  # type: ignore
-    latest_version = client.get_latest_versions("fraud-detector")[0]
-    return mlflow.pyfunc.load_model(f"models:/fraud-detector/{latest_version.version}")  # type: ignore
+# Every scored transaction, written in the background
+audit_log: AuditLog | None = None
+if settings.audit_enabled:
+    audit_log = AuditLog(
+        RotatingWriter(
+            settings.audit_dir,
+            file_format=settings.audit_format,
+            rotate_bytes=settings.audit_rotate_bytes,
+            rotate_interval_s=settings.audit_rotate_interval_s,
+        ),
+        max_queued_rows=settings.audit_max_queued_rows,
+        flush_rows=settings.audit_flush_rows,
+        flush_interval_s=settings.audit_flush_interval_s,
+        overflow=settings.audit_overflow,
+    )
 
 
-def load_model() -> PyFuncModel:
-    return joblib.load("models/model.pkl")
+def load_model() -> None:
+    """Load and warm up the model, then keep looking for new versions.
+
+    The shadow models are loaded last, and failing to load them does not keep the
+    served model from serving.
+    """
+    global shadow_scorer
+    if not model_manager.refresh():
+        logger.error(f"Failed to load model: {model_manager.last_error}")
+    if settings.model_poll_interval_s > 0:
+        model_manager.start_polling()
+    if settings.shadow_models:
+        try:
+            scorer = ShadowScorer(
+                load_shadow_models(settings), settings.shadow_max_queued_batches
+            )
+        except Exception as e:  # noqa: BLE001
+            # Shadows are optional: whatever fails, the served model keeps serving
+            logger.error(f"Failed to load shadow models: {e}")
+            return
+        scorer.start()
+        shadow_scorer = scorer
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start serving at once, while the model loads in the background.
+
+    `/health` answers as soon as the process is up, and `/ready` once a warm-up
+    prediction has succeeded.
+    """
+    if batcher is not None:
+        batcher.start()
+    if audit_log is not None:
+        audit_log.start()
+    loading = asyncio.create_task(asyncio.to_thread(load_model))
+    yield
+    await loading
+    if batcher is not None:
+        batcher.stop()
+    if shadow_scorer is not None:
+        shadow_scorer.stop()
+    if audit_log is not None:
+        audit_log.stop()
+    model_manager.stop()
 
-# Load the trained model at startup from MLflow registry
-try:
-    model = load_model()
-    # logger.info(
-    #     f"Loaded model version: {mlflow.get_run(model.metadata.run_id).data.tags.get('version', 'unknown')}"  # type: ignore
-    # )  # type: ignore
-except Exception as e:
-    logger.error(f"Failed to load model: {e}")
-    raise RuntimeError("Could not load model from MLflow registry")
+
+app = FastAPI(lifespan=lifespan)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+# Outermost, so that the request ID is bound for the whole request
+app.add_middleware(RequestContextMiddleware)
 
 
 @app.get("/health")  # type: ignore
@@ -68,23 +186,174 @@ def health_check_route() -> HealthRouteOutput:
     return HealthRouteOutput(status="ok")
 
 
+def require_model() -> None:
+    """Answer with a 503 status code, to be retried, until the model is loaded."""
+    if not model_manager.ready.is_set():
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded yet, retry later.",
+            headers={"Retry-After": "1"},
+        )
+
+
+@app.get("/ready", response_model=ReadyRouteOutput)  # type: ignore
+def ready_route(response: Response) -> ReadyRouteOutput:
+    """Readiness route, to only route traffic to the API once the model is warm.
+
+    Returns:
+        a dict with a "ready" key, with a 503 status code until the model is loaded
+    """
+    if not model_manager.ready.is_set():
+        response.status_code = 503
+        return ReadyRouteOutput(ready=False)
+    return ReadyRouteOutput(ready=True)
+
+
+@app.get("/model_status", response_model=ModelStatusOutput)  # type: ignore
+def model_status_route() -> ModelStatusOutput:
+    """Status of the served model.
+
+    Returns:
+        The active model version, when it was loaded, and the outcome of the last
+        look for a new version.
+    """
+    require_model()
+    served = model_manager.current
+    return ModelStatusOutput(
+        version=served.version,
+        source=settings.model_source,
+        loaded_at=served.loaded_at,
+        load_timings=served.timings,
+        last_check=model_manager.last_check,
+        last_error=model_manager.last_error,
+    )
+
+
+@app.get("/metrics")  # type: ignore
+def metrics_route() -> Response:
+    """Request and model metrics, for Prometheus to scrape.
+
+    Returns:
+        The metrics in the Prometheus text format.
+    """
+    metrics.MODEL_INFO.clear()
+    if cache is not None:
+        metrics.CACHE_SIZE.set(len(cache))
+    if model_manager.ready.is_set():
+        served = model_manager.current
+        metrics.MODEL_INFO.set(1, served.version)
+        if isinstance(served.engine, CascadeModel):
+            stats = served.executor.stats()
+            metrics.CASCADE_ROWS.set(stats["rows"], "one")
+            metrics.CASCADE_ROWS.set(stats["model_rows"], "two")
+    if shadow_scorer is not None:
+        shadow_stats = shadow_scorer.stats()
+        metrics.SHADOW_DROPPED.set(shadow_stats["dropped_batches"])
+        for name, stats in shadow_stats["shadows"].items():
+            metrics.SHADOW_AGREEMENT.set(stats["agreement_rate"], name)
+    if audit_log is not None:
+        for state, rows in audit_log.stats().items():
+            metrics.AUDIT_ROWS.set(rows, state)
+    drift_monitor = current_drift_monitor()
+    if drift_monitor is not None:
+        metrics.DRIFT_PSI.clear()
+        for window, stats in drift_monitor.report().items():
+            for name, drift in stats["histograms"].items():
+                metrics.DRIFT_PSI.set(drift["psi"], window, name)
+    return Response(content=metrics.render(), media_type=metrics.PROMETHEUS_MEDIA_TYPE)
+
+
+@app.get("/batching_stats", response_model=BatchingStatsOutput)  # type: ignore
+def batching_stats_route() -> BatchingStatsOutput:
+    """Statistics of the micro-batching of `/predict_one` calls.
+
+    Returns:
+        The number of batches and rows scored, and the batch size histogram.
+    """
+    if batcher is None:
+        return BatchingStatsOutput(enabled=False)
+    return BatchingStatsOutput(enabled=True, **batcher.stats())
+
+
+@app.get("/shadow_stats", response_model=ShadowStatsOutput)  # type: ignore
+def shadow_stats_route() -> ShadowStatsOutput:
+    """Comparison of the shadow models with the served model, on the batch routes.
+
+    Returns:
+        For every shadow model, the rows scored, the share of them with the same
+        prediction as the served model, and the differences of fraud probability;
+        and the number of batches dropped as the shadows were falling behind.
+    """
+    if shadow_scorer is None:
+        return ShadowStatsOutput(enabled=False)
+    return ShadowStatsOutput(enabled=True, **shadow_scorer.stats())
+
+
+@app.get("/drift_stats", response_model=DriftStatsOutput)  # type: ignore
+def drift_stats_route() -> DriftStatsOutput:
+    """Drift of the served traffic from the training data, over sliding windows.
+
+    Returns:
+        For every window, the number of rows received, and the PSI and KS statistic
+        of every feature and of the fraud probability against the training data,
+        with the list of those whose PSI is above the threshold, since the version
+        served was swapped in.
+    """
+    drift_monitor = current_drift_monitor()
+    if drift_monitor is None:
+        return DriftStatsOutput(enabled=False)
+    return DriftStatsOutput(enabled=True, windows=drift_monitor.report())
+
+
+async def score_row(row: Any) -> Any:
+    """Score a single float32 row, micro-batched with others when enabled."""
+    if batcher is not None:
+        return await asyncio.wrap_future(batcher.submit(row))
+    metrics.BATCH_SIZE.observe(1, "/predict_one")
+    with model_manager.lease() as served:
+        return (await served.executor.run("predict", row))[0]
+
+
 @app.post("/predict_one", response_model=PredictionOutput)  # type: ignore
-def predict(input_data: PredictionInput) -> PredictionOutput:
+async def predict(
+    input_data: PredictionInput, background_tasks: BackgroundTasks
+) -> PredictionOutput:
     """Predicts fraud based on single input data.
 
     Args:
         input_data: A JSON object with the same columns as the raw data.
+        background_tasks: Tasks run once the response is sent.
 
     Returns:
         A JSON object with the prediction result.
     """
+    require_model()
+    metrics.lap("validate")
     try:
-        # Convert input data to a DataFrame or the format expected by the model
-        input_dict = input_data.model_dump()
-        input_df = pd.DataFrame([input_dict])
-
-        # Make prediction
-        prediction = model.predict(input_df)[0]
+        # Make prediction on a single float32 row, without going through pandas
+        row = encode_row(input_data)
+        metrics.lap("encode")
+        # Version for the cache and the audit log: a swap may still happen before
+        # the row is scored
+        version = model_manager.current.version
+        if cache is None:
+            prediction = await score_row(row)
+        else:
+            key = row_keys(row)[0].tobytes()
+            prediction = cache.get(key, version)
+            metrics.CACHE_LOOKUPS.inc("miss" if prediction is None else "hit")
+            if prediction is None:
+                prediction = await score_row(row)
+                cache.put(key, version, prediction)
+        metrics.lap("predict")
+        if audit_log is not None:
+            background_tasks.add_task(
+                write_audit,
+                audit_record(
+                    row, np.array([prediction]), None, version, "/predict_one"
+                ),
+            )
+        drift_after_response(background_tasks, model_manager.current, row)
 
         return PredictionOutput(prediction=int(prediction))
     except Exception as e:
@@ -92,25 +361,251 @@ def predict(input_data: PredictionInput) -> PredictionOutput:
         raise HTTPException(status_code=500, detail="Prediction failed.")
 
 
+def predictions_response(predictions: NDArray[Any]) -> Response:
+    """`PredictionOutputBatch` JSON response, serialized straight from the array.
+
+    Skips building a list of Python ints and validating it against the response
+    model, as FastAPI would for a returned `PredictionOutputBatch`.
+    """
+    content = orjson.dumps(
+        {"predictions": np.ascontiguousarray(predictions, dtype=np.int64)},
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+    return Response(content=content, media_type="application/json")
+
+
+def audit_record(
+    features: NDArray[np.float32],
+    predictions: NDArray[Any],
+    scores: NDArray[np.float64] | None,
+    model_version: str,
+    route: str,
+) -> AuditRecord:
+    """Audit record of transactions scored by the current request, timed now."""
+    context = current_request()
+    return AuditRecord(
+        features=features,
+        predictions=predictions,
+        scores=np.full(len(predictions), np.nan) if scores is None else scores,
+        model_version=model_version,
+        route=route,
+        request_id=context.request_id if context else "-",
+        received_at_ns=context.received_at_ns if context else time.time_ns(),
+        latency_s=time.perf_counter() - context.start if context else 0.0,
+    )
+
+
+async def write_audit(record: AuditRecord) -> None:
+    """Queue an audit record, waiting for room off the event loop when it is full."""
+    if audit_log is not None and not audit_log.submit(record):
+        await asyncio.to_thread(audit_log.submit, record, True)
+
+
+def current_drift_monitor() -> DriftMonitor | None:
+    """Drift monitor of the version served, None if disabled or not loaded."""
+    if not model_manager.ready.is_set():
+        return None
+    return model_manager.current.drift_monitor
+
+
+def drift_after_response(
+    background_tasks: BackgroundTasks,
+    served: ServedModel,
+    features: NDArray[np.float32],
+    scores: NDArray[np.float64] | None = None,
+) -> None:
+    """Add scored rows to the drift histograms of their version, once sent."""
+    drift_monitor = served.drift_monitor
+    if drift_monitor is not None:
+        if isinstance(served.engine, CascadeModel):
+            # The reference holds the forest's fraud probabilities, unknown for the
+            # rows the pre-filter clears: the probability histogram is left out
+            scores = None
+        # Sync, so that binning large batches runs off the event loop
+        background_tasks.add_task(drift_monitor.update, features, scores)
+
+
+def shadow_after_response(
+    background_tasks: BackgroundTasks,
+    features: NDArray[np.float32],
+    predictions: NDArray[Any],
+    scores: NDArray[np.float64],
+) -> None:
+    """Queue a batch for the shadow models, once its response is sent."""
+    scorer = shadow_scorer
+    if scorer is not None:
+        # Async, so that queueing does not go through the thread pool
+        async def submit() -> None:
+            scorer.submit(features, predictions, scores)
+
+        background_tasks.add_task(submit)
+
+
+async def predict_features(
+    features: NDArray[np.float32], route: str, background_tasks: BackgroundTasks
+) -> Response:
+    """Predict fraud on a float32 feature matrix, scoring each distinct row once."""
+    distinct, inverse = deduplicate_rows(features)
+    metrics.lap("encode")
+    metrics.DUPLICATE_ROWS.inc(route, amount=len(features) - len(distinct))
+    metrics.BATCH_SIZE.observe(len(distinct), route)
+    with model_manager.lease() as served:
+        # As `predict`, but keeping the probabilities for the shadow models
+        probabilities = await served.executor.run("predict_proba", distinct)
+        predictions = served.engine.classes_.take(probabilities.argmax(axis=1))
+    metrics.lap("predict")
+    if audit_log is not None or served.drift_monitor is not None:
+        scores = probabilities[inverse, -1]
+        if audit_log is not None:
+            background_tasks.add_task(
+                write_audit,
+                audit_record(
+                    features, predictions[inverse], scores, served.version, route
+                ),
+            )
+        drift_after_response(background_tasks, served, features, scores)
+    shadow_after_response(background_tasks, distinct, predictions, probabilities[:, -1])
+    return predictions_response(predictions[inverse])
+
+
 @app.post("/predict_batch", response_model=PredictionOutputBatch)  # type: ignore
-def predict_batch(input_data: PredictionInputBatch) -> PredictionOutputBatch:
+async def predict_batch(
+    input_data: PredictionInputBatch, background_tasks: BackgroundTasks
+) -> Response:
     """Predicts fraud based on batch input data.
 
     Args:
         input_data: A list of input data objects.
+        background_tasks: Tasks run once the response is sent.
 
     Returns:
         A JSON object with the list of prediction results.
     """
+    require_model()
+    metrics.lap("validate")
+    try:
+        # Make predictions on a float32 matrix, without going through pandas
+        return await predict_features(
+            encode_rows(input_data.inputs), "/predict_batch", background_tasks
+        )
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Batch prediction failed.")
+
+
+@app.post("/predict_batch_columns", response_model=PredictionOutputBatch)  # type: ignore
+async def predict_batch_columns(
+    input_data: PredictionInputColumns, background_tasks: BackgroundTasks
+) -> Response:
+    """Predicts fraud based on a batch given as one array per feature.
+
+    Args:
+        input_data: The array of values of every feature, all of the same length,
+            e.g. `{"Time": [0, 10], "V1": [-1.3, 1.2], ..., "Amount": [9.9, 2.7]}`.
+        background_tasks: Tasks run once the response is sent.
+
+    Returns:
+        A JSON object with the list of prediction results, in input order.
+    """
+    require_model()
+    metrics.lap("validate")
     try:
-        # Convert input data to a DataFrame or the format expected by the model
-        input_dicts = [item.model_dump() for item in input_data.inputs]
-        input_df = pd.DataFrame(input_dicts)
+        return await predict_features(
+            encode_columns(input_data), "/predict_batch_columns", background_tasks
+        )
+    except Exception as e:
+        logger.error(f"Columnar batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Batch prediction failed.")
 
-        # Make predictions
-        predictions = model.predict(input_df)
 
-        return PredictionOutputBatch(predictions=[int(pred) for pred in predictions])
+@app.post("/predict_batch_binary")  # type: ignore
+async def predict_batch_binary(
+    request: Request, background_tasks: BackgroundTasks
+) -> Response:
+    """Predicts fraud based on a binary columnar batch.
+
+    Args:
+        request: A request whose body is either an Arrow IPC stream or a raw
+            float32 matrix (see `api/binary.py`), with the training columns.
+        background_tasks: Tasks run once the response is sent.
+
+    Returns:
+        The predictions and fraud probabilities, in the format of the request.
+    """
+    require_model()
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=415, detail=f"Content type must be one of {MEDIA_TYPES}."
+        )
+    body = await request.body()
+    metrics.lap("validate")
+    try:
+        features = decode_features(media_type, body)
+    except BinaryFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.lap("encode")
+
+    try:
+        metrics.BATCH_SIZE.observe(len(features), "/predict_batch_binary")
+        with model_manager.lease() as served:
+            probabilities = await served.executor.run("predict_proba", features)
+            predictions = served.engine.classes_.take(probabilities.argmax(axis=1))
+        metrics.lap("predict")
+        content = encode_predictions(media_type, predictions, probabilities[:, -1])
     except Exception as e:
-        logger.error(f"Batch prediction error: {e}")
+        logger.error(f"Binary batch prediction error: {e}")
         raise HTTPException(status_code=500, detail="Batch prediction failed.")
+    if audit_log is not None:
+        background_tasks.add_task(
+            write_audit,
+            audit_record(
+                features,
+                predictions,
+                probabilities[:, -1],
+                served.version,
+                "/predict_batch_binary",
+            ),
+        )
+    drift_after_response(background_tasks, served, features, probabilities[:, -1])
+    shadow_after_response(background_tasks, features, predictions, probabilities[:, -1])
+    return Response(content=content, media_type=media_type)
+
+
+@app.post("/predict_stream")  # type: ignore
+async def predict_stream(request: Request) -> DuplexStreamingResponse:
+    """Predicts fraud on a stream of newline-delimited JSON transactions.
+
+    Args:
+        request: A request whose body holds one JSON transaction per line, with the
+            same columns as the raw data.
+
+    Returns:
+        A chunked NDJSON response with one prediction per line, in input order.
+    """
+    require_model()
+
+    async def predict_chunk(features: Any) -> Any:
+        metrics.BATCH_SIZE.observe(len(features), "/predict_stream")
+        with model_manager.lease() as served:
+            predictions = await served.executor.run("predict", features)
+        if audit_log is not None:
+            # Inline, as the response is still being sent
+            await write_audit(
+                audit_record(
+                    features, predictions, None, served.version, "/predict_stream"
+                )
+            )
+        if served.drift_monitor is not None:
+            await asyncio.to_thread(served.drift_monitor.update, features)
+        return predictions
+
+    return DuplexStreamingResponse(
+        score_ndjson(
+            request.stream(),
+            predict_chunk,
+            settings.stream_chunk_size,
+            settings.stream_max_line_bytes,
+        ),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
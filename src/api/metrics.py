@@ -0,0 +1,309 @@
+"""Request and model metrics, exposed in the Prometheus text format.
+
+Metrics are kept in plain Python counters, cheap enough to be updated on every
+request, and only formatted when `/metrics` is scraped. They are per process: with
+several uvicorn workers, each one is scraped as its own target.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Sequence
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send  # type: ignore
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_SIZE_BUCKETS = tuple(float(2**i) for i in range(15))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(),
+        ]
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """Sample lines of the metric, in the Prometheus text format."""
+
+
+class Counter(_Metric):
+    """Monotonic count, per label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """Add `amount` to the count of `label_values`."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {value}"
+            for key, value in values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, per label values."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, *label_values: str) -> None:
+        """Set the value of `label_values`."""
+        with self._lock:
+            self._values[label_values] = value
+
+    def clear(self) -> None:
+        """Forget all label values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, per label values."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        # Per label values: non-cumulative bucket counts (the last one for +Inf),
+        # and sum of the observed values
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record a value for `label_values`."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+                self._sums[label_values] = 0.0
+            counts[index] += 1
+            self._sums[label_values] += value
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+        lines = []
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for bound, count in zip(
+                [*map(str, self.buckets), "+Inf"], bucket_counts, strict=True
+            ):
+                cumulative += count
+                labels = _format_labels((*self.labels, "le"), (*key, bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter(
+    "api_requests_total", "Number of requests handled.", ["route", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Duration of requests, until the response is fully sent.",
+    ["route"],
+)
+STAGE_DURATION = Histogram(
+    "api_stage_duration_seconds",
+    "Duration of the stages of requests: validate (body reading and parsing), "
+    "encode, predict and serialize.",
+    ["route", "stage"],
+)
+IN_FLIGHT = Gauge(
+    "api_requests_in_flight", "Number of requests being handled.", ["route"]
+)
+BATCH_SIZE = Histogram(
+    "api_batch_size",
+    "Number of rows scored per model call.",
+    ["route"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+DUPLICATE_ROWS = Counter(
+    "api_duplicate_rows_total",
+    "Number of batch rows not scored, as duplicates of another row of the batch.",
+    ["route"],
+)
+CACHE_LOOKUPS = Counter(
+    "api_cache_lookups_total", "Number of prediction cache lookups.", ["result"]
+)
+CACHE_SIZE = Gauge("api_cache_size", "Number of cached predictions.")
+CASCADE_ROWS = Gauge(
+    "api_cascade_rows",
+    "Rows scored by the served cascade, in all (stage one) and by the model (stage "
+    "two).",
+    ["stage"],
+)
+MODEL_INFO = Gauge("api_model_info", "Version of the served model.", ["version"])
+SHADOW_AGREEMENT = Gauge(
+    "api_shadow_agreement_rate",
+    "Share of the rows scored by a shadow model with the served model's prediction.",
+    ["shadow"],
+)
+SHADOW_DROPPED = Gauge(
+    "api_shadow_dropped_batches",
+    "Number of batches not scored by the shadow models, as their queue was full.",
+)
+AUDIT_ROWS = Gauge(
+    "api_audit_rows",
+    "Transactions of the audit log queued, written, dropped when the queue was full, "
+    "and failed to be written.",
+    ["state"],
+)
+DRIFT_PSI = Gauge(
+    "api_drift_psi",
+    "Population stability index of the served traffic against the training data, "
+    "per sliding window and feature, or fraud probability.",
+    ["window", "histogram"],
+)
+
+METRICS: list[_Metric] = [
+    REQUESTS,
+    REQUEST_DURATION,
+    STAGE_DURATION,
+    IN_FLIGHT,
+    BATCH_SIZE,
+    DUPLICATE_ROWS,
+    CACHE_LOOKUPS,
+    CACHE_SIZE,
+    CASCADE_ROWS,
+    MODEL_INFO,
+    SHADOW_AGREEMENT,
+    SHADOW_DROPPED,
+    AUDIT_ROWS,
+    DRIFT_PSI,
+]
+
+
+def render() -> str:
+    """All the metrics, in the Prometheus text format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+# Route of the current request, and time its previous stage ended
+_stage_clock: ContextVar[list[Any] | None] = ContextVar("stage_clock", default=None)
+
+
+def lap(stage: str) -> None:
+    """Record the duration of `stage` of the current request, ending now.
+
+    A stage starts when the previous one ended, or when the request was received
+    for the first one.
+    """
+    clock = _stage_clock.get()
+    if clock is None:
+        return
+    now = time.perf_counter()
+    STAGE_DURATION.observe(now - clock[1], clock[0], stage)
+    clock[1] = now
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the duration, status and stages of requests.
+
+    The time between the last `lap` of the route and the start of the response is
+    recorded as the "serialize" stage.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: set[str] | None = None
+
+    def _route(self, scope: Scope) -> str:
+        # Label by route path, bounding the number of label values
+        if self._routes is None:
+            self._routes = {route.path for route in scope["app"].routes}
+        return scope["path"] if scope["path"] in self._routes else "other"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        start = time.perf_counter()
+        clock: list[Any] = [route, start]
+        token = _stage_clock.set(clock)
+        status = "500"
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                # Only for routes that recorded stages
+                if clock[1] != start:
+                    now = time.perf_counter()
+                    STAGE_DURATION.observe(now - clock[1], route, "serialize")
+                    clock[1] = now
+            await send(message)
+
+        IN_FLIGHT.inc(route)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            IN_FLIGHT.inc(route, amount=-1.0)
+            REQUESTS.inc(route, status)
+            REQUEST_DURATION.observe(time.perf_counter() - start, route)
+            _stage_clock.reset(token)
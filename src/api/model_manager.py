@@ -0,0 +1,332 @@
+"""Loading, warm-up and zero-downtime hot-swap of the served model."""
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+import numpy as np
+from loguru import logger  # type: ignore
+
+from src.api.drift import DriftMonitor, load_drift_monitor
+from src.api.executor import InferenceExecutor
+from src.api.features import N_FEATURES, check_feature_order
+from src.api.settings import APISettings
+from src.fraud_detector.cascade import CascadeModel, Prefilter
+from src.fraud_detector.inference import CompiledForest, build_engine
+
+# mlflow and joblib take most of the import time of the API: they are only
+# imported when a model is actually loaded
+
+
+def load_model(model_path: str) -> Any:
+    """Load the model saved by `train_model`, or the forest saved by `compile_model`.
+
+    A compiled forest directory is memory-mapped, so that the API worker processes
+    all share the same copy of it.
+    """
+    if os.path.isdir(model_path):
+        return CompiledForest.load(model_path)
+    import joblib  # type: ignore
+
+    return joblib.load(model_path)
+
+
+def get_latest_version(settings: APISettings) -> str:
+    """Latest version of the model in the MLflow Model Registry stage."""
+    import mlflow  # type: ignore
+
+    mlflow.set_tracking_uri(settings.mlflow_tracking_uri)  # type: ignore
+    client = mlflow.tracking.MlflowClient()
+    latest_version = client.get_latest_versions(
+        settings.registry_model_name, stages=[settings.registry_stage]
+    )[0]
+    return str(latest_version.version)
+
+
+def load_registry_model(settings: APISettings, version: str) -> Any:
+    """Load a version of the model from the MLflow Model Registry."""
+    import mlflow.sklearn  # type: ignore
+
+    mlflow.set_tracking_uri(settings.mlflow_tracking_uri)  # type: ignore
+    return mlflow.sklearn.load_model(
+        f"models:/{settings.registry_model_name}/{version}"
+    )
+
+
+def model_artifact_path(settings: APISettings, version: str, path: str) -> str:
+    """Local path of a file saved by `train_model` with a version of the model.
+
+    With the registry as model source, the file is downloaded from the MLflow run
+    of the version, where it is logged under the name of `path`; otherwise it is
+    `path` itself, saved next to `settings.model_path`.
+    """
+    if settings.model_source != "registry":
+        return path
+    import mlflow  # type: ignore
+
+    mlflow.set_tracking_uri(settings.mlflow_tracking_uri)  # type: ignore
+    model_version = mlflow.tracking.MlflowClient().get_model_version(
+        settings.registry_model_name, version
+    )
+    return str(
+        mlflow.artifacts.download_artifacts(
+            run_id=model_version.run_id, artifact_path=os.path.basename(path)
+        )
+    )
+
+
+def load_shadow_model(settings: APISettings, source: str) -> Any:
+    """Load a shadow model from a local path or an MLflow model URI."""
+    if not source.startswith(("models:/", "runs:/")) and "://" not in source:
+        return load_model(source)
+    import mlflow.sklearn  # type: ignore
+
+    mlflow.set_tracking_uri(settings.mlflow_tracking_uri)  # type: ignore
+    return mlflow.sklearn.load_model(source)
+
+
+def prepare_engine(model: Any, inference_engine: str) -> Any:
+    """Check a loaded model and build the engine scoring plain float32 arrays."""
+    check_feature_order(model)
+    # Inference parallelism is the executor's, whatever n_jobs the model was
+    # trained with
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    engine = build_engine(model, inference_engine)
+    # Feature order is checked above: from now on rows are scored as plain
+    # arrays, so drop the fitted names sklearn would otherwise re-check
+    if hasattr(model, "feature_names_in_"):
+        del model.feature_names_in_
+    return engine
+
+
+def load_shadow_models(settings: APISettings) -> dict[str, Any]:
+    """Engine of every shadow model of the settings, by source."""
+    shadows = {}
+    for source in settings.shadow_models:
+        model = load_shadow_model(settings, source)
+        shadows[source] = prepare_engine(model, settings.inference_engine)
+        logger.info(f"Loaded shadow model {source}")
+    return shadows
+
+
+@dataclass
+class ServedModel:
+    """A loaded, warmed-up model version, with the executor running its inference."""
+
+    version: str
+    engine: Any
+    executor: InferenceExecutor
+    # Duration in seconds of each phase of the loading
+    timings: dict[str, float] = field(default_factory=dict)
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+    in_flight: int = 0
+    retired: bool = False
+    # Compares the served traffic with the training data of this version
+    drift_monitor: DriftMonitor | None = None
+
+
+class ModelManager:
+    """Serves a model version and swaps in new ones without downtime.
+
+    New versions are looked for in the MLflow Model Registry or, by default, as
+    changes of `settings.model_path`. They are loaded and warmed up off the request
+    path, then swapped in atomically. Requests lease the version that is current
+    when they start, so in-flight requests finish on the old version, whose
+    executor is only released once its last request is done.
+    """
+
+    def __init__(self, settings: APISettings) -> None:
+        self.settings = settings
+        self.last_check: datetime | None = None
+        self.last_error: str | None = None
+        self._current: ServedModel | None = None
+        # Set once a version has been loaded and a warm-up prediction succeeded
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: threading.Thread | None = None
+
+    @property
+    def current(self) -> ServedModel:
+        """The version currently served."""
+        if self._current is None:
+            raise RuntimeError("No model loaded.")
+        return self._current
+
+    def available_version(self) -> str:
+        """Version of the model available at the source, without loading it.
+
+        In the registry, the version of the model also versions the files saved
+        with it, the pre-filter and the drift reference. Otherwise those files are
+        versioned with the model file, so that they are swapped in when changed.
+        """
+        if self.settings.model_source == "registry":
+            return get_latest_version(self.settings)
+        paths = [self.settings.model_path]
+        if self.settings.cascade_enabled:
+            paths.append(self.settings.prefilter_path)
+        # Optional, the model being served without it
+        if self.settings.drift_enabled and os.path.exists(
+            self.settings.drift_reference_path
+        ):
+            paths.append(self.settings.drift_reference_path)
+        stats = [os.stat(path) for path in paths]
+        return "-".join(f"{stat.st_mtime_ns}-{stat.st_size}" for stat in stats)
+
+    def prepare(self, version: str) -> ServedModel:
+        """Load a version and warm it up, without serving it yet."""
+        timings: dict[str, float] = {}
+        start = time.perf_counter()
+
+        def lap(phase: str) -> None:
+            nonlocal start
+            now = time.perf_counter()
+            timings[phase] = now - start
+            start = now
+
+        if self.settings.model_source == "registry":
+            model = load_registry_model(self.settings, version)
+        else:
+            model = load_model(self.settings.model_path)
+        lap("load")
+        engine = prepare_engine(model, self.settings.inference_engine)
+        if self.settings.cascade_enabled:
+            # Calibrated on this version of the model, and loaded with it
+            prefilter = Prefilter.load(
+                model_artifact_path(
+                    self.settings, version, self.settings.prefilter_path
+                )
+            )
+            engine = CascadeModel(prefilter, engine)
+        lap("build_engine")
+
+        executor = InferenceExecutor(
+            engine,
+            kind=self.settings.inference_executor,
+            max_workers=self.settings.inference_workers,
+            parallel_min_rows=self.settings.parallel_min_rows,
+        )
+        # First call pays for lazy initializations, e.g. worker processes
+        try:
+            executor.submit(
+                "predict", np.zeros((1, N_FEATURES), dtype=np.float32)
+            ).result()
+        except BaseException:
+            # Never served, so nothing else releases its workers
+            executor.shutdown(wait=False)
+            raise
+        lap("warm_up")
+
+        drift_monitor = None
+        if self.settings.drift_enabled:
+            try:
+                drift_monitor = load_drift_monitor(
+                    self.settings,
+                    model_artifact_path(
+                        self.settings, version, self.settings.drift_reference_path
+                    ),
+                )
+            except Exception as e:  # noqa: BLE001
+                # Drift monitoring is optional: the version is served without it
+                logger.error(f"Failed to load drift reference: {e}")
+
+        if (
+            executor.n_shards(self.settings.parallel_min_rows * executor.max_workers)
+            > 1
+        ):
+            logger.info(
+                f"Scoring batches of {self.settings.parallel_min_rows} rows or more "
+                f"in up to {executor.max_workers} parallel row shards"
+            )
+        else:
+            logger.info("Scoring every batch in a single call")
+        logger.info(
+            f"Loaded model version {version} in {sum(timings.values()):.3f}s ("
+            + ", ".join(
+                f"{phase}: {seconds:.3f}s" for phase, seconds in timings.items()
+            )
+            + ")"
+        )
+        return ServedModel(
+            version=version,
+            engine=engine,
+            executor=executor,
+            timings=timings,
+            drift_monitor=drift_monitor,
+        )
+
+    def swap(self, served: ServedModel) -> None:
+        """Atomically serve a prepared version, retiring the previous one."""
+        with self._lock:
+            previous, self._current = self._current, served
+            if previous is not None:
+                previous.retired = True
+                if previous.in_flight == 0:
+                    previous.executor.shutdown(wait=False)
+        self.ready.set()
+        logger.info(f"Serving model version {served.version}")
+
+    def load(self) -> None:
+        """Load and serve the version available at the source."""
+        self.swap(self.prepare(self.available_version()))
+
+    def refresh(self) -> bool:
+        """Swap in the version available at the source, if it is a new one.
+
+        Returns:
+            Whether a new version was swapped in.
+        """
+        self.last_check = datetime.now(UTC)
+        try:
+            version = self.available_version()
+            if self._current is not None and version == self._current.version:
+                return False
+            self.swap(self.prepare(version))
+            self.last_error = None
+            return True
+        except Exception as e:  # noqa: BLE001
+            # Whatever failed, keep serving the current version
+            self.last_error = str(e)
+            logger.error(f"Model refresh failed: {e}")
+            return False
+
+    @contextmanager
+    def lease(self) -> Iterator[ServedModel]:
+        """Pin the current version for the duration of a request."""
+        with self._lock:
+            served = self.current
+            served.in_flight += 1
+        try:
+            yield served
+        finally:
+            with self._lock:
+                served.in_flight -= 1
+                if served.retired and served.in_flight == 0:
+                    served.executor.shutdown(wait=False)
+
+    def start_polling(self) -> None:
+        """Look for new versions every `settings.model_poll_interval_s` seconds."""
+        self._stop.clear()
+        self._poller = threading.Thread(
+            target=self._poll, name="model-poller", daemon=True
+        )
+        self._poller.start()
+
+    def stop(self) -> None:
+        """Stop polling and release the executor of the served version."""
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+        if self._current is not None:
+            self._current.executor.shutdown()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.settings.model_poll_interval_s):
+            self.refresh()
@@ -0,0 +1,95 @@
+"""Runtime settings of the API, read from `API_*` environment variables."""
+
+import os
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict  # type: ignore
+
+
+class APISettings(BaseSettings):
+    """Settings of the API."""
+
+    model_config = SettingsConfigDict(env_prefix="API_")
+
+    # Where the served model comes from: the local file written by `train_model`,
+    # or the MLflow Model Registry. In "path" mode, `model_path` may also be the
+    # directory written by `compile_model`, memory-mapped and shared by all the
+    # processes serving it
+    model_source: Literal["path", "registry"] = "path"
+    model_path: str = "models/model.pkl"
+    registry_model_name: str = "fraud-detector"
+    registry_stage: str = "Production"
+    mlflow_tracking_uri: str = "http://localhost:5000"
+    # Seconds between two looks for a new model version, 0 to never hot-swap
+    model_poll_interval_s: float = 0.0
+
+    # "compiled" scores with `CompiledForest`, "sklearn" with `model.predict`
+    inference_engine: Literal["sklearn", "compiled"] = "compiled"
+
+    # Micro-batching of concurrent `/predict_one` calls
+    batching_enabled: bool = False
+    batching_max_batch_size: int = 64
+    batching_max_wait_ms: float = 2.0
+
+    # Executor dedicated to model inference, separate from request handling
+    inference_executor: Literal["thread", "process"] = "thread"
+    inference_workers: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    # Batches of at least this many rows are split into row shards scored in
+    # parallel by the inference workers, 0 to always score batches in one call
+    parallel_min_rows: int = 2048
+
+    # Number of transactions scored per call by `/predict_stream`
+    stream_chunk_size: int = 1024
+    # Longest line read as a transaction, longer ones are answered with an error
+    stream_max_line_bytes: int = 65_536
+
+    # Record request metrics, exposed by `/metrics`
+    metrics_enabled: bool = True
+
+    # Cache `/predict_one` predictions, for retried and duplicated transactions
+    cache_enabled: bool = False
+    cache_max_size: int = 100_000
+    cache_ttl_s: float = 60.0
+
+    # Score with the pre-filter trained by `train_model` first, and only send the
+    # rows it is not confident are legitimate to the model
+    cascade_enabled: bool = False
+    prefilter_path: str = "models/prefilter.json"
+
+    # Candidate models, e.g. promoted to the Staging stage, scored off the request
+    # path on the batches of the batch routes to compare them with the served
+    # model: local paths as for `model_path`, or MLflow model URIs such as
+    # "models:/fraud-detector/Staging". As JSON, e.g. '["models/candidate.pkl"]'
+    shadow_models: list[str] = []
+    # Batches waiting to be scored by the shadow models, beyond which new batches
+    # are dropped
+    shadow_max_queued_batches: int = 64
+
+    # Audit log of every scored transaction, with its features, prediction and
+    # model version, written in the background to `audit_dir` as Parquet or Arrow
+    # files, a new one every `audit_rotate_bytes` bytes or `audit_rotate_interval_s`
+    # seconds
+    audit_enabled: bool = False
+    audit_dir: str = "audit"
+    audit_format: Literal["parquet", "arrow"] = "parquet"
+    audit_rotate_bytes: int = 128 * 2**20
+    audit_rotate_interval_s: float = 3600.0
+    # Transactions queued before being written, written once `audit_flush_rows`
+    # are queued or every `audit_flush_interval_s` seconds
+    audit_max_queued_rows: int = 1_000_000
+    audit_flush_rows: int = 65_536
+    audit_flush_interval_s: float = 5.0
+    # When the queue is full, "wait" holds requests until there is room, "sample"
+    # keeps a share of the transactions, lower the fuller the queue
+    audit_overflow: Literal["wait", "sample"] = "wait"
+
+    # Compare the served traffic with the histograms of the training data saved by
+    # `train_model`, over sliding windows of `drift_windows_s` seconds, tracked in
+    # slots of `drift_slot_s` seconds. As JSON, e.g. '[300, 3600]'
+    drift_enabled: bool = False
+    drift_reference_path: str = "models/drift_reference.json"
+    drift_windows_s: list[float] = [300.0, 3600.0]
+    drift_slot_s: float = 60.0
+    # PSI from which a feature, or the fraud probability, is reported as drifted
+    drift_psi_threshold: float = 0.2
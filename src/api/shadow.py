@@ -0,0 +1,171 @@
+"""Scoring of the served traffic by shadow models, off the request path."""
+
+import queue
+import threading
+from typing import Any
+
+import numpy as np
+from loguru import logger  # type: ignore
+from numpy.typing import NDArray
+
+# Distinct rows of a batch, with the predictions and fraud probabilities of the
+# served model
+ShadowJob = tuple[NDArray[np.float32], NDArray[Any], NDArray[np.float64]]
+
+
+class ShadowStats:
+    """Running comparison of a shadow model with the served model."""
+
+    def __init__(self) -> None:
+        self.batches = 0
+        self.rows = 0
+        self.agreements = 0
+        # Rows the shadow flags as fraud and the served model does not, and the
+        # other way around
+        self.newly_flagged = 0
+        self.newly_cleared = 0
+        # Of the shadow fraud probability minus the served one
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.errors = 0
+
+    def update(
+        self,
+        predictions: NDArray[Any],
+        scores: NDArray[np.float64],
+        shadow_predictions: NDArray[Any],
+        shadow_scores: NDArray[np.float64],
+        positive: Any,
+    ) -> None:
+        """Add a batch scored by both models."""
+        deltas = shadow_scores - scores
+        flagged = shadow_predictions == positive
+        served_flagged = predictions == positive
+        self.batches += 1
+        self.rows += len(deltas)
+        self.agreements += int((shadow_predictions == predictions).sum())
+        self.newly_flagged += int((flagged & ~served_flagged).sum())
+        self.newly_cleared += int((~flagged & served_flagged).sum())
+        self.delta_sum += float(deltas.sum())
+        self.abs_delta_sum += float(np.abs(deltas).sum())
+        if len(deltas):
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(deltas).max()))
+
+    def summary(self) -> dict[str, Any]:
+        """Agreement rate and score deltas so far."""
+        rows = max(self.rows, 1)
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "agreement_rate": self.agreements / rows if self.rows else 0.0,
+            "newly_flagged": self.newly_flagged,
+            "newly_cleared": self.newly_cleared,
+            "mean_score_delta": self.delta_sum / rows,
+            "mean_abs_score_delta": self.abs_delta_sum / rows,
+            "max_abs_score_delta": self.max_abs_delta,
+        }
+
+
+class ShadowScorer:
+    """Scores the batches of the served model with shadow models, in the background.
+
+    Batches are queued once their response is sent, and scored by every shadow in
+    a background thread. The queue is bounded: when the shadows fall behind, new
+    batches are dropped rather than queued, so that shadows never hold memory or
+    CPU time the served traffic needs.
+
+    Args:
+        shadows: Engine of every shadow model, by name, with `predict_proba` and
+            `classes_`.
+        max_queued_batches: Batches waiting to be scored, beyond which new batches
+            are dropped.
+    """
+
+    def __init__(self, shadows: dict[str, Any], max_queued_batches: int = 64) -> None:
+        self.shadows = shadows
+        self._queue: queue.Queue[ShadowJob | None] = queue.Queue(
+            maxsize=max_queued_batches
+        )
+        self._stats = {name: ShadowStats() for name in shadows}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.dropped_batches = 0
+
+    def start(self) -> None:
+        """Start the background scoring thread."""
+        self._thread = threading.Thread(
+            target=self._run, name="shadow-scorer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Score the batches still queued, then stop the background thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(
+        self,
+        features: NDArray[np.float32],
+        predictions: NDArray[Any],
+        scores: NDArray[np.float64],
+    ) -> bool:
+        """Queue a batch scored by the served model, without ever waiting.
+
+        Args:
+            features: The float32 rows of the batch.
+            predictions: Predictions of the served model.
+            scores: Fraud probabilities of the served model.
+
+        Returns:
+            Whether the batch was queued, rather than dropped.
+        """
+        try:
+            self._queue.put_nowait((features, predictions, scores))
+        except queue.Full:
+            with self._lock:
+                self.dropped_batches += 1
+            return False
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        """Batches dropped and waiting, and the comparison of every shadow."""
+        with self._lock:
+            return {
+                "dropped_batches": self.dropped_batches,
+                "queued_batches": self._queue.qsize(),
+                "shadows": {
+                    name: stats.summary() for name, stats in self._stats.items()
+                },
+            }
+
+    def _score(self, job: ShadowJob) -> None:
+        features, predictions, scores = job
+        for name, engine in self.shadows.items():
+            try:
+                probabilities = engine.predict_proba(features)
+                shadow_predictions = engine.classes_.take(probabilities.argmax(axis=1))
+            except Exception as e:  # noqa: BLE001
+                # A failing shadow is counted, and never stops the scoring thread
+                logger.error(f"Shadow model {name} failed: {e}")
+                with self._lock:
+                    self._stats[name].errors += 1
+                continue
+            with self._lock:
+                self._stats[name].update(
+                    predictions,
+                    scores,
+                    shadow_predictions,
+                    probabilities[:, -1],
+                    positive=engine.classes_[-1],
+                )
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._score(job)
@@ -0,0 +1,127 @@
+"""Streaming scoring of newline-delimited JSON transactions."""
+
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from fastapi.responses import StreamingResponse  # type: ignore
+from loguru import logger  # type: ignore
+from numpy.typing import NDArray
+from pydantic import ValidationError
+from starlette.types import Receive, Scope, Send  # type: ignore
+
+from src.api.features import encode_rows
+from src.fraud_detector.types import PredictionInput
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response sent while the request body is still being read.
+
+    `StreamingResponse` watches for client disconnects by reading `receive`, which
+    would swallow the request body chunks the body iterator itself consumes.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes | None]:
+    """Split a stream of byte chunks into its non-empty lines, as they arrive.
+
+    Lines longer than `max_line_bytes` are not held: they are discarded up to their
+    end, and yielded as a single None instead, so that memory stays bounded.
+    """
+    # Parts of the current line, joined once it ends
+    parts: list[bytes] = []
+    size = 0
+    # Whether the rest of an overlong line is being discarded
+    discarding = False
+    async for chunk in chunks:
+        start = 0
+        while start <= len(chunk):
+            end = chunk.find(b"\n", start)
+            part = chunk[start:] if end < 0 else chunk[start:end]
+            if not discarding:
+                size += len(part)
+                if size > max_line_bytes:
+                    parts, size, discarding = [], 0, True
+                    yield None
+                else:
+                    parts.append(part)
+            if end < 0:
+                break
+            if not discarding:
+                line = b"".join(parts)
+                if line.strip():
+                    yield line
+            parts, size, discarding = [], 0, False
+            start = end + 1
+    line = b"".join(parts)
+    if line.strip():
+        yield line
+
+
+async def score_ndjson(
+    chunks: AsyncIterable[bytes],
+    predict: Callable[[NDArray[Any]], Awaitable[NDArray[Any]]],
+    chunk_size: int,
+    max_line_bytes: int = 65_536,
+) -> AsyncIterator[bytes]:
+    """Score NDJSON transactions in fixed-size chunks, streaming results in order.
+
+    At most `chunk_size` transactions of at most `max_line_bytes` each are held at
+    once, so memory does not depend on the size of the upload, and the results of
+    a chunk are sent as soon as it is scored, before the rest of the upload is
+    read.
+
+    Args:
+        chunks: The raw request body, as byte chunks.
+        predict: Coroutine scoring a float32 feature matrix.
+        chunk_size: Number of transactions scored per call.
+        max_line_bytes: Longest line read as a transaction.
+
+    Yields:
+        One NDJSON line per input line: `{"prediction": ...}`, or `{"error": ...}`
+        when the line is not a valid transaction or its chunk failed to be scored.
+    """
+    inputs: list[PredictionInput | str] = []
+    async for line in iter_lines(chunks, max_line_bytes):
+        if line is None:
+            inputs.append(f"Line longer than {max_line_bytes} bytes.")
+        else:
+            try:
+                inputs.append(PredictionInput.model_validate_json(line))
+            except ValidationError as e:
+                inputs.append(str(e.errors(include_url=False, include_input=False)))
+        if len(inputs) == chunk_size:
+            yield await _score_chunk(inputs, predict)
+            inputs = []
+    if inputs:
+        yield await _score_chunk(inputs, predict)
+
+
+async def _score_chunk(
+    inputs: list[PredictionInput | str],
+    predict: Callable[[NDArray[Any]], Awaitable[NDArray[Any]]],
+) -> bytes:
+    valid = [item for item in inputs if isinstance(item, PredictionInput)]
+    try:
+        predictions = iter(await predict(encode_rows(valid))) if valid else iter(())
+    except Exception as e:  # noqa: BLE001
+        # The response has already started: the chunk fails, not the whole stream
+        logger.error(f"Failed to score a chunk of {len(valid)} transactions: {e}")
+        error = f"Scoring failed: {e}"
+        inputs = [item if isinstance(item, str) else error for item in inputs]
+    lines = []
+    for item in inputs:
+        if isinstance(item, PredictionInput):
+            lines.append(b'{"prediction":%d}\n' % int(next(predictions)))
+        else:
+            lines.append(json.dumps({"error": item}).encode() + b"\n")
+    return b"".join(lines)
@@ -2,6 +2,8 @@
 
 """Types for the API."""
 
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -9,3 +11,76 @@ class HealthRouteOutput(BaseModel):
     """Model for the health route output."""
 
     status: str
+
+
+class ReadyRouteOutput(BaseModel):
+    """Model for the readiness route output."""
+
+    ready: bool
+
+
+class BatchingStatsOutput(BaseModel):
+    """Model for the batching stats route output."""
+
+    enabled: bool
+    batches: int = 0
+    rows: int = 0
+    mean_batch_size: float = 0.0
+    batch_sizes: dict[int, int] = {}
+
+
+class ShadowModelStats(BaseModel):
+    """Comparison of a shadow model with the served model."""
+
+    batches: int
+    rows: int
+    errors: int
+    agreement_rate: float
+    newly_flagged: int
+    newly_cleared: int
+    mean_score_delta: float
+    mean_abs_score_delta: float
+    max_abs_score_delta: float
+
+
+class ShadowStatsOutput(BaseModel):
+    """Model for the shadow stats route output."""
+
+    enabled: bool
+    dropped_batches: int = 0
+    queued_batches: int = 0
+    shadows: dict[str, ShadowModelStats] = {}
+
+
+class HistogramDrift(BaseModel):
+    """Drift of a feature, or of the fraud probability, over a window."""
+
+    psi: float
+    ks: float
+
+
+class DriftWindowStats(BaseModel):
+    """Drift of the served traffic over a sliding window."""
+
+    rows: int
+    scored_rows: int
+    histograms: dict[str, HistogramDrift] = {}
+    drifted: list[str] = []
+
+
+class DriftStatsOutput(BaseModel):
+    """Model for the drift stats route output."""
+
+    enabled: bool
+    windows: dict[str, DriftWindowStats] = {}
+
+
+class ModelStatusOutput(BaseModel):
+    """Model for the model status route output."""
+
+    version: str
+    source: str
+    loaded_at: datetime
+    load_timings: dict[str, float] = {}
+    last_check: datetime | None = None
+    last_error: str | None = None
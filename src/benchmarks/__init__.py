@@ -0,0 +1 @@
+"""Benchmarks of the serving and training hot paths."""
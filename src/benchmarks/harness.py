@@ -0,0 +1,106 @@
+"""Timing of benchmarks, and comparison of their results against a baseline."""
+
+import json
+import math
+import platform
+import statistics
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+# Result of a benchmark: its "value", the lower the better, in "unit", and details
+Result = dict[str, Any]
+
+
+def measure(
+    func: Callable[[], Any], repeat: int = 20, min_sample_time: float = 0.05
+) -> Result:
+    """Time a function, as the median duration of a call over `repeat` samples.
+
+    A first, untimed call warms up caches. Each sample then calls `func` enough
+    times to last about `min_sample_time` seconds, so that the duration of fast
+    functions is not lost in the timer resolution.
+
+    Returns:
+        The median duration of a call in seconds as "value", with the 95th
+        percentile, the minimum, and the number of samples and calls per sample.
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    number = max(1, math.ceil(min_sample_time / first)) if first > 0 else 1
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        durations.append((time.perf_counter() - start) / number)
+    durations.sort()
+    return {
+        "value": statistics.median(durations),
+        "unit": "s",
+        "p95": durations[min(len(durations) - 1, math.ceil(0.95 * len(durations)) - 1)],
+        "min": durations[0],
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def size(n_bytes: int) -> Result:
+    """Result of a size, in bytes."""
+    return {"value": n_bytes, "unit": "bytes"}
+
+
+def compare(
+    results: dict[str, Result], baseline: dict[str, Result], threshold: float
+) -> list[str]:
+    """Benchmarks whose value grew by more than `threshold` over the baseline.
+
+    Args:
+        results: Results of the current run, by benchmark name.
+        baseline: Results of a previous run; benchmarks missing from either run are
+            not compared.
+        threshold: Allowed relative growth, e.g. 0.2 for 20%.
+
+    Returns:
+        One message per regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline or baseline[name]["unit"] != result["unit"]:
+            continue
+        reference = baseline[name]["value"]
+        if reference > 0 and result["value"] > reference * (1 + threshold):
+            regressions.append(
+                f"{name}: {result['value']:.6g} {result['unit']} vs "
+                f"{reference:.6g} {result['unit']} "
+                f"(+{result['value'] / reference - 1:.0%})"
+            )
+    return regressions
+
+
+def write_results(path: str, results: dict[str, Result]) -> None:
+    """Write results as JSON, with the environment they were measured in."""
+    import numpy as np
+    import sklearn  # type: ignore
+
+    report = {
+        "meta": {
+            "date": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+
+def read_results(path: str) -> dict[str, Result]:
+    """Results written by `write_results`."""
+    with open(path) as f:
+        return json.load(f)["results"]
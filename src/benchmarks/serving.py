@@ -0,0 +1,115 @@
+"""Benchmarks of the serving hot path, stage by stage and end to end."""
+
+import os
+import pickle
+from collections.abc import Sequence
+from functools import partial
+from typing import Any
+
+import numpy as np
+
+from src.api.features import encode_row, encode_rows
+from src.api.model_manager import prepare_engine
+from src.benchmarks.harness import Result, measure, size
+from src.benchmarks.synthetic import make_transactions
+from src.fraud_detector.inference import CompiledForest
+from src.fraud_detector.types import PredictionInput, PredictionInputBatch
+
+BATCH_SIZES = (1, 10, 100, 1000, 10_000)
+ENGINES = ("sklearn", "compiled")
+
+
+def _payloads(n_rows: int) -> list[dict[str, Any]]:
+    data_df = make_transactions(n_rows, seed=0).drop(columns="Class")
+    data_df["Time"] = data_df["Time"].astype(int)
+    return data_df.to_dict(orient="records")
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def run_serving_benchmarks(
+    model_path: str,
+    work_dir: str,
+    batch_sizes: Sequence[int] = BATCH_SIZES,
+    repeat: int = 20,
+) -> dict[str, Result]:
+    """Benchmark request validation, encoding, model calls and whole requests.
+
+    Args:
+        model_path: Path to the pickled model to serve.
+        work_dir: Directory for the compiled model.
+        batch_sizes: Numbers of rows to score per model call.
+        repeat: Number of samples per benchmark.
+
+    Returns:
+        The results, by benchmark name.
+    """
+    results: dict[str, Result] = {}
+    payloads = _payloads(max(batch_sizes))
+    batch_payload = {"inputs": payloads[:100]}
+
+    # Request parsing and conversion to the feature matrix
+    inputs = [PredictionInput.model_validate(payload) for payload in payloads]
+    results["serving/validate/1"] = measure(
+        lambda: PredictionInput.model_validate(payloads[0]), repeat
+    )
+    results["serving/validate/100"] = measure(
+        lambda: PredictionInputBatch.model_validate(batch_payload), repeat
+    )
+    results["serving/encode/1"] = measure(lambda: encode_row(inputs[0]), repeat)
+    results["serving/encode/100"] = measure(lambda: encode_rows(inputs[:100]), repeat)
+
+    # Model calls, on the float32 matrices the API scores
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    compiled_path = os.path.join(work_dir, "model.compiled")
+    CompiledForest.from_estimator(model).save(compiled_path)
+    results["serving/model_size/pickle"] = size(os.path.getsize(model_path))
+    results["serving/model_size/compiled"] = size(_directory_size(compiled_path))
+
+    features = encode_rows(inputs)
+    for engine_name in ENGINES:
+        # Built as the API builds it: single-threaded, scoring plain arrays. It
+        # updates the model in place, so each engine gets its own copy
+        with open(model_path, "rb") as f:
+            engine = prepare_engine(pickle.load(f), engine_name)
+        for batch_size in batch_sizes:
+            batch = np.ascontiguousarray(features[:batch_size])
+            results[f"serving/predict/{engine_name}/{batch_size}"] = measure(
+                partial(engine.predict, batch), repeat
+            )
+
+    results.update(_run_app_benchmarks(compiled_path, payloads, repeat))
+    return results
+
+
+def _run_app_benchmarks(
+    model_path: str, payloads: list[dict[str, Any]], repeat: int
+) -> dict[str, Result]:
+    # Settings are read when the app is imported
+    os.environ["API_MODEL_PATH"] = model_path
+    from fastapi.testclient import TestClient  # type: ignore
+
+    from src.api.main import app, model_manager
+
+    results: dict[str, Result] = {}
+    with TestClient(app) as client:
+        if not model_manager.ready.wait(timeout=60):
+            raise RuntimeError(f"Model not loaded: {model_manager.last_error}")
+        results["serving/app/predict_one"] = measure(
+            lambda: client.post("/predict_one", json=payloads[0]), repeat
+        )
+        batch_payload = {"inputs": payloads[:100]}
+        results["serving/app/predict_batch/100"] = measure(
+            lambda: client.post("/predict_batch", json=batch_payload), repeat
+        )
+        columns_payload = {
+            name: [payload[name] for payload in payloads[:100]] for name in payloads[0]
+        }
+        results["serving/app/predict_batch_columns/100"] = measure(
+            lambda: client.post("/predict_batch_columns", json=columns_payload),
+            repeat,
+        )
+    return results
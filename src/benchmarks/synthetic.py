@@ -0,0 +1,49 @@
+"""Synthetic transactions shaped like `creditcard.csv`, and a model fitted on them."""
+
+import pickle
+
+import numpy as np
+import pandas as pd  # type: ignore
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.fraud_detector.constants import PREDICTORS, TARGET
+
+# Share of frauds in `creditcard.csv`
+FRAUD_RATE = 0.00173
+# Duration covered by `creditcard.csv`, in seconds
+DURATION = 172_792
+# Shift of the components of frauds, the same whatever the seed
+FRAUD_SHIFT = np.random.default_rng(0).normal(scale=2.0, size=28)
+
+
+def make_transactions(n_rows: int, seed: int = 2018) -> pd.DataFrame:
+    """Transactions with the columns, dtypes and class imbalance of `creditcard.csv`.
+
+    `V1` to `V28` are centered, with decreasing variances as PCA components, and
+    shifted by `FRAUD_SHIFT` for frauds so that models have something to learn.
+    """
+    rng = np.random.default_rng(seed)
+    is_fraud = rng.random(n_rows) < FRAUD_RATE
+    components = rng.normal(size=(n_rows, 28)) * np.linspace(2.0, 0.3, 28)
+    components[is_fraud] += FRAUD_SHIFT
+
+    data_df = pd.DataFrame(components, columns=PREDICTORS[1:-1])
+    data_df.insert(0, "time", np.sort(rng.integers(0, DURATION, n_rows)))
+    data_df["amount"] = np.round(rng.lognormal(3.0, 1.5, n_rows), 2)
+    data_df[TARGET] = is_fraud.astype(int)
+    # Raw column names, as in `creditcard.csv`
+    return data_df.rename(columns=str.capitalize)
+
+
+def fit_model(
+    model_path: str, n_rows: int, n_estimators: int = 100, seed: int = 2018
+) -> None:
+    """Fit a random forest on synthetic transactions, saved as by `train_model`."""
+    data_df = make_transactions(n_rows, seed)
+    data_df.columns = data_df.columns.str.lower()
+    model = RandomForestClassifier(
+        n_estimators=n_estimators, random_state=seed, n_jobs=-1
+    )
+    model.fit(data_df[PREDICTORS], data_df[TARGET])
+    with open(model_path, "wb") as f:
+        pickle.dump(model, f)
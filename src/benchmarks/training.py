@@ -0,0 +1,79 @@
+"""Benchmarks of the training pipeline stages, on synthetic data."""
+
+import os
+
+from src.benchmarks.harness import Result, measure, size
+from src.benchmarks.synthetic import make_transactions
+from src.fraud_detector.evaluate import evaluate_model
+from src.fraud_detector.prepare import prepare_data
+from src.fraud_detector.train import train_model
+from src.fraud_detector.types import (
+    EvaluateModelParams,
+    PrepareModelParams,
+    TrainModelParams,
+)
+
+
+def run_training_benchmarks(
+    work_dir: str,
+    n_rows: int,
+    n_estimators: int = 100,
+    data_format: str = "npy",
+    repeat: int = 3,
+) -> dict[str, Result]:
+    """Benchmark `prepare_data`, `train_model` and `evaluate_model`.
+
+    MLflow logs to a SQLite database in `work_dir`, unless the MLFLOW_TRACKING_URI
+    environment variable points to a server.
+
+    Args:
+        work_dir: Directory for the raw and processed data, model and metrics.
+        n_rows: Number of synthetic transactions.
+        n_estimators: Number of trees of the trained forest.
+        data_format: Format of the processed data.
+        repeat: Number of runs of each stage.
+
+    Returns:
+        The results, by benchmark name.
+    """
+    os.environ.setdefault(
+        "MLFLOW_TRACKING_URI", f"sqlite:///{os.path.join(work_dir, 'mlflow.db')}"
+    )
+    raw_path = os.path.join(work_dir, "creditcard.csv")
+    processed_dir = os.path.join(work_dir, "processed")
+    model_path = os.path.join(work_dir, "model.pkl")
+    make_transactions(n_rows).to_csv(raw_path, index=False)
+
+    prepare_params = PrepareModelParams(
+        raw_data=raw_path, split=0.2, seed=2018, data_format=data_format
+    )
+    train_params = TrainModelParams(
+        train_csv=os.path.join(processed_dir, "train.csv"),
+        valid_csv=os.path.join(processed_dir, "valid.csv"),
+        model_path=model_path,
+        split=0.2,
+        seed=2018,
+        rfc_metric="gini",
+        n_estimators=n_estimators,
+        n_jobs=os.cpu_count() or 1,
+        data_format=data_format,
+    )
+    evaluate_params = EvaluateModelParams(
+        model_path=model_path,
+        valid_csv=os.path.join(processed_dir, "valid.csv"),
+        evaluation_path=os.path.join(work_dir, "evaluation.json"),
+        seed=2018,
+        data_format=data_format,
+    )
+
+    # Each stage is slow enough to be timed on its own, one call per sample
+    return {
+        "training/prepare_data": measure(
+            lambda: prepare_data(prepare_params, processed_dir), repeat, 0.0
+        ),
+        "training/train_model": measure(lambda: train_model(train_params), repeat, 0.0),
+        "training/model_size": size(os.path.getsize(model_path)),
+        "training/evaluate_model": measure(
+            lambda: evaluate_model(evaluate_params), repeat, 0.0
+        ),
+    }
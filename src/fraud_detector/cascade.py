@@ -0,0 +1,155 @@
+"""Two-stage cascade scoring: a linear pre-filter in front of the forest."""
+
+import json
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class Prefilter:
+    """Logistic regression clearing the transactions it is confident are legitimate.
+
+    Rows whose fraud score, a log-odds, is below `threshold` are legitimate without
+    being scored by the forest.
+    """
+
+    def __init__(
+        self,
+        coef: NDArray[np.float64],
+        intercept: float,
+        threshold: float = -np.inf,
+        feature_names: list[str] | None = None,
+    ) -> None:
+        self.coef = coef
+        self.intercept = intercept
+        self.threshold = threshold
+        self.feature_names = feature_names
+
+    @classmethod
+    def fit(cls, X: Any, y: NDArray[Any], seed: int) -> "Prefilter":
+        """Fit on standardized features, folding the scaling into the coefficients.
+
+        Classes are balanced, so that frauds weigh as much as legitimate
+        transactions whatever their share.
+        """
+        from sklearn.linear_model import LogisticRegression  # type: ignore
+
+        features = np.asarray(X, dtype=np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0.0] = 1.0
+        model = LogisticRegression(
+            class_weight="balanced", max_iter=1000, random_state=seed
+        )
+        model.fit((features - mean) / scale, y)
+
+        coef = model.coef_[0] / scale
+        feature_names = list(X.columns) if hasattr(X, "columns") else None
+        return cls(
+            coef=coef,
+            intercept=float(model.intercept_[0] - coef @ mean),
+            feature_names=feature_names,
+        )
+
+    def decision_function(self, X: Any) -> NDArray[np.float64]:
+        """Fraud score of every row, as a log-odds."""
+        if hasattr(X, "columns") and self.feature_names is not None:
+            X = X[self.feature_names]
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def calibrate(
+        self, X: Any, caught: NDArray[np.bool_], recall_loss: float
+    ) -> dict[str, float]:
+        """Set the highest threshold losing at most `recall_loss` of the frauds caught.
+
+        Args:
+            X: Validation features.
+            caught: Whether the forest predicts each validation row as a fraud
+                that it actually is.
+            recall_loss: Share of the caught frauds the pre-filter may clear.
+
+        Returns:
+            The threshold, the share of caught frauds cleared, and the share of the
+            rows sent to the forest.
+        """
+        scores = self.decision_function(X)
+        caught_scores = np.sort(scores[caught])
+        if caught_scores.size:
+            # Clearing rows strictly below the k-th lowest caught score clears at
+            # most k caught frauds
+            self.threshold = float(
+                caught_scores[int(np.floor(recall_loss * caught_scores.size))]
+            )
+        else:
+            self.threshold = -np.inf
+        cleared = scores < self.threshold
+        return {
+            "threshold": self.threshold,
+            "recall_loss": float(cleared[caught].mean()) if caught.any() else 0.0,
+            "stage_two_fraction": float((~cleared).mean()),
+        }
+
+    def save(self, path: str) -> None:
+        """Save as JSON."""
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "coef": self.coef.tolist(),
+                    "intercept": self.intercept,
+                    "threshold": self.threshold,
+                    "feature_names": self.feature_names,
+                },
+                f,
+                indent=4,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "Prefilter":
+        """Load a pre-filter saved by `save`."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            coef=np.asarray(data["coef"], dtype=np.float64),
+            intercept=data["intercept"],
+            threshold=data["threshold"],
+            feature_names=data["feature_names"],
+        )
+
+
+class CascadeModel:
+    """Scores rows with the pre-filter, and only the uncertain ones with the model.
+
+    Rows cleared by the pre-filter get a fraud probability of 0. The `_counted`
+    variants of the methods also return the number of rows sent to the model, to be
+    counted by the caller, e.g. in the serving process when scoring in workers.
+    """
+
+    def __init__(self, prefilter: Prefilter, model: Any) -> None:
+        self.prefilter = prefilter
+        self.model = model
+        self.classes_ = model.classes_
+
+    def predict_proba_counted(self, X: Any) -> tuple[NDArray[np.float64], int]:
+        """As `predict_proba`, with the number of rows sent to the model."""
+        uncertain = self.prefilter.decision_function(X) >= self.prefilter.threshold
+        proba = np.zeros((len(uncertain), len(self.classes_)), dtype=np.float64)
+        # Cleared rows are certainly of the first, legitimate, class
+        proba[:, 0] = 1.0
+        if uncertain.any():
+            rows = X.iloc[uncertain] if hasattr(X, "iloc") else X[uncertain]
+            proba[uncertain] = self.model.predict_proba(rows)
+        return proba, int(uncertain.sum())
+
+    def predict_counted(self, X: Any) -> tuple[NDArray[Any], int]:
+        """As `predict`, with the number of rows sent to the model."""
+        proba, model_rows = self.predict_proba_counted(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0), model_rows
+
+    def predict_proba(self, X: Any) -> NDArray[np.float64]:
+        """Predict class probabilities, as the model would for the uncertain rows."""
+        return self.predict_proba_counted(X)[0]
+
+    def predict(self, X: Any) -> NDArray[Any]:
+        """Predict classes, as the model would for the uncertain rows."""
+        return self.predict_counted(X)[0]
@@ -0,0 +1,183 @@
+"""Compaction of compiled forests into smaller node tables, and its report."""
+
+import os
+import time
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.fraud_detector.inference import CompiledForest
+
+
+def round_down_float32(values: NDArray[np.float64]) -> NDArray[np.float32]:
+    """Largest float32 not above every value.
+
+    A float32 feature is below a threshold exactly when it is below the threshold
+    rounded down this way, so that splits are the same as with float64 thresholds.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _subtree_range(
+    forest: CompiledForest, leaf_value: NDArray[np.float64]
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """Lowest and highest leaf value below every node."""
+    internal = ~forest._is_leaf
+    low = np.where(internal, np.nan, leaf_value)
+    high = low.copy()
+    # One level per step, from the leaves up: NaN until both children are known
+    for _ in range(forest.max_depth):
+        low[internal] = np.minimum(
+            low[forest.left[internal]], low[forest.right[internal]]
+        )
+        high[internal] = np.maximum(
+            high[forest.left[internal]], high[forest.right[internal]]
+        )
+    return low, high
+
+
+def compact_forest(
+    forest: CompiledForest, prune_tolerance: float = 0.0
+) -> CompiledForest:
+    """Compact a binary forest into a smaller node table, with nearly the same output.
+
+    Thresholds are stored as float32 rounded down, so that float32 features take
+    the same branches, children as int32, and leaves as the float32 probability of
+    the second class instead of one per class. Subtrees whose leaves are within
+    `2 * prune_tolerance` of each other are replaced by a single leaf halfway
+    between them. Predicted probabilities are therefore preserved up to
+    `prune_tolerance`, plus the float32 rounding of the leaves; with the default of
+    0, only subtrees whose leaves are all the same are pruned, and only that
+    rounding remains.
+
+    Args:
+        forest: A compiled binary forest, with one value per class.
+        prune_tolerance: Largest change allowed in the predicted probabilities.
+
+    Returns:
+        The compact forest.
+    """
+    if forest.value.shape[1] != 2 or len(forest.classes_) != 2:
+        raise ValueError("Only binary forests with one value per class are compacted.")
+
+    leaf_value = np.asarray(forest.value[:, 1], dtype=np.float64)
+    low, high = _subtree_range(forest, leaf_value)
+    # Internal nodes turned into leaves, and every node below them
+    pruned = ~forest._is_leaf & (high - low <= 2 * prune_tolerance)
+    new_leaf = forest._is_leaf | pruned
+
+    # Nodes reachable from the roots without going through a new leaf. Children
+    # always come after their parent in the node table.
+    kept = np.zeros(len(new_leaf), dtype=np.bool_)
+    kept[forest.roots] = True
+    for _ in range(forest.max_depth):
+        expand = kept & ~new_leaf
+        kept[forest.left[expand]] = True
+        kept[forest.right[expand]] = True
+
+    node_ids = np.flatnonzero(kept)
+    new_ids = np.cumsum(kept) - 1
+    is_leaf = new_leaf[node_ids]
+    own_ids = np.arange(len(node_ids))
+    left = np.where(is_leaf, own_ids, new_ids[forest.left[node_ids]])
+    right = np.where(is_leaf, own_ids, new_ids[forest.right[node_ids]])
+    value = np.where(
+        pruned[node_ids], (low[node_ids] + high[node_ids]) / 2, leaf_value[node_ids]
+    )
+
+    index_dtype = np.int32 if 2 * len(node_ids) < np.iinfo(np.int32).max else np.intp
+    return CompiledForest(
+        feature=np.where(is_leaf, 0, forest.feature[node_ids]).astype(np.int32),
+        threshold=round_down_float32(
+            np.where(is_leaf, 0.0, forest.threshold[node_ids])
+        ),
+        left=left.astype(index_dtype),
+        right=right.astype(index_dtype),
+        missing_go_to_left=np.asarray(forest.missing_go_to_left[node_ids]),
+        value=value.astype(np.float32)[:, None],
+        roots=new_ids[forest.roots].astype(np.intp),
+        max_depth=forest.max_depth,
+        classes=forest.classes_,
+        feature_names=forest.feature_names,
+        n_features=forest.n_features,
+    )
+
+
+def _size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+        )
+    return os.path.getsize(path)
+
+
+def _latency(model: Any, X: Any, repeat: int = 20) -> float:
+    """Best time of `predict_proba` on X, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compaction_report(
+    model_path: str,
+    compact_path: str,
+    X: Any | None = None,
+    y: NDArray[Any] | None = None,
+) -> dict[str, Any]:
+    """Compare a saved model with its compact forest.
+
+    Args:
+        model_path: The original model, as pickled by `train_model`.
+        compact_path: Its compact forest, as saved by `CompiledForest.save`.
+        X: Validation features, to compare latency and predictions on.
+        y: Validation labels, to compare metrics on.
+
+    Returns:
+        For both the model and the compact forest, the size on disk, load time and,
+        when X is given, latency on a single row and on all of X, and metrics when
+        y is given. When X is given, also the largest change in probability and
+        the share of rows with the same prediction.
+    """
+    import joblib  # type: ignore
+    from sklearn.metrics import average_precision_score, roc_auc_score  # type: ignore
+
+    report: dict[str, Any] = {}
+    models = {}
+    for name, path, load in (
+        ("original", model_path, joblib.load),
+        ("compact", compact_path, CompiledForest.load),
+    ):
+        start = time.perf_counter()
+        models[name] = load(path)
+        report[name] = {
+            "size_bytes": _size(path),
+            "load_s": time.perf_counter() - start,
+        }
+    report["compact"]["n_nodes"] = len(models["compact"].feature)
+    if X is None:
+        return report
+
+    probas = {}
+    for name, model in models.items():
+        report[name]["latency_one_row_s"] = _latency(model, X[:1])
+        report[name]["latency_all_rows_s"] = _latency(model, X, repeat=3)
+        probas[name] = model.predict_proba(X)[:, 1]
+        if y is not None:
+            report[name]["roc_auc"] = float(roc_auc_score(y, probas[name]))
+            report[name]["average_precision"] = float(
+                average_precision_score(y, probas[name])
+            )
+    report["max_proba_change"] = float(
+        np.abs(probas["compact"] - probas["original"]).max()
+    )
+    report["prediction_agreement"] = float(
+        ((probas["compact"] > 0.5) == (probas["original"] > 0.5)).mean()
+    )
+    return report
@@ -5,3 +5,16 @@ from pathlib import Path
 PROJECT_ROOT_PATH = Path(__file__).parents[2]
 
 PARAMETERS_YAML_PATH = PROJECT_ROOT_PATH / "params.yaml"
+
+TARGET = "class"
+
+# Features used by the model, in the column order it is fitted on
+PREDICTORS: list[str] = [
+    "time",
+    *(f"v{i}" for i in range(1, 29)),
+    "amount",
+]
+
+# MLflow server used by training and evaluation, unless the MLFLOW_TRACKING_URI
+# environment variable points to another one
+MLFLOW_TRACKING_URI = "http://localhost:5000"
@@ -0,0 +1,103 @@
+"""Reading and writing of the processed datasets, as CSV or memory-mappable .npy."""
+
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+import pandas as pd  # type: ignore
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS, TARGET
+
+DATA_FORMATS = ("csv", "npy")
+
+
+def npy_paths(csv_path: str) -> tuple[str, str]:
+    """Paths of the features and labels .npy files standing for a processed CSV.
+
+    For instance `data/processed/train.csv` is stored as
+    `data/processed/train_features.npy` and `data/processed/train_labels.npy`.
+    """
+    stem = csv_path.removesuffix(".csv")
+    return f"{stem}_features.npy", f"{stem}_labels.npy"
+
+
+def save_dataset(data_df: pd.DataFrame, csv_path: str, data_format: str) -> None:
+    """Write a processed split, as a CSV or as a float32 features matrix and labels.
+
+    Args:
+        data_df: The split, with lowercase `PREDICTORS` and `TARGET` columns.
+        csv_path: Path of the split as a CSV, from which .npy paths are derived.
+        data_format: One of `DATA_FORMATS`.
+    """
+    if data_format == "csv":
+        data_df.to_csv(csv_path, index=False)
+        return
+    features_path, labels_path = npy_paths(csv_path)
+    # pandas hands out column-major arrays: store the row-major layout sklearn uses
+    features = np.ascontiguousarray(data_df[PREDICTORS].to_numpy(dtype=np.float32))
+    np.save(features_path, features)
+    np.save(labels_path, data_df[TARGET].to_numpy(dtype=np.int8))
+
+
+def open_npy_dataset(csv_path: str, n_rows: int) -> tuple[np.memmap, np.memmap]:
+    """Create a split as writable memory-mapped features and labels of `n_rows`."""
+    features_path, labels_path = npy_paths(csv_path)
+    features = np.lib.format.open_memmap(
+        features_path, mode="w+", dtype=np.float32, shape=(n_rows, len(PREDICTORS))
+    )
+    labels = np.lib.format.open_memmap(
+        labels_path, mode="w+", dtype=np.int8, shape=(n_rows,)
+    )
+    return features, labels
+
+
+def load_dataset(csv_path: str, data_format: str) -> tuple[pd.DataFrame, NDArray[Any]]:
+    """Load the features and labels of a processed split.
+
+    In the npy format, features are memory-mapped as the C-contiguous float32
+    matrix sklearn works on, so there is neither parsing nor conversion copy; the
+    returned DataFrame is a view carrying the column names.
+
+    Args:
+        csv_path: Path of the split as a CSV, from which .npy paths are derived.
+        data_format: One of `DATA_FORMATS`.
+
+    Returns:
+        The `PREDICTORS` features and the `TARGET` labels.
+    """
+    if data_format == "csv":
+        data_df = pd.read_csv(csv_path)
+        return data_df[PREDICTORS], data_df[TARGET].values
+    features_path, labels_path = npy_paths(csv_path)
+    features = np.load(features_path, mmap_mode="r")
+    labels = np.load(labels_path, mmap_mode="r")
+    return pd.DataFrame(features, columns=PREDICTORS, copy=False), labels
+
+
+def iter_dataset(
+    csv_path: str, data_format: str, chunk_size: int
+) -> Iterator[tuple[pd.DataFrame, NDArray[Any]]]:
+    """Read the features and labels of a processed split by chunks of rows.
+
+    Only one chunk is in memory at a time: the CSV is parsed chunk by chunk, and
+    the npy files are memory-mapped and sliced.
+
+    Args:
+        csv_path: Path of the split as a CSV, from which .npy paths are derived.
+        data_format: One of `DATA_FORMATS`.
+        chunk_size: Number of rows per chunk.
+
+    Yields:
+        The `PREDICTORS` features and the `TARGET` labels of every chunk.
+    """
+    if data_format == "csv":
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            yield chunk[PREDICTORS], chunk[TARGET].values
+        return
+    features, labels = load_dataset(csv_path, data_format)
+    for start in range(0, len(labels), chunk_size):
+        yield (
+            features.iloc[start : start + chunk_size],
+            labels[start : start + chunk_size],
+        )
@@ -0,0 +1,160 @@
+"""Reference histograms of the training data, to detect drift of the served traffic."""
+
+import json
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS
+
+# Name of the histogram of the predicted fraud probabilities
+SCORE = "score"
+# Proportion given to empty bins, so that the PSI stays finite
+PSI_EPSILON = 1e-4
+# Rows binned at once, bounding the memory of the comparisons with the edges
+BIN_CHUNK_ROWS = 4096
+
+
+def quantile_edges(values: NDArray[Any], n_bins: int) -> NDArray[np.float64]:
+    """Inner edges of about `n_bins` bins with as many values each.
+
+    A value tied over several quantiles, e.g. the 0 of a feature that is mostly 0,
+    gets a bin of its own instead, so that a change of its share is seen.
+    """
+    quantiles = np.quantile(
+        np.asarray(values, dtype=np.float64), np.arange(1, n_bins) / n_bins
+    )
+    edges, counts = np.unique(quantiles, return_counts=True)
+    # Values at the edge and below the next float go to the bin of the edge
+    tied = np.nextafter(edges[counts > 1], np.inf)
+    return np.union1d(edges, tied)
+
+
+def psi(expected: NDArray[Any], actual: NDArray[Any]) -> NDArray[np.float64]:
+    """Population stability index between histograms, along the last axis."""
+    e = _proportions(expected)
+    a = _proportions(actual)
+    return np.sum((a - e) * np.log(a / e), axis=-1)
+
+
+def ks(expected: NDArray[Any], actual: NDArray[Any]) -> NDArray[np.float64]:
+    """Kolmogorov-Smirnov statistic between histograms, along the last axis.
+
+    The largest distance between the cumulative distributions at the bin edges,
+    a lower bound of the statistic on the unbinned values.
+    """
+    e = np.cumsum(expected, axis=-1) / np.maximum(expected.sum(-1, keepdims=True), 1)
+    a = np.cumsum(actual, axis=-1) / np.maximum(actual.sum(-1, keepdims=True), 1)
+    return np.abs(a - e).max(axis=-1)
+
+
+def _proportions(counts: NDArray[Any]) -> NDArray[np.float64]:
+    proportions = counts / np.maximum(counts.sum(axis=-1, keepdims=True), 1)
+    return np.maximum(proportions, PSI_EPSILON)
+
+
+class DriftReference:
+    """Histograms of the training features and of the predicted fraud probabilities.
+
+    Every histogram has its own bins, laid out in a single (n_histograms, n_bins)
+    table, the feature histograms first, in `feature_names` order, and that of the
+    fraud probability last. Histograms with fewer bins are padded with empty bins
+    with infinite edges, so that rows are binned with a single comparison.
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        edges: list[NDArray[np.float64]],
+        counts: list[NDArray[np.int64]],
+    ) -> None:
+        self.names = names
+        self.n_bins = max(len(inner) for inner in edges) + 1
+        self.edges = np.full((len(names), self.n_bins - 1), np.inf)
+        self.counts = np.zeros((len(names), self.n_bins), dtype=np.int64)
+        for i, (inner, hist) in enumerate(zip(edges, counts, strict=True)):
+            self.edges[i, : len(inner)] = inner
+            self.counts[i, : len(hist)] = hist
+
+    @property
+    def feature_names(self) -> list[str]:
+        """Names of the features, without that of the fraud probability."""
+        return self.names[:-1]
+
+    @classmethod
+    def fit(cls, X: Any, scores: NDArray[Any], n_bins: int = 20) -> "DriftReference":
+        """Bin every feature and the fraud probabilities by their quantiles.
+
+        Args:
+            X: Training features, with the `PREDICTORS` columns.
+            scores: Predicted fraud probabilities, e.g. on the validation set.
+            n_bins: Largest number of bins of every histogram.
+        """
+        features = np.asarray(X)
+        names = [*(X.columns if hasattr(X, "columns") else PREDICTORS), SCORE]
+        columns = [features[:, i] for i in range(features.shape[1])] + [scores]
+        edges = [quantile_edges(column, n_bins) for column in columns]
+        counts = [
+            np.bincount(
+                np.searchsorted(inner, column, side="right"), minlength=len(inner) + 1
+            )
+            for inner, column in zip(edges, columns, strict=True)
+        ]
+        return cls(names, edges, counts)
+
+    def bin_counts(
+        self, X: NDArray[Any], scores: NDArray[Any] | None = None
+    ) -> NDArray[np.int64]:
+        """Histograms of a batch, in the layout of `counts`.
+
+        Args:
+            X: Rows of features, in `feature_names` order.
+            scores: Their fraud probabilities, the last histogram is left empty if
+                None.
+        """
+        n_features = len(self.names) - 1
+        # Number of values at or above every inner edge, a cumulative histogram
+        at_or_above = np.zeros(self.edges.shape, dtype=np.int64)
+        for start in range(0, len(X), BIN_CHUNK_ROWS):
+            stop = start + BIN_CHUNK_ROWS
+            # One row per histogram, so that values are counted along contiguous rows
+            values = np.empty((len(self.names), len(X[start:stop])))
+            values[:n_features] = np.transpose(X[start:stop])
+            values[n_features] = np.nan if scores is None else scores[start:stop]
+            at_or_above += np.count_nonzero(
+                values[:, None, :] >= self.edges[:, :, None], axis=2
+            )
+        total = np.full((len(self.names), 1), len(X))
+        counts = -np.diff(np.hstack([total, at_or_above, np.zeros_like(total)]), axis=1)
+        if scores is None:
+            counts[-1] = 0
+        return counts
+
+    def save(self, path: str) -> None:
+        """Save as JSON."""
+        histograms = {}
+        for i, name in enumerate(self.names):
+            # Without the padding
+            inner = self.edges[i][np.isfinite(self.edges[i])]
+            histograms[name] = {
+                "edges": inner.tolist(),
+                "counts": self.counts[i, : len(inner) + 1].tolist(),
+            }
+        with open(path, "w") as f:
+            json.dump(histograms, f, indent=4)
+
+    @classmethod
+    def load(cls, path: str) -> "DriftReference":
+        """Load a reference saved by `save`."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            names=list(data),
+            edges=[
+                np.asarray(hist["edges"], dtype=np.float64) for hist in data.values()
+            ],
+            counts=[
+                np.asarray(hist["counts"], dtype=np.int64) for hist in data.values()
+            ],
+        )
@@ -1,52 +1,230 @@
-import pandas as pd  # type: ignore
-import pickle
-from sklearn.metrics import (  # type: ignore
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_auc_score,
-)
+import json
 import os
+import pickle
+from collections.abc import Iterable
+from typing import Any
+
 import mlflow  # type: ignore
+import numpy as np
+import pandas as pd  # type: ignore
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import MLFLOW_TRACKING_URI
+from src.fraud_detector.dataset import iter_dataset
 from src.fraud_detector.types import EvaluateModelParams  # Already centralized
 
+# Rows times bootstrap replicates weighted at once, bounding the memory of the
+# Poisson weights to a few tens of MB
+_BOOTSTRAP_BLOCK = 1 << 22
+
+
+def threshold_grid(n_thresholds: int) -> NDArray[np.float64]:
+    """The `n_thresholds + 1` thresholds swept, evenly spaced from 0 to 1."""
+    return np.linspace(0.0, 1.0, n_thresholds + 1)
+
+
+def score_bins(scores: NDArray[Any], n_thresholds: int) -> NDArray[np.intp]:
+    """Bin of every score: the number of thresholds of the grid below it.
+
+    A row is predicted as a fraud at the i-th threshold, when its score is above
+    it as with `predict`, exactly when its bin is above i.
+    """
+    return np.searchsorted(threshold_grid(n_thresholds), scores, side="left")
+
+
+def class_counts(
+    bins: NDArray[np.intp], y: NDArray[Any], n_thresholds: int
+) -> NDArray[np.int64]:
+    """Number of rows of every class, legitimate then fraud, in every bin."""
+    n_bins = n_thresholds + 2
+    cells = np.asarray(y, dtype=np.intp) * n_bins + bins
+    return np.bincount(cells, minlength=2 * n_bins).reshape(2, n_bins)
+
+
+def bootstrap_counts(
+    bins: NDArray[np.intp],
+    y: NDArray[Any],
+    n_thresholds: int,
+    n_bootstrap: int,
+    rng: np.random.Generator,
+) -> NDArray[np.int64]:
+    """`class_counts` of `n_bootstrap` Poisson bootstrap resamples of the rows.
+
+    Every row is drawn a Poisson(1) number of times in every resample, which
+    unlike drawing a fixed number of rows can be done chunk by chunk.
+    """
+    n_bins = n_thresholds + 2
+    cells = np.asarray(y, dtype=np.intp) * n_bins + bins
+    # Cells of every resample, laid out one after the other
+    offsets = np.arange(n_bootstrap, dtype=np.intp)[:, None] * (2 * n_bins)
+    counts = np.zeros(n_bootstrap * 2 * n_bins, dtype=np.int64)
+    block = max(1, _BOOTSTRAP_BLOCK // n_bootstrap)
+    for start in range(0, len(cells), block):
+        block_cells = cells[start : start + block]
+        weights = rng.poisson(1.0, size=(n_bootstrap, len(block_cells)))
+        counts += np.bincount(
+            (offsets + block_cells).ravel(),
+            weights=weights.ravel(),
+            minlength=counts.size,
+        ).astype(np.int64)
+    return counts.reshape(n_bootstrap, 2, n_bins)
+
+
+def _ratio(numerator: NDArray[Any], denominator: NDArray[Any]) -> NDArray[np.float64]:
+    # 0 where undefined, as sklearn's metrics with their default zero_division
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(np.broadcast(numerator, denominator).shape),
+        where=denominator != 0,
+    )
+
+
+def sweep_thresholds(
+    counts: NDArray[np.int64], cost_fp: float, cost_fn: float
+) -> dict[str, NDArray[np.float64]]:
+    """Metrics at every threshold of the grid, in one pass over the bins.
+
+    Args:
+        counts: `class_counts`, possibly with leading dimensions such as the
+            resamples of `bootstrap_counts`.
+        cost_fp: Cost of a legitimate transaction predicted as a fraud.
+        cost_fn: Cost of a fraud predicted as legitimate.
+
+    Returns:
+        Every metric, with the leading dimensions of `counts` and one value per
+        threshold, along with the threshold-free roc_auc and average_precision.
+    """
+    counts = counts.astype(np.float64)
+    negatives, positives = counts[..., 0, :], counts[..., 1, :]
+    n_negatives = negatives.sum(axis=-1, keepdims=True)
+    n_positives = positives.sum(axis=-1, keepdims=True)
+    # Rows in the bins above every threshold, predicted as frauds
+    tp = n_positives - np.cumsum(positives, axis=-1)[..., :-1]
+    fp = n_negatives - np.cumsum(negatives, axis=-1)[..., :-1]
+    fn = n_positives - tp
+    tn = n_negatives - fp
+
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, n_positives)
+    metrics = {
+        "accuracy": _ratio(tp + tn, n_positives + n_negatives),
+        "precision": precision,
+        "recall": recall,
+        "f1_score": _ratio(2 * precision * recall, precision + recall),
+        "false_positive_rate": _ratio(fp, n_negatives),
+        "cost": cost_fp * fp + cost_fn * fn,
+    }
+
+    # Rows of a bin tie: they count half as ranked above each other
+    positives_above = n_positives - np.cumsum(positives, axis=-1)
+    metrics["roc_auc"] = _ratio(
+        (negatives * (positives_above + 0.5 * positives)).sum(axis=-1),
+        (n_positives * n_negatives)[..., 0],
+    )
+    # Precision at every bin, of the rows of this bin and above
+    tp_from = positives_above + positives
+    fp_from = n_negatives - np.cumsum(negatives, axis=-1) + negatives
+    metrics["average_precision"] = _ratio(
+        (positives * _ratio(tp_from, tp_from + fp_from)).sum(axis=-1),
+        n_positives[..., 0],
+    )
+    return metrics
+
+
+def accumulate_counts(
+    chunks: Iterable[tuple[NDArray[Any], NDArray[Any]]],
+    n_thresholds: int,
+    n_bootstrap: int,
+    seed: int,
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """`class_counts` and `bootstrap_counts` of chunks of fraud scores and labels."""
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((2, n_thresholds + 2), dtype=np.int64)
+    resampled = np.zeros((n_bootstrap, 2, n_thresholds + 2), dtype=np.int64)
+    for scores, y in chunks:
+        bins = score_bins(scores, n_thresholds)
+        counts += class_counts(bins, y, n_thresholds)
+        if n_bootstrap:
+            resampled += bootstrap_counts(bins, y, n_thresholds, n_bootstrap, rng)
+    return counts, resampled
+
+
+def summarize(
+    counts: NDArray[np.int64],
+    resampled: NDArray[np.int64],
+    params: EvaluateModelParams,
+) -> tuple[dict[str, float], pd.DataFrame]:
+    """Metrics at the evaluated threshold with their confidence intervals, and curve.
+
+    Returns:
+        The metrics, and the metrics at every threshold of the grid.
+    """
+    thresholds = threshold_grid(params.n_thresholds)
+    # The threshold is checked to be one of the grid by `EvaluateModelParams`
+    index = round(params.threshold * params.n_thresholds)
+    curve = sweep_thresholds(counts, params.cost_fp, params.cost_fn)
+    per_threshold = {
+        name: values for name, values in curve.items() if np.ndim(values) == 1
+    }
+
+    metrics = {
+        name: float(values[index] if np.ndim(values) else values)
+        for name, values in curve.items()
+    }
+    best = int(np.argmin(curve["cost"]))
+    metrics["threshold"] = float(thresholds[index])
+    metrics["min_cost_threshold"] = float(thresholds[best])
+    metrics["min_cost"] = float(curve["cost"][best])
+
+    if params.n_bootstrap:
+        replicates = sweep_thresholds(resampled, params.cost_fp, params.cost_fn)
+        tail = 100 * (1 - params.confidence) / 2
+        for name, values in replicates.items():
+            values = values[:, index] if values.ndim == 2 else values
+            low, high = np.percentile(values, [tail, 100 - tail])
+            metrics[f"{name}_ci_low"] = float(low)
+            metrics[f"{name}_ci_high"] = float(high)
+
+    return metrics, pd.DataFrame({"threshold": thresholds, **per_threshold})
+
 
 def evaluate_model(params: EvaluateModelParams) -> None:
+    """Evaluate the model on the validation set, streamed by chunks.
+
+    Every chunk is scored once with `predict_proba`. The counts of rows per class
+    and score bin are all that is kept, from which the metrics at every threshold
+    and their bootstrap confidence intervals are computed at the end.
+    """
     # Set MLflow tracking URI
-    mlflow.set_tracking_uri("http://localhost:5000")  # type: ignore
+    mlflow.set_tracking_uri(  # type: ignore
+        os.environ.get("MLFLOW_TRACKING_URI", MLFLOW_TRACKING_URI)
+    )
 
     # Load the trained model
     with open(params.model_path, "rb") as f:
         model = pickle.load(f)
 
-    # Load validation data
-    data = pd.read_csv(params.valid_csv)
-    X = data.drop("class", axis=1)
-    target = "class"  # Changed from 'Class' to 'class'
-    y_true = data[target]
-
-    # Make predictions
-    y_pred = model.predict(X)
-    y_proba = model.predict_proba(X)[:, 1]
-
-    # Calculate metrics
-    metrics = {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "precision": precision_score(y_true, y_pred),
-        "recall": recall_score(y_true, y_pred),
-        "f1_score": f1_score(y_true, y_pred),
-        "roc_auc": roc_auc_score(y_true, y_proba),
-    }
+    # Score validation data chunk by chunk, memory-mapped in the npy format
+    chunks = (
+        (model.predict_proba(X)[:, 1], y)
+        for X, y in iter_dataset(
+            params.valid_csv, params.data_format, params.chunk_size
+        )
+    )
+    counts, resampled = accumulate_counts(
+        chunks, params.n_thresholds, params.n_bootstrap, params.seed
+    )
+    metrics, curve = summarize(counts, resampled, params)
 
     # Ensure the output directory exists
     os.makedirs(os.path.dirname(params.evaluation_path), exist_ok=True)
 
     # Save metrics to a JSON file
     with open(params.evaluation_path, "w") as f:
-        import json
-
         json.dump(metrics, f, indent=4)
+    if params.curve_path:
+        curve.to_csv(params.curve_path, index=False)
 
     # Start MLflow run for evaluation
     with mlflow.start_run():  # type: ignore
@@ -55,3 +233,5 @@ def evaluate_model(params: EvaluateModelParams) -> None:
 
         # Log the metrics JSON file as an artifact
         mlflow.log_artifact(params.evaluation_path)  # type: ignore
+        if params.curve_path:
+            mlflow.log_artifact(params.curve_path)  # type: ignore
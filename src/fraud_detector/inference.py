@@ -0,0 +1,332 @@
+"""Compiled flat-array inference engine for fitted random forests."""
+
+import json
+import os
+import shutil
+import uuid
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+# Rows are scored in chunks so that the (n_trees, n_rows) node index matrix stays
+# small enough to live in cache, whatever the size of the batch.
+CHUNK_SIZE = 4096
+
+# Memory-mapped arrays of a saved forest: file name in the forest directory, and
+# attribute of `CompiledForest`
+_MAPPED_ARRAYS = {
+    "feature.npy": "feature",
+    "threshold.npy": "threshold",
+    "missing_go_to_left.npy": "missing_go_to_left",
+    "value.npy": "value",
+    "roots.npy": "roots",
+    "children.npy": "_children",
+    "is_leaf.npy": "_is_leaf",
+}
+
+
+class CompiledForest:
+    """Random forest packed into flat NumPy arrays and scored with vectorized traversal.
+
+    The nodes of every tree are concatenated into a single node table, so all the
+    trees of a batch are walked together, one level per step, until every row has
+    reached a leaf in every tree. Predictions are identical to the ones of the
+    sklearn estimator the forest was compiled from.
+
+    A binary forest may store a single value per leaf, the probability of the
+    second class, as made by `compact_forest`.
+    """
+
+    def __init__(
+        self,
+        feature: NDArray[np.intp],
+        threshold: NDArray[np.floating[Any]],
+        left: NDArray[np.intp],
+        right: NDArray[np.intp],
+        missing_go_to_left: NDArray[np.bool_],
+        value: NDArray[np.floating[Any]],
+        roots: NDArray[np.intp],
+        max_depth: int,
+        classes: NDArray[Any],
+        feature_names: list[str] | None = None,
+        n_features: int | None = None,
+    ) -> None:
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.feature_names = feature_names
+        if n_features is None:
+            # Features the trees never split on are unknown: best effort
+            n_features = int(feature.max()) + 1 if feature.size else 0
+        self.n_features = n_features
+        if feature_names is not None:
+            self.n_features = len(feature_names)
+        # Directory the arrays are memory-mapped from, when loaded with `load`, and
+        # identifier of the save that wrote it
+        self.path: str | None = None
+        self._save_id: str | None = None
+
+        # Children interleaved as [left, right] so that a step is a single gather
+        self._children = np.empty(2 * len(left), dtype=left.dtype)
+        self._children[0::2] = left
+        self._children[1::2] = right
+        self._is_leaf = left == np.arange(len(left))
+
+    @classmethod
+    def from_estimator(cls, forest: Any) -> "CompiledForest":
+        """Compile a fitted sklearn random forest classifier.
+
+        Args:
+            forest: A fitted `RandomForestClassifier` (or any forest exposing
+                `estimators_` of single-output decision trees and `classes_`).
+
+        Returns:
+            The compiled forest.
+        """
+        if not hasattr(forest, "estimators_") or not hasattr(forest, "classes_"):
+            raise TypeError(
+                f"Cannot compile a {type(forest).__name__}: a fitted random forest "
+                "classifier is expected."
+            )
+
+        features: list[NDArray[Any]] = []
+        thresholds: list[NDArray[Any]] = []
+        lefts: list[NDArray[Any]] = []
+        rights: list[NDArray[Any]] = []
+        missing: list[NDArray[Any]] = []
+        values: list[NDArray[Any]] = []
+        roots: list[int] = []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise TypeError("Only single-output forests can be compiled.")
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing.append(
+                np.asarray(
+                    getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)),
+                    dtype=np.bool_,
+                )
+            )
+            # Same normalization as `DecisionTreeClassifier.predict_proba`
+            value = tree.value[:, 0, : len(forest.classes_)].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, int(tree.max_depth))
+            offset += tree.node_count
+
+        feature_names = getattr(forest, "feature_names_in_", None)
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_go_to_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            feature_names=None if feature_names is None else list(feature_names),
+            n_features=getattr(forest, "n_features_in_", None),
+        )
+
+    def save(self, path: str) -> None:
+        """Save the forest as a directory of .npy files that `load` memory-maps.
+
+        The directory is written next to `path` then moved into place, so that a
+        process polling `path` never sees a half-written forest.
+        """
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for file_name, attribute in _MAPPED_ARRAYS.items():
+            np.save(os.path.join(tmp_path, file_name), getattr(self, attribute))
+        np.save(os.path.join(tmp_path, "classes.npy"), self.classes_)
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "max_depth": self.max_depth,
+                    "n_features": self.n_features,
+                    "feature_names": self.feature_names,
+                    "save_id": uuid.uuid4().hex,
+                },
+                f,
+            )
+
+        # Processes still mapping the previous arrays keep reading them until they
+        # reload: removed files stay readable as long as they are mapped
+        old_path = f"{path}.old"
+        if os.path.exists(path):
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        """Load a forest saved by `save`, memory-mapping its arrays read-only.
+
+        All the processes loading the same directory share a single page cache
+        copy of the node table, instead of each holding a private one.
+        """
+        forest = cls.__new__(cls)
+        for file_name, attribute in _MAPPED_ARRAYS.items():
+            array = np.load(os.path.join(path, file_name), mmap_mode="r")
+            # Plain ndarray views of the mappings, so that the results of indexing
+            # them are not memmaps
+            setattr(forest, attribute, np.asarray(array))
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+
+        forest.left = forest._children[0::2]
+        forest.right = forest._children[1::2]
+        forest.max_depth = meta["max_depth"]
+        forest.n_features = meta["n_features"]
+        forest.feature_names = meta["feature_names"]
+        forest.classes_ = np.load(os.path.join(path, "classes.npy"))
+        forest.path = path
+        forest._save_id = meta.get("save_id")
+        return forest
+
+    def _mapped_files_replaced(self) -> bool:
+        """Whether the directory was removed or saved again since it was loaded."""
+        if self._save_id is None:
+            return True
+        try:
+            with open(os.path.join(str(self.path), "meta.json")) as f:
+                return bool(json.load(f).get("save_id") != self._save_id)
+        except FileNotFoundError:
+            return True
+
+    def __getstate__(self) -> dict[str, Any]:
+        # A memory-mapped forest is sent to other processes as its path, so that
+        # they map the same files instead of receiving a private copy. Once `save`
+        # has replaced the directory, the path no longer leads to these arrays, so
+        # they are sent themselves
+        if self.path is None:
+            return self.__dict__
+        if self._mapped_files_replaced():
+            return {**self.__dict__, "path": None, "_save_id": None}
+        return {"path": self.path, "save_id": self._save_id}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        if set(state) == {"path", "save_id"}:
+            forest = CompiledForest.load(state["path"])
+            if forest._save_id != state["save_id"]:
+                raise RuntimeError(
+                    f"Compiled forest {state['path']} was saved again while being "
+                    "sent to another process."
+                )
+            state = forest.__dict__
+        self.__dict__.update(state)
+
+    @property
+    def n_trees(self) -> int:
+        """Number of trees in the forest."""
+        return len(self.roots)
+
+    def _validate(self, X: Any) -> NDArray[np.float32]:
+        if hasattr(X, "columns") and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has shape {X.shape}, but the forest expects "
+                f"{self.n_features} features."
+            )
+        return X
+
+    def _apply(self, X: NDArray[np.float32]) -> NDArray[np.intp]:
+        """Leaf reached by every row in every tree, as a (n_trees, n_rows) array."""
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+
+        # One entry per (tree, row) pair; pairs that reached a leaf are dropped from
+        # the active set so that deeper levels only walk the remaining ones.
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(
+            np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees
+        )
+        position = np.arange(node.size, dtype=np.intp)
+        leaves = node.copy()
+        while position.size:
+            x = flat_X[row_offset + self.feature[node]]
+            # float32 features against float64 thresholds, as sklearn does, or
+            # against float32 thresholds rounded down, which splits them the same
+            go_left = x <= self.threshold[node]
+            if has_missing:
+                go_left = np.where(np.isnan(x), self.missing_go_to_left[node], go_left)
+            # Cast once, rather than by every gather, when children are int32
+            node = self._children[2 * node + ~go_left].astype(np.intp, copy=False)
+
+            done = self._is_leaf[node]
+            if done.any():
+                leaves[position[done]] = node[done]
+                active = ~done
+                node, row_offset, position = (
+                    node[active],
+                    row_offset[active],
+                    position[active],
+                )
+        return leaves.reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, X: Any) -> NDArray[np.float64]:
+        """Predict class probabilities, as `RandomForestClassifier.predict_proba`."""
+        X = self._validate(X)
+        proba = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            leaves = self._apply(X[start:stop])
+            chunk = proba[start:stop]
+            # Accumulate tree by tree, in the same order as sklearn
+            for tree_leaves in leaves:
+                chunk += self.value[tree_leaves]
+        proba /= self.n_trees
+        if proba.shape[1] < len(self.classes_):
+            # Leaves only store the probability of the second class
+            return np.column_stack([1.0 - proba[:, 0], proba[:, 0]])
+        return proba
+
+    def predict(self, X: Any) -> NDArray[Any]:
+        """Predict classes, as `RandomForestClassifier.predict`."""
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+
+def build_engine(model: Any, engine: str) -> Any:
+    """Wrap a loaded model into the requested inference engine.
+
+    Args:
+        model: The fitted model, as loaded from `models/model.pkl`, or an already
+            compiled forest, which is used as is whatever the engine.
+        engine: "sklearn" to score with the model itself, "compiled" to score with
+            a `CompiledForest` compiled from it.
+
+    Returns:
+        An object exposing `predict` and `predict_proba`.
+    """
+    if isinstance(model, CompiledForest):
+        return model
+    if engine == "sklearn":
+        return model
+    if engine == "compiled":
+        return CompiledForest.from_estimator(model)
+    raise ValueError(f"Unknown inference engine: {engine}")
@@ -1,13 +1,137 @@
 import pandas as pd  # type: ignore
+import numpy as np
+from numpy.typing import NDArray
 from sklearn.model_selection import train_test_split  # type: ignore
 import os
-from src.fraud_detector.constants import PROJECT_ROOT_PATH
+from src.fraud_detector.constants import PREDICTORS, PROJECT_ROOT_PATH, TARGET
+from src.fraud_detector.dataset import open_npy_dataset, save_dataset
 from src.fraud_detector.types import PrepareModelParams  # Imported from schemas.py
 import argparse
 
+SPLITS = ("train", "valid", "test")
 
-def prepare_data(params: PrepareModelParams) -> None:
-    os.makedirs(os.path.join(PROJECT_ROOT_PATH, "data", "processed"), exist_ok=True)
+# splitmix64 constants, used to hash row indices into uniform numbers
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def split_uniforms(row_ids: NDArray[np.uint64], seed: int) -> NDArray[np.float64]:
+    """Deterministic uniform number in [0, 1) for every row index, given a seed."""
+    z = row_ids + np.uint64((seed * _GOLDEN_GAMMA + _GOLDEN_GAMMA) % 2**64)
+    z = (z ^ (z >> np.uint64(30))) * _MIX_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_2
+    z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+def assign_splits(
+    row_ids: NDArray[np.uint64], seed: int, split: float
+) -> NDArray[np.int8]:
+    """Index in `SPLITS` of every row, with the proportions of `prepare_data`.
+
+    As with the two successive `train_test_split`, a `split` share of rows goes to
+    test, and a `split` share of the remaining ones goes to valid.
+    """
+    uniforms = split_uniforms(row_ids, seed)
+    assignment = np.zeros(len(row_ids), dtype=np.int8)
+    assignment[uniforms < split + (1 - split) * split] = SPLITS.index("valid")
+    assignment[uniforms < split] = SPLITS.index("test")
+    return assignment
+
+
+def _count_csv_rows(path: str) -> int:
+    """Number of data rows of a CSV, counted without parsing it."""
+    n_lines = 0
+    last_byte = b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(1 << 24):
+            n_lines += block.count(b"\n")
+            last_byte = block[-1:]
+    if last_byte != b"\n":
+        n_lines += 1
+    return n_lines - 1  # Header
+
+
+def _split_sizes(params: PrepareModelParams) -> NDArray[np.int64]:
+    """Number of rows of each split, known from the row count alone."""
+    n_rows = _count_csv_rows(params.raw_data)
+    sizes = np.zeros(len(SPLITS), dtype=np.int64)
+    for start in range(0, n_rows, params.chunk_size):
+        stop = min(start + params.chunk_size, n_rows)
+        assignment = assign_splits(
+            np.arange(start, stop, dtype=np.uint64), params.seed, params.split
+        )
+        sizes += np.bincount(assignment, minlength=len(SPLITS))
+    return sizes
+
+
+def prepare_data_streaming(params: PrepareModelParams, output_dir: str) -> None:
+    """Split the raw data chunk by chunk, in memory bounded by `params.chunk_size`.
+
+    Columns are read with compact dtypes, and every row is assigned to a split by
+    hashing its index with `params.seed`, so the same seed always gives the same
+    splits without ever holding the whole dataset. In the npy format, the size of
+    every split is computed upfront so that chunks are written straight into
+    preallocated memory-mapped arrays.
+    """
+    columns = pd.read_csv(params.raw_data, nrows=0).columns
+    dtypes = {
+        column: np.int8 if column.lower() == TARGET else np.float32
+        for column in columns
+    }
+    paths = {name: os.path.join(output_dir, f"{name}.csv") for name in SPLITS}
+
+    if params.data_format == "npy":
+        sizes = _split_sizes(params)
+        outputs = {
+            name: open_npy_dataset(paths[name], int(size))
+            for name, size in zip(SPLITS, sizes, strict=True)
+        }
+        positions = dict.fromkeys(SPLITS, 0)
+
+    first_row = 0
+    for chunk in pd.read_csv(
+        params.raw_data, chunksize=params.chunk_size, dtype=dtypes
+    ):
+        chunk.columns = chunk.columns.str.lower()  # Normalize column names to lowercase
+        row_ids = np.arange(first_row, first_row + len(chunk), dtype=np.uint64)
+        assignment = assign_splits(row_ids, params.seed, params.split)
+        for i, name in enumerate(SPLITS):
+            split_df = chunk[assignment == i]
+            if params.data_format == "npy":
+                features, labels = outputs[name]
+                start, stop = positions[name], positions[name] + len(split_df)
+                features[start:stop] = split_df[PREDICTORS].to_numpy(dtype=np.float32)
+                labels[start:stop] = split_df[TARGET].to_numpy(dtype=np.int8)
+                positions[name] = stop
+            else:
+                split_df.to_csv(
+                    paths[name],
+                    index=False,
+                    header=first_row == 0,
+                    mode="w" if first_row == 0 else "a",
+                )
+        first_row += len(chunk)
+
+    if params.data_format == "npy":
+        for name, size in zip(SPLITS, sizes, strict=True):
+            if positions[name] != size:
+                raise ValueError(
+                    f"Wrote {positions[name]} rows to the {name} split, expected {size}."
+                )
+            for array in outputs[name]:
+                array.flush()
+
+
+def prepare_data(params: PrepareModelParams, output_dir: str | None = None) -> None:
+    if output_dir is None:
+        output_dir = os.path.join(PROJECT_ROOT_PATH, "data/processed")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if params.mode == "streaming":
+        prepare_data_streaming(params, output_dir)
+        return
 
     data_df = pd.read_csv(params.raw_data)
     data_df.columns = data_df.columns.str.lower()  # Normalize column names to lowercase
@@ -19,15 +143,9 @@ def prepare_data(params: PrepareModelParams) -> None:
     train_df, valid_df = train_test_split(
         train_df, test_size=params.split, random_state=params.seed, shuffle=True
     )
-    train_df.to_csv(
-        os.path.join(PROJECT_ROOT_PATH, "data/processed/train.csv"), index=False
-    )
-    test_df.to_csv(
-        os.path.join(PROJECT_ROOT_PATH, "data/processed/test.csv"), index=False
-    )
-    valid_df.to_csv(
-        os.path.join(PROJECT_ROOT_PATH, "data/processed/valid.csv"), index=False
-    )
+    save_dataset(train_df, os.path.join(output_dir, "train.csv"), params.data_format)
+    save_dataset(test_df, os.path.join(output_dir, "test.csv"), params.data_format)
+    save_dataset(valid_df, os.path.join(output_dir, "valid.csv"), params.data_format)
 
 
 def main() -> None:
@@ -37,10 +155,35 @@ def main() -> None:
     )
     parser.add_argument("--split", type=float, required=True, help="Data split ratio")
     parser.add_argument("--seed", type=int, required=True, help="Random seed")
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="memory",
+        choices=["memory", "streaming"],
+        help="Split the data in memory or chunk by chunk",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100_000,
+        help="Rows per chunk in streaming mode",
+    )
+    parser.add_argument(
+        "--data_format",
+        type=str,
+        default="csv",
+        choices=["csv", "npy"],
+        help="Format of the processed data",
+    )
     args = parser.parse_args()
 
     params = PrepareModelParams(
-        raw_data=args.raw_data, split=args.split, seed=args.seed
+        raw_data=args.raw_data,
+        split=args.split,
+        seed=args.seed,
+        mode=args.mode,
+        chunk_size=args.chunk_size,
+        data_format=args.data_format,
     )
 
     prepare_data(params)
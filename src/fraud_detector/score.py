@@ -0,0 +1,185 @@
+"""Parallel out-of-core scoring of CSV and Parquet files."""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+
+import joblib  # type: ignore
+import numpy as np
+import pandas as pd  # type: ignore
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.inference import build_engine
+from src.fraud_detector.types import ScoreFileParams
+
+logger = logging.getLogger(__name__)
+
+# Engine of the current worker process, loaded once by `_init_worker`
+_worker_engine: Any = None
+
+
+def _init_worker(model_path: str, engine: str) -> None:
+    global _worker_engine
+    model = joblib.load(model_path)
+    # Parallelism is the pool's, whatever n_jobs the model was trained with
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    _worker_engine = build_engine(model, engine)
+
+
+def _score_chunk(X: NDArray[np.float32]) -> tuple[NDArray[Any], NDArray[Any]]:
+    proba = _worker_engine.predict_proba(X)
+    return _worker_engine.classes_.take(proba.argmax(axis=1)), proba[:, -1]
+
+
+def _progress_path(output_path: str) -> str:
+    return f"{output_path}.progress.json"
+
+
+def _read_progress(output_path: str, chunk_size: int) -> dict[str, int]:
+    """Chunks, rows and output bytes written by a previous, interrupted run."""
+    try:
+        with open(_progress_path(output_path)) as f:
+            progress = json.load(f)
+    except FileNotFoundError:
+        return {"chunks": 0, "rows": 0, "bytes": 0, "chunk_size": chunk_size}
+    # Parquet rows are skipped by whole batches, cut the same way only with the
+    # same chunk size
+    if progress.get("chunk_size") != chunk_size:
+        raise ValueError(
+            f"Cannot resume a run with chunk size {progress.get('chunk_size')} "
+            f"with chunk size {chunk_size}."
+        )
+    return progress
+
+
+def _write_progress(output_path: str, progress: dict[str, int]) -> None:
+    # Write then rename, so that a crash never leaves a partial progress file
+    tmp_path = f"{_progress_path(output_path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, _progress_path(output_path))
+
+
+def iter_feature_chunks(
+    input_path: str, chunk_size: int, skip_rows: int = 0
+) -> Iterator[NDArray[np.float32]]:
+    """Read the `PREDICTORS` of a CSV or Parquet file as float32 chunks.
+
+    Files are memory-mapped, and column names are matched case-insensitively so
+    that both raw and processed files can be scored.
+
+    Args:
+        input_path: Path to a `.csv` or `.parquet` file.
+        chunk_size: Number of rows per chunk.
+        skip_rows: Number of leading rows to skip, already scored by a previous run.
+
+    Yields:
+        (n_rows, n_features) float32 matrices, in file order.
+    """
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq  # type: ignore
+
+        parquet_file = pq.ParquetFile(input_path, memory_map=True)
+        names = {name.lower(): name for name in parquet_file.schema_arrow.names}
+        batches = parquet_file.iter_batches(
+            batch_size=chunk_size, columns=[names[name] for name in PREDICTORS]
+        )
+        read_rows = 0
+        for batch in batches:
+            # Batches may be cut short at row group boundaries: skip by row count
+            read_rows += batch.num_rows
+            if read_rows <= skip_rows:
+                continue
+            yield np.column_stack(
+                [column.to_numpy(zero_copy_only=False) for column in batch.columns]
+            ).astype(np.float32, copy=False)
+    else:
+        reader = pd.read_csv(
+            input_path,
+            chunksize=chunk_size,
+            memory_map=True,
+            skiprows=range(1, skip_rows + 1),
+            usecols=lambda name: name.lower() in PREDICTORS,
+            dtype=np.float32,
+        )
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.lower()
+            yield chunk[PREDICTORS].to_numpy(dtype=np.float32)
+
+
+def score_file(params: ScoreFileParams) -> dict[str, float]:
+    """Score a file with `params.n_workers` processes, preserving row order.
+
+    Chunks are read in the main process and scored by workers that each load the
+    model once. Results are appended to the output CSV in input order, and the
+    progress is checkpointed after every chunk, so that an interrupted run resumes
+    from the last finished chunk when `params.resume` is set.
+
+    Returns:
+        The number of rows scored by this run, its duration and throughput.
+    """
+    progress = {"chunks": 0, "rows": 0, "bytes": 0, "chunk_size": params.chunk_size}
+    if params.resume and os.path.exists(params.output_path):
+        progress = _read_progress(params.output_path, params.chunk_size)
+        logger.info(f"Resuming after {progress['chunks']} chunks")
+    os.makedirs(os.path.dirname(params.output_path) or ".", exist_ok=True)
+
+    start = time.perf_counter()
+    scored_rows = 0
+    with (
+        open(params.output_path, "r+b" if progress["chunks"] else "wb") as output,
+        ProcessPoolExecutor(
+            max_workers=params.n_workers,
+            initializer=_init_worker,
+            initargs=(params.model_path, params.engine),
+        ) as pool,
+    ):
+        # Drop whatever was written after the last checkpoint
+        output.truncate(progress["bytes"])
+        output.seek(progress["bytes"])
+        if not progress["chunks"]:
+            output.write(b"prediction,probability\n")
+
+        def write_result(future: "Future[tuple[NDArray[Any], NDArray[Any]]]") -> None:
+            nonlocal scored_rows
+            predictions, probabilities = future.result()
+            pd.DataFrame(
+                {"prediction": predictions, "probability": probabilities}
+            ).to_csv(output, header=False, index=False)
+            output.flush()
+            scored_rows += len(predictions)
+            progress["chunks"] += 1
+            progress["rows"] += len(predictions)
+            progress["bytes"] = output.tell()
+            _write_progress(params.output_path, progress)
+
+        # Bound the number of chunks in flight to keep memory flat
+        pending: deque[Future[tuple[NDArray[Any], NDArray[Any]]]] = deque()
+        chunks = iter_feature_chunks(
+            params.input_path, params.chunk_size, skip_rows=progress["rows"]
+        )
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= 2 * params.n_workers:
+                write_result(pending.popleft())
+        while pending:
+            write_result(pending.popleft())
+
+    duration = time.perf_counter() - start
+    stats = {
+        "rows": scored_rows,
+        "seconds": duration,
+        "rows_per_second": scored_rows / duration if duration else 0.0,
+    }
+    logger.info(
+        f"Scored {scored_rows} rows in {duration:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/s)"
+    )
+    return stats
@@ -1,10 +1,15 @@
 from sklearn.ensemble import RandomForestClassifier  # type: ignore
-import pandas as pd  # type: ignore
 import pickle
 import mlflow  # type: ignore
 import mlflow.sklearn  # type: ignore
 import os
+from typing import Any
+import numpy as np
 from mlflow.tracking import MlflowClient  # type: ignore
+from src.fraud_detector.cascade import Prefilter
+from src.fraud_detector.constants import MLFLOW_TRACKING_URI
+from src.fraud_detector.dataset import load_dataset
+from src.fraud_detector.drift import DriftReference
 from src.fraud_detector.types import TrainModelParams
 
 import logging
@@ -17,7 +22,9 @@ def train_model(params: TrainModelParams) -> None:
     os.makedirs("mlflow", exist_ok=True)
 
     # Configure MLflow tracking server URI
-    mlflow.set_tracking_uri("http://localhost:5000")  # type: ignore
+    mlflow.set_tracking_uri(  # type: ignore
+        os.environ.get("MLFLOW_TRACKING_URI", MLFLOW_TRACKING_URI)
+    )
     # Start an MLflow run
     with mlflow.start_run() as run:  # type: ignore
         # Log training parameters to MLflow
@@ -25,57 +32,58 @@ def train_model(params: TrainModelParams) -> None:
         mlflow.log_param("seed", params.seed)  # type: ignore
         mlflow.log_param("rfc_metric", params.rfc_metric)  # type: ignore
         mlflow.log_param("n_estimators", params.n_estimators)  # type: ignore
+        mlflow.log_param("min_samples_leaf", params.min_samples_leaf)  # type: ignore
 
-        target: str = "class"
-        predictors: list[str] = [
-            "time",
-            "v1",
-            "v2",
-            "v3",
-            "v4",
-            "v5",
-            "v6",
-            "v7",
-            "v8",
-            "v9",
-            "v10",
-            "v11",
-            "v12",
-            "v13",
-            "v14",
-            "v15",
-            "v16",
-            "v17",
-            "v18",
-            "v19",
-            "v20",
-            "v21",
-            "v22",
-            "v23",
-            "v24",
-            "v25",
-            "v26",
-            "v27",
-            "v28",
-            "amount",
-        ]
-
-        # Load training data
-        train_df: pd.DataFrame = pd.read_csv(params.train_csv)
-
-        # Initialize and train the RandomForestClassifier
-        clf: RandomForestClassifier = RandomForestClassifier(
-            n_jobs=params.n_jobs,
-            random_state=params.seed,
-            criterion=params.rfc_metric,
-            n_estimators=params.n_estimators,
-            verbose=False,
+        mlflow.log_param("mode", params.mode)  # type: ignore
+
+        # Load training data, memory-mapped in the npy format
+        X_train, y_train = load_dataset(params.train_csv, params.data_format)
+        data_window = params.data_window or params.train_csv
+
+        clf: RandomForestClassifier
+        if params.mode == "incremental":
+            # Add trees fitted on the new data only to the previous model
+            base_model = params.base_model or params.model_path
+            mlflow.log_param("base_model", base_model)  # type: ignore
+            clf = extend_forest(
+                load_base_model(base_model),
+                X_train,
+                y_train,
+                n_estimators=params.n_estimators,
+                data_window=data_window,
+                max_estimators=params.max_estimators,
+                n_jobs=params.n_jobs,
+            )
+        else:
+            # Initialize and train the RandomForestClassifier
+            clf = RandomForestClassifier(
+                n_jobs=params.n_jobs,
+                random_state=params.seed,
+                criterion=params.rfc_metric,
+                n_estimators=params.n_estimators,
+                min_samples_leaf=params.min_samples_leaf,
+                verbose=False,
+            )
+            clf.fit(X_train, y_train)
+            clf.tree_windows_ = [data_window] * len(clf.estimators_)
+
+        # Data window each tree was fitted on, oldest trees first
+        mlflow.log_metric("n_trees", len(clf.estimators_))  # type: ignore
+        mlflow.log_dict(  # type: ignore
+            {"tree_windows": clf.tree_windows_}, "tree_windows.json"
         )
-        clf.fit(train_df[predictors], train_df[target].values)
 
         # Log the trained model to MLflow
         mlflow.sklearn.log_model(clf, "model")
 
+        # Logged before the model version is registered, as the API loads the
+        # pre-filter and the drift reference with it
+        if params.prefilter_path is not None:
+            train_prefilter(params, params.prefilter_path, clf, X_train, y_train)
+
+        if params.drift_reference_path is not None:
+            build_drift_reference(params, params.drift_reference_path, clf, X_train)
+
         # Initialize MLflow client for model registry operations
         client: MlflowClient = MlflowClient()
         model_name: str = "fraud-detector"
@@ -110,6 +118,125 @@ def train_model(params: TrainModelParams) -> None:
         # Ensure the model path directory exists
         os.makedirs(os.path.dirname(params.model_path), exist_ok=True)
 
-        # Save the trained model locally
+        # Save the trained model locally, after the files saved with it, so that
+        # the API never pairs it with those of the previous model
         with open(params.model_path, "wb") as f:
             pickle.dump(clf, f)
+
+
+def load_base_model(base_model: str) -> RandomForestClassifier:
+    """Load a pickled model, or a model from an MLflow URI.
+
+    For instance `models:/fraud-detector/Production` loads the Production version.
+    """
+    if base_model.startswith("models:/"):
+        return mlflow.sklearn.load_model(base_model)
+    with open(base_model, "rb") as f:
+        return pickle.load(f)
+
+
+def extend_forest(
+    clf: RandomForestClassifier,
+    X: Any,
+    y: Any,
+    n_estimators: int,
+    data_window: str,
+    max_estimators: int | None = None,
+    n_jobs: int | None = None,
+) -> RandomForestClassifier:
+    """Add trees fitted on new data to a fitted forest, dropping the oldest ones.
+
+    Only the new trees are fitted, so the cost is proportional to the new data and
+    not to the data the forest was trained on so far.
+
+    Args:
+        clf: The fitted forest, modified in place.
+        X: The new data.
+        y: Its labels, with every class the forest knows.
+        n_estimators: Number of trees to add.
+        data_window: Label of the new data, recorded for each new tree in the
+            `tree_windows_` attribute of the forest.
+        max_estimators: Number of trees to keep, the most recent ones, or None to
+            keep them all.
+        n_jobs: Number of parallel jobs to fit the new trees.
+
+    Returns:
+        The extended forest.
+    """
+    if not np.array_equal(np.unique(y), clf.classes_):
+        raise ValueError(
+            f"The new data has classes {np.unique(y)}, but the forest was fitted "
+            f"on {clf.classes_}: every class is needed to add trees."
+        )
+    windows = list(getattr(clf, "tree_windows_", ["unknown"] * len(clf.estimators_)))
+    # Warm start skips as many seeds of the random state as there are trees: once
+    # the oldest trees are dropped, the new ones would get the seeds of trees
+    # already fitted. An integer random state is offset by every tree fitted so far
+    n_trees_fitted = getattr(clf, "n_trees_fitted_", len(clf.estimators_))
+    random_state = clf.random_state
+    if isinstance(random_state, int):
+        seeds = np.random.SeedSequence([random_state, n_trees_fitted])
+        clf.set_params(random_state=int(seeds.generate_state(1)[0]))
+
+    clf.set_params(
+        warm_start=True, n_estimators=len(clf.estimators_) + n_estimators, n_jobs=n_jobs
+    )
+    clf.fit(X, y)
+    clf.set_params(warm_start=False, random_state=random_state)
+    clf.n_trees_fitted_ = n_trees_fitted + n_estimators
+    windows += [data_window] * n_estimators
+
+    if max_estimators is not None and len(clf.estimators_) > max_estimators:
+        clf.estimators_ = clf.estimators_[-max_estimators:]
+        clf.n_estimators = max_estimators
+        windows = windows[-max_estimators:]
+    clf.tree_windows_ = windows
+    return clf
+
+
+def train_prefilter(
+    params: TrainModelParams,
+    prefilter_path: str,
+    clf: RandomForestClassifier,
+    X_train: Any,
+    y_train: Any,
+) -> None:
+    """Train the first stage of cascade scoring, calibrated on the validation set."""
+    prefilter = Prefilter.fit(X_train, y_train, params.seed)
+    X_valid, y_valid = load_dataset(params.valid_csv, params.data_format)
+    caught = (clf.predict(X_valid) == 1) & (y_valid == 1)
+    calibration = prefilter.calibrate(X_valid, caught, params.prefilter_recall_loss)
+    mlflow.log_param("prefilter_recall_loss", params.prefilter_recall_loss)  # type: ignore
+    mlflow.log_metrics(  # type: ignore
+        {f"prefilter_{name}": value for name, value in calibration.items()}
+    )
+    logger.info(
+        f"Pre-filter sends {calibration['stage_two_fraction']:.2%} of the validation "
+        f"rows to the model, clearing {calibration['recall_loss']:.2%} of the frauds "
+        "it catches"
+    )
+
+    os.makedirs(os.path.dirname(prefilter_path) or ".", exist_ok=True)
+    prefilter.save(prefilter_path)
+    # Logged with the model, for the API to load with the model version
+    mlflow.log_artifact(prefilter_path)  # type: ignore
+
+
+def build_drift_reference(
+    params: TrainModelParams,
+    drift_reference_path: str,
+    clf: RandomForestClassifier,
+    X_train: Any,
+) -> None:
+    """Build the histograms the API compares the served traffic with.
+
+    Features are binned on the training set, fraud probabilities on the validation
+    set, as the forest's probabilities on its own training rows are overconfident.
+    """
+    X_valid, _ = load_dataset(params.valid_csv, params.data_format)
+    reference = DriftReference.fit(
+        X_train, clf.predict_proba(X_valid)[:, 1], n_bins=params.drift_n_bins
+    )
+    os.makedirs(os.path.dirname(drift_reference_path) or ".", exist_ok=True)
+    reference.save(drift_reference_path)
+    mlflow.log_artifact(drift_reference_path)  # type: ignore
@@ -0,0 +1,342 @@
+"""Hyperparameter search for the random forest, by successive halving.
+
+Every candidate is first fitted on a small share of the training rows, and only the
+best ones are fitted again on more rows, up to all of them. The training and
+validation sets are loaded once into shared memory, which the worker processes
+fitting the candidates read without copying: the training rows are shuffled
+beforehand, so that every share of them is a slice of the shared array.
+"""
+
+import json
+import logging
+import math
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import product
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.fraud_detector.constants import MLFLOW_TRACKING_URI
+from src.fraud_detector.dataset import load_dataset
+from src.fraud_detector.types import TuneModelParams
+
+logger = logging.getLogger(__name__)
+
+# Name, shape and dtype of an array in shared memory
+ArraySpec = tuple[str, tuple[int, ...], str]
+
+# Searched parameters, as named in TrainModelParams and params.yaml, and the
+# RandomForestClassifier arguments they stand for
+SEARCHED_PARAMS = {
+    "n_estimators": "n_estimators",
+    "rfc_metric": "criterion",
+    "min_samples_leaf": "min_samples_leaf",
+}
+METRICS = ("average_precision", "roc_auc")
+
+# Datasets attached by the current worker process, and their shared memory blocks
+_worker_arrays: dict[str, NDArray[Any]] = {}
+_worker_memory: list[SharedMemory] = []
+
+
+@contextmanager
+def shared_arrays(
+    arrays: dict[str, NDArray[Any]],
+) -> Iterator[dict[str, ArraySpec]]:
+    """Copy arrays to shared memory, freed on exit.
+
+    Yields:
+        The spec of every array, with which `attach_array` maps it in another
+        process.
+    """
+    memory: list[SharedMemory] = []
+    specs: dict[str, ArraySpec] = {}
+    try:
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            memory.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+        yield specs
+    finally:
+        for block in memory:
+            block.close()
+            block.unlink()
+
+
+def attach_array(spec: ArraySpec) -> tuple[NDArray[Any], SharedMemory]:
+    """Map an array copied to shared memory by `shared_arrays`, without copying it.
+
+    Returns:
+        The array, and its memory block, to be kept open as long as it is used.
+    """
+    name, shape, dtype = spec
+    block = SharedMemory(name=name)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf), block
+
+
+def _init_worker(specs: dict[str, ArraySpec]) -> None:
+    for name, spec in specs.items():
+        array, block = attach_array(spec)
+        _worker_arrays[name] = array
+        _worker_memory.append(block)
+
+
+def stratified_order(y: NDArray[Any], seed: int) -> NDArray[np.intp]:
+    """Order of the rows in which the first ones are a stratified sample of all.
+
+    The rows of every class are shuffled, then interleaved in proportion to the
+    size of their class.
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.empty(len(y))
+    for label in np.unique(y):
+        rows = np.flatnonzero(y == label)
+        keys[rng.permutation(rows)] = np.arange(len(rows)) / len(rows)
+    return np.argsort(keys, kind="stable")
+
+
+def subsample_size(y: NDArray[Any], budget: float) -> int:
+    """Number of first rows in `stratified_order` making a share `budget` of them.
+
+    Every class keeps at least one row, so that rare frauds are never left out.
+    """
+    if budget >= 1.0:
+        return len(y)
+    _, counts = np.unique(y, return_counts=True)
+    return sum(
+        int(np.count_nonzero(np.arange(count) / count < budget)) for count in counts
+    )
+
+
+def score_candidate(
+    candidate: dict[str, Any],
+    budget: float,
+    seed: int,
+    metric: str,
+    arrays: dict[str, NDArray[Any]] | None = None,
+) -> float:
+    """Fit a candidate on a share `budget` of the training rows and score it.
+
+    Args:
+        candidate: Value of every parameter of `SEARCHED_PARAMS`.
+        budget: Share of the training rows to fit on.
+        seed: Random seed of the forest.
+        metric: One of `METRICS`, computed on the validation set.
+        arrays: X_train, y_train, X_valid and y_valid; those attached by the
+            worker process if None. The training rows are in `stratified_order`.
+
+    Returns:
+        The validation score, the higher the better.
+    """
+    from sklearn.ensemble import RandomForestClassifier  # type: ignore
+    from sklearn.metrics import average_precision_score, roc_auc_score  # type: ignore
+
+    arrays = _worker_arrays if arrays is None else arrays
+    n_rows = subsample_size(arrays["y_train"], budget)
+    clf = RandomForestClassifier(
+        # Candidates run in parallel, each on a single core
+        n_jobs=1,
+        random_state=seed,
+        verbose=False,
+        **{SEARCHED_PARAMS[name]: value for name, value in candidate.items()},
+    )
+    # A slice, fitted on as a view of the shared memory rather than a copy
+    clf.fit(arrays["X_train"][:n_rows], arrays["y_train"][:n_rows])
+    proba = clf.predict_proba(arrays["X_valid"])[:, 1]
+    score = average_precision_score if metric == "average_precision" else roc_auc_score
+    return float(score(arrays["y_valid"], proba))
+
+
+def budgets(min_budget: float, eta: int) -> list[float]:
+    """Share of the training rows of every round, up to all of them in the last one.
+
+    Every round has eta times more rows than the previous one, and the first one at
+    least `min_budget`.
+    """
+    if not 0.0 < min_budget <= 1.0 or eta < 2:
+        raise ValueError("min_budget must be in (0, 1] and eta at least 2")
+    n_rounds = 1 + math.floor(math.log(1.0 / min_budget, eta) + 1e-9)
+    return [float(eta) ** -k for k in reversed(range(n_rounds))]
+
+
+def successive_halving(
+    candidates: list[dict[str, Any]],
+    evaluate: Callable[[list[dict[str, Any]], float], list[float]],
+    min_budget: float,
+    eta: int,
+) -> list[dict[str, Any]]:
+    """Search the best candidate, keeping the best 1/eta of them after every round.
+
+    A round fits the remaining candidates on eta times more rows than the previous
+    one. Once a single candidate remains, it goes straight to the last round, on
+    all the rows.
+
+    Args:
+        candidates: Parameters of every candidate.
+        evaluate: Scores of candidates fitted on a share of the training rows.
+        min_budget: Share of the training rows of the first round.
+        eta: Reduction factor between rounds.
+
+    Returns:
+        Every trial, with its round, budget, candidate and score. The best
+        candidate is the one of the best trial of the last round.
+    """
+    rounds = budgets(min_budget, eta)
+    trials: list[dict[str, Any]] = []
+    for rung, budget in enumerate(rounds):
+        if len(candidates) == 1:
+            rung, budget = len(rounds) - 1, rounds[-1]
+        scores = evaluate(candidates, budget)
+        trials.extend(
+            {"round": rung, "budget": budget, "params": candidate, "score": score}
+            for candidate, score in zip(candidates, scores, strict=True)
+        )
+        if budget == rounds[-1]:
+            break
+        ranked = sorted(
+            range(len(candidates)), key=lambda index: scores[index], reverse=True
+        )
+        candidates = [
+            candidates[index] for index in ranked[: math.ceil(len(candidates) / eta)]
+        ]
+    return trials
+
+
+def best_trial(trials: list[dict[str, Any]]) -> dict[str, Any]:
+    """Best trial of the last round of `successive_halving`."""
+    last_round = max(trial["round"] for trial in trials)
+    return max(
+        (trial for trial in trials if trial["round"] == last_round),
+        key=lambda trial: trial["score"],
+    )
+
+
+def tune_model(params: TuneModelParams) -> dict[str, Any]:
+    """Search the parameters of the forest, logging every trial to MLflow.
+
+    Trials are logged as nested runs of a single tuning run.
+
+    Returns:
+        The best parameters, as named in TrainModelParams.
+    """
+    import mlflow  # type: ignore
+
+    if params.metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}, got {params.metric!r}")
+    candidates = [
+        dict(zip(SEARCHED_PARAMS, values, strict=True))
+        for values in product(
+            params.n_estimators, params.rfc_metric, params.min_samples_leaf
+        )
+    ]
+
+    X_train, y_train = load_dataset(params.train_csv, params.data_format)
+    X_valid, y_valid = load_dataset(params.valid_csv, params.data_format)
+    arrays = {
+        # Row-major float32, as sklearn fits trees on, so workers never convert
+        "X_train": np.ascontiguousarray(X_train, dtype=np.float32),
+        "y_train": np.asarray(y_train),
+        "X_valid": np.ascontiguousarray(X_valid, dtype=np.float32),
+        "y_valid": np.asarray(y_valid),
+    }
+    del X_train, y_train, X_valid, y_valid
+    order = stratified_order(arrays["y_train"], params.seed)
+    arrays["X_train"] = arrays["X_train"][order]
+    arrays["y_train"] = arrays["y_train"][order]
+
+    mlflow.set_tracking_uri(  # type: ignore
+        os.environ.get("MLFLOW_TRACKING_URI", MLFLOW_TRACKING_URI)
+    )
+    with (
+        shared_arrays(arrays) as specs,
+        ProcessPoolExecutor(
+            max_workers=params.n_workers, initializer=_init_worker, initargs=(specs,)
+        ) as pool,
+        mlflow.start_run(run_name="tune"),  # type: ignore
+    ):
+        mlflow.log_params(  # type: ignore
+            {
+                "n_candidates": len(candidates),
+                "min_budget": params.min_budget,
+                "eta": params.eta,
+                "metric": params.metric,
+                "seed": params.seed,
+            }
+        )
+
+        def evaluate(
+            round_candidates: list[dict[str, Any]], budget: float
+        ) -> list[float]:
+            futures = [
+                pool.submit(
+                    score_candidate, candidate, budget, params.seed, params.metric
+                )
+                for candidate in round_candidates
+            ]
+            scores = [future.result() for future in futures]
+            for candidate, score in zip(round_candidates, scores, strict=True):
+                with mlflow.start_run(nested=True):  # type: ignore
+                    mlflow.log_params({**candidate, "budget": budget})  # type: ignore
+                    mlflow.log_metric(params.metric, score)  # type: ignore
+            logger.info(
+                "Scored %d candidates on %.0f%% of the rows, best %s: %.4f",
+                len(scores),
+                100 * budget,
+                params.metric,
+                max(scores),
+            )
+            return scores
+
+        trials = successive_halving(candidates, evaluate, params.min_budget, params.eta)
+        best = best_trial(trials)
+        mlflow.log_params({f"best_{k}": v for k, v in best["params"].items()})  # type: ignore
+        mlflow.log_metric(f"best_{params.metric}", best["score"])  # type: ignore
+
+    os.makedirs(os.path.dirname(params.report_path) or ".", exist_ok=True)
+    with open(params.report_path, "w") as f:
+        json.dump(
+            {"metric": params.metric, "best": best, "trials": trials}, f, indent=4
+        )
+    logger.info(
+        "Best parameters %s, %s: %.4f", best["params"], params.metric, best["score"]
+    )
+    return dict(best["params"])
+
+
+def write_train_params(params_path: str, values: dict[str, Any]) -> None:
+    """Set parameters of the train section of a params.yaml, keeping its layout.
+
+    Lines are edited in place, so that comments, quoting and line endings are kept.
+
+    Raises:
+        KeyError: If a parameter is not in the train section.
+    """
+    with open(params_path, newline="") as f:
+        lines = f.readlines()
+
+    remaining = dict(values)
+    in_train = False
+    for index, line in enumerate(lines):
+        if line.strip() and not line[0].isspace():
+            in_train = line.startswith("train:")
+            continue
+        key, sep, rest = line.strip(" \t").partition(":")
+        if not in_train or not sep or key not in remaining:
+            continue
+        value = remaining.pop(key)
+        old_value = rest.split("#", 1)[0].strip()
+        quote = old_value[0] if old_value[:1] in ("'", '"') else ""
+        new_value = f"{quote}{value}{quote}" if isinstance(value, str) else str(value)
+        prefix = line[: line.index(key) + len(key) + 1]
+        lines[index] = prefix + rest.replace(old_value, new_value, 1)
+
+    if remaining:
+        raise KeyError(f"Not in the train section of {params_path}: {list(remaining)}")
+    with open(params_path, "w", newline="") as f:
+        f.writelines(lines)
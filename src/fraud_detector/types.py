@@ -1,5 +1,7 @@
 # mypy: ignore-errors
-from pydantic import BaseModel, Field, ConfigDict, Extra
+import math
+
+from pydantic import BaseModel, Field, ConfigDict, Extra, model_validator
 from typing import List
 
 
@@ -7,6 +9,9 @@ class PrepareModelParams(BaseModel):
     raw_data: str
     split: float
     seed: int
+    mode: str = "memory"  # "memory" or "streaming", see `prepare_data`
+    chunk_size: int = 100_000
+    data_format: str = "csv"  # "csv" or "npy", see `save_dataset`
 
 
 class TrainModelParams(BaseModel):
@@ -18,6 +23,48 @@ class TrainModelParams(BaseModel):
     rfc_metric: str
     n_estimators: int
     n_jobs: int
+    data_format: str = "csv"
+    min_samples_leaf: int = 1
+    # "full" refits `n_estimators` trees on `train_csv`; "incremental" adds them,
+    # fitted on `train_csv` only, to `base_model`, see `extend_forest`
+    mode: str = "full"
+    base_model: str | None = None  # Path or MLflow model URI, `model_path` if None
+    data_window: str | None = None  # Label of `train_csv`, its path if None
+    max_estimators: int | None = None  # Number of most recent trees to keep
+    # Pre-filter of cascade scoring, not trained when None, see `Prefilter`
+    prefilter_path: str | None = None
+    prefilter_recall_loss: float = 0.01
+    # Histograms of the training data, to monitor the drift of the served traffic,
+    # not built when None, see `DriftReference`
+    drift_reference_path: str | None = None
+    drift_n_bins: int = 20
+
+
+class TuneModelParams(BaseModel):
+    train_csv: str
+    valid_csv: str
+    seed: int
+    data_format: str = "csv"
+    # Search space, every combination being a candidate
+    n_estimators: list[int]
+    rfc_metric: list[str]
+    min_samples_leaf: list[int] = [1]
+    # Successive halving, see `successive_halving`
+    min_budget: float
+    eta: int = 3
+    metric: str = "average_precision"  # "average_precision" or "roc_auc"
+    n_workers: int
+    report_path: str
+
+
+class ScoreFileParams(BaseModel):
+    input_path: str
+    output_path: str
+    model_path: str
+    chunk_size: int
+    n_workers: int
+    engine: str = "compiled"
+    resume: bool = False
 
 
 class EvaluateModelParams(BaseModel):
@@ -25,6 +72,28 @@ class EvaluateModelParams(BaseModel):
     valid_csv: str
     evaluation_path: str
     seed: int
+    data_format: str = "csv"
+    curve_path: str | None = None  # CSV of the metrics at every threshold
+    chunk_size: int = 100_000  # Rows scored at once
+    threshold: float = 0.5  # One of the grid of n_thresholds
+    n_thresholds: int = 1000
+    cost_fp: float = 1.0
+    cost_fn: float = 25.0
+    n_bootstrap: int = 200  # No confidence intervals if 0
+    confidence: float = 0.95
+
+    @model_validator(mode="after")
+    def check_threshold(self) -> "EvaluateModelParams":
+        # Rows are only counted at the thresholds of the grid
+        steps = self.threshold * self.n_thresholds
+        if not 0.0 <= self.threshold <= 1.0 or not math.isclose(
+            steps, round(steps), abs_tol=1e-6
+        ):
+            raise ValueError(
+                f"threshold must be a multiple of 1/n_thresholds between 0 and 1, "
+                f"got {self.threshold} with n_thresholds={self.n_thresholds}"
+            )
+        return self
 
 
 # Added API Prediction Models
@@ -73,5 +142,54 @@ class PredictionInputBatch(BaseModel):
     inputs: List[PredictionInput]
 
 
+class PredictionInputColumns(BaseModel):
+    """Batch of inputs as one array per feature, validated array by array."""
+
+    model_config = ConfigDict(extra=Extra.forbid)
+
+    time: List[int] = Field(..., alias="Time")
+    v1: List[float] = Field(..., alias="V1")
+    v2: List[float] = Field(..., alias="V2")
+    v3: List[float] = Field(..., alias="V3")
+    v4: List[float] = Field(..., alias="V4")
+    v5: List[float] = Field(..., alias="V5")
+    v6: List[float] = Field(..., alias="V6")
+    v7: List[float] = Field(..., alias="V7")
+    v8: List[float] = Field(..., alias="V8")
+    v9: List[float] = Field(..., alias="V9")
+    v10: List[float] = Field(..., alias="V10")
+    v11: List[float] = Field(..., alias="V11")
+    v12: List[float] = Field(..., alias="V12")
+    v13: List[float] = Field(..., alias="V13")
+    v14: List[float] = Field(..., alias="V14")
+    v15: List[float] = Field(..., alias="V15")
+    v16: List[float] = Field(..., alias="V16")
+    v17: List[float] = Field(..., alias="V17")
+    v18: List[float] = Field(..., alias="V18")
+    v19: List[float] = Field(..., alias="V19")
+    v20: List[float] = Field(..., alias="V20")
+    v21: List[float] = Field(..., alias="V21")
+    v22: List[float] = Field(..., alias="V22")
+    v23: List[float] = Field(..., alias="V23")
+    v24: List[float] = Field(..., alias="V24")
+    v25: List[float] = Field(..., alias="V25")
+    v26: List[float] = Field(..., alias="V26")
+    v27: List[float] = Field(..., alias="V27")
+    v28: List[float] = Field(..., alias="V28")
+    amount: List[float] = Field(..., alias="Amount")
+
+    @model_validator(mode="after")
+    def check_lengths(self) -> "PredictionInputColumns":
+        lengths = {len(values) for values in self.__dict__.values()}
+        if len(lengths) > 1:
+            raise ValueError(
+                f"All feature arrays must have the same length, got {lengths}"
+            )
+        return self
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
 class PredictionOutputBatch(BaseModel):
     predictions: List[int]  # or the appropriate type based on your model's output
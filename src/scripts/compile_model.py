@@ -0,0 +1,92 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+import joblib  # type: ignore
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from src.fraud_detector.compact import compact_forest, compaction_report
+from src.fraud_detector.dataset import load_dataset
+from src.fraud_detector.inference import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    Entrypoint for compiling the trained model into a memory-mappable forest.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compile the trained model for memory-mapped serving."
+    )
+    parser.add_argument(
+        "--model_path", type=str, required=True, help="Path to the trained model"
+    )
+    parser.add_argument(
+        "--compiled_path",
+        type=str,
+        required=True,
+        help="Directory to save the compiled forest to",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store float32 thresholds, one probability per leaf and prune subtrees",
+    )
+    parser.add_argument(
+        "--prune_tolerance",
+        type=float,
+        default=0.0,
+        help="Largest change in the predicted probabilities allowed by pruning",
+    )
+    parser.add_argument(
+        "--valid_csv",
+        type=str,
+        default=None,
+        help="Path to validation CSV, to compare the compact forest with the model",
+    )
+    parser.add_argument(
+        "--data_format",
+        type=str,
+        default="csv",
+        choices=["csv", "npy"],
+        help="Format of the processed data",
+    )
+    parser.add_argument(
+        "--report_path",
+        type=str,
+        default=None,
+        help="Path to save the comparison of the compact forest with the model",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    forest = CompiledForest.from_estimator(joblib.load(args.model_path))
+    n_nodes = len(forest.feature)
+    if args.compact:
+        forest = compact_forest(forest, args.prune_tolerance)
+        logger.info(f"Compacted {n_nodes} nodes to {len(forest.feature)}")
+    forest.save(args.compiled_path)
+    logger.info(
+        f"Compiled {forest.n_trees} trees ({len(forest.feature)} nodes) "
+        f"to {args.compiled_path}"
+    )
+
+    if args.report_path:
+        X, y = (
+            load_dataset(args.valid_csv, args.data_format)
+            if args.valid_csv
+            else (None, None)
+        )
+        report = compaction_report(args.model_path, args.compiled_path, X, y)
+        os.makedirs(os.path.dirname(args.report_path) or ".", exist_ok=True)
+        with open(args.report_path, "w") as f:
+            json.dump(report, f, indent=4)
+        logger.info(f"Compaction report: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,55 @@ def main() -> None:
         help="Path to save evaluation metrics",
     )
     parser.add_argument("--seed", type=int, required=True, help="Random seed")
+    parser.add_argument(
+        "--data_format",
+        type=str,
+        default="csv",
+        choices=["csv", "npy"],
+        help="Format of the processed data",
+    )
+    parser.add_argument(
+        "--curve_path",
+        type=str,
+        default=None,
+        help="Path to save the metrics at every threshold",
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=100_000, help="Number of rows scored at once"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Threshold of the reported metrics",
+    )
+    parser.add_argument(
+        "--n_thresholds", type=int, default=1000, help="Number of thresholds swept"
+    )
+    parser.add_argument(
+        "--cost_fp",
+        type=float,
+        default=1.0,
+        help="Cost of a legitimate transaction predicted as a fraud",
+    )
+    parser.add_argument(
+        "--cost_fn",
+        type=float,
+        default=25.0,
+        help="Cost of a fraud predicted as legitimate",
+    )
+    parser.add_argument(
+        "--n_bootstrap",
+        type=int,
+        default=200,
+        help="Number of bootstrap resamples of the confidence intervals",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Level of the confidence intervals",
+    )
     args = parser.parse_args()
 
     params = EvaluateModelParams(
@@ -29,6 +78,15 @@ def main() -> None:
         valid_csv=args.valid_csv,
         evaluation_path=args.evaluation_path,
         seed=args.seed,
+        data_format=args.data_format,
+        curve_path=args.curve_path,
+        chunk_size=args.chunk_size,
+        threshold=args.threshold,
+        n_thresholds=args.n_thresholds,
+        cost_fp=args.cost_fp,
+        cost_fn=args.cost_fn,
+        n_bootstrap=args.n_bootstrap,
+        confidence=args.confidence,
     )
 
     evaluate_model(params)
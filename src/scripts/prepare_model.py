@@ -14,10 +14,35 @@ def main() -> None:
     )
     parser.add_argument("--split", type=float, required=True, help="Data split ratio")
     parser.add_argument("--seed", type=int, required=True, help="Random seed")
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="memory",
+        choices=["memory", "streaming"],
+        help="Split the data in memory or chunk by chunk",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100_000,
+        help="Rows per chunk in streaming mode",
+    )
+    parser.add_argument(
+        "--data_format",
+        type=str,
+        default="csv",
+        choices=["csv", "npy"],
+        help="Format of the processed data",
+    )
     args = parser.parse_args()
 
     params = PrepareModelParams(
-        raw_data=args.raw_data_path, split=args.split, seed=args.seed
+        raw_data=args.raw_data_path,
+        split=args.split,
+        seed=args.seed,
+        mode=args.mode,
+        chunk_size=args.chunk_size,
+        data_format=args.data_format,
     )
 
     prepare_data(params)
@@ -0,0 +1,91 @@
+import argparse
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from src.benchmarks.harness import compare, read_results, write_results
+from src.benchmarks.serving import run_serving_benchmarks
+from src.benchmarks.synthetic import fit_model
+from src.benchmarks.training import run_training_benchmarks
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    Entrypoint for benchmarking the serving and training hot paths.
+
+    Exits with an error when a result regressed beyond the threshold from the
+    baseline.
+    """
+    parser = argparse.ArgumentParser(description="Run the benchmarks.")
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default="metrics/benchmarks.json",
+        help="Path to save the results to",
+    )
+    parser.add_argument(
+        "--baseline_path",
+        type=str,
+        default=None,
+        help="Path to the results of a previous run to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed relative regression from the baseline",
+    )
+    parser.add_argument(
+        "--suite",
+        type=str,
+        default="all",
+        choices=["all", "serving", "training"],
+        help="Benchmarks to run",
+    )
+    parser.add_argument(
+        "--model_path",
+        type=str,
+        default=None,
+        help="Model to serve; by default, one fitted on synthetic data",
+    )
+    parser.add_argument(
+        "--n_rows", type=int, default=100_000, help="Number of synthetic transactions"
+    )
+    parser.add_argument(
+        "--n_estimators", type=int, default=100, help="Number of trees of the models"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.suite in ("all", "training"):
+            results.update(
+                run_training_benchmarks(work_dir, args.n_rows, args.n_estimators)
+            )
+        if args.suite in ("all", "serving"):
+            model_path = args.model_path
+            if model_path is None:
+                model_path = f"{work_dir}/synthetic_model.pkl"
+                fit_model(model_path, args.n_rows, args.n_estimators)
+            results.update(run_serving_benchmarks(model_path, work_dir))
+
+    Path(args.output_path).parent.mkdir(parents=True, exist_ok=True)
+    write_results(args.output_path, results)
+    for name, result in results.items():
+        logger.info(f"{name}: {result['value']:.6g} {result['unit']}")
+
+    if args.baseline_path is not None:
+        regressions = compare(results, read_results(args.baseline_path), args.threshold)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from src.fraud_detector.score import score_file
+from src.fraud_detector.types import ScoreFileParams
+
+
+def main() -> None:
+    """
+    Entrypoint for scoring a CSV or Parquet file offline with the trained model.
+    """
+    parser = argparse.ArgumentParser(description="Score a file of transactions.")
+    parser.add_argument(
+        "--input_path", type=str, required=True, help="Path to a CSV or Parquet file"
+    )
+    parser.add_argument(
+        "--output_path", type=str, required=True, help="Path to the output CSV"
+    )
+    parser.add_argument(
+        "--model_path", type=str, default="models/model.pkl", help="Path to the model"
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=100_000, help="Number of rows per chunk"
+    )
+    parser.add_argument(
+        "--n_workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of scoring processes",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        default="compiled",
+        choices=["compiled", "sklearn"],
+        help="Inference engine",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the last finished chunk of a previous run",
+    )
+    args = parser.parse_args()
+
+    params = ScoreFileParams(
+        input_path=args.input_path,
+        output_path=args.output_path,
+        model_path=args.model_path,
+        chunk_size=args.chunk_size,
+        n_workers=args.n_workers,
+        engine=args.engine,
+        resume=args.resume,
+    )
+
+    logging.basicConfig(level=logging.INFO)
+    score_file(params)
+
+
+if __name__ == "__main__":
+    main()
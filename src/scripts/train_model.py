@@ -30,6 +30,69 @@ def main() -> None:
     parser.add_argument(
         "--n_jobs", type=int, required=True, help="Number of parallel jobs for RFC"
     )
+    parser.add_argument(
+        "--min_samples_leaf",
+        type=int,
+        default=1,
+        help="Minimum number of samples per leaf for RFC",
+    )
+    parser.add_argument(
+        "--data_format",
+        type=str,
+        default="csv",
+        choices=["csv", "npy"],
+        help="Format of the processed data",
+    )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="full",
+        choices=["full", "incremental"],
+        help="Refit the model, or add trees fitted on the training data to it",
+    )
+    parser.add_argument(
+        "--base_model",
+        type=str,
+        default=None,
+        help="Model to add trees to in incremental mode, a path or an MLflow URI "
+        "such as models:/fraud-detector/Production; the model path by default",
+    )
+    parser.add_argument(
+        "--data_window",
+        type=str,
+        default=None,
+        help="Label of the training data recorded for its trees; its path by default",
+    )
+    parser.add_argument(
+        "--max_estimators",
+        type=int,
+        default=None,
+        help="Number of most recent trees to keep in incremental mode",
+    )
+    parser.add_argument(
+        "--prefilter_path",
+        type=str,
+        default=None,
+        help="Path to save the cascade pre-filter, not trained if not set",
+    )
+    parser.add_argument(
+        "--prefilter_recall_loss",
+        type=float,
+        default=0.01,
+        help="Share of the frauds caught by the model the pre-filter may clear",
+    )
+    parser.add_argument(
+        "--drift_reference_path",
+        type=str,
+        default=None,
+        help="Path to save the histograms of the training data, not built if not set",
+    )
+    parser.add_argument(
+        "--drift_n_bins",
+        type=int,
+        default=20,
+        help="Largest number of bins of every drift histogram",
+    )
     args = parser.parse_args()
 
     params = TrainModelParams(
@@ -41,6 +104,16 @@ def main() -> None:
         rfc_metric=args.rfc_metric,
         n_estimators=args.n_estimators,
         n_jobs=args.n_jobs,
+        min_samples_leaf=args.min_samples_leaf,
+        data_format=args.data_format,
+        mode=args.mode,
+        base_model=args.base_model,
+        data_window=args.data_window,
+        max_estimators=args.max_estimators,
+        prefilter_path=args.prefilter_path,
+        prefilter_recall_loss=args.prefilter_recall_loss,
+        drift_reference_path=args.drift_reference_path,
+        drift_n_bins=args.drift_n_bins,
     )
 
     train_model(params)  # Updated to pass the params object directly
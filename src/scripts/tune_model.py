@@ -0,0 +1,53 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import yaml  # type: ignore
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from src.fraud_detector.constants import PARAMETERS_YAML_PATH
+from src.fraud_detector.tune import tune_model, write_train_params
+from src.fraud_detector.types import TuneModelParams
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    Entrypoint for searching the parameters of the model, from the tune section of
+    params.yaml, and writing the best ones to its train section.
+    """
+    parser = argparse.ArgumentParser(description="Tune the fraud detection model.")
+    parser.add_argument(
+        "--params_path",
+        type=str,
+        default=str(PARAMETERS_YAML_PATH),
+        help="Path to params.yaml",
+    )
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only report the best parameters, without writing them to params.yaml",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.params_path) as f:
+        config = yaml.safe_load(f)
+    params = TuneModelParams(
+        train_csv=config["train"]["train_csv"],
+        valid_csv=config["train"]["valid_csv"],
+        seed=config["train"]["seed"],
+        data_format=config["prepare"].get("data_format", "csv"),
+        **config["tune"],
+    )
+
+    best_params = tune_model(params)
+    if not args.dry_run:
+        write_train_params(args.params_path, best_params)
+        logger.info(f"Wrote {best_params} to {args.params_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Tests for `api/audit.py`."""
+
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.api.audit import (
+    IN_PROGRESS_SUFFIX,
+    AuditLog,
+    AuditRecord,
+    RotatingWriter,
+    records_table,
+)
+from src.fraud_detector.constants import PREDICTORS
+
+
+def _record(n_rows: int, request_id: str = "req") -> AuditRecord:
+    return AuditRecord(
+        features=np.full((n_rows, len(PREDICTORS)), 1.5, dtype=np.float32),
+        predictions=np.arange(n_rows) % 2,
+        scores=np.linspace(0, 1, n_rows),
+        model_version="v1",
+        route="/predict_batch",
+        request_id=request_id,
+        received_at_ns=1_700_000_000_000_000_000,
+        latency_s=0.01,
+    )
+
+
+def _read(directory: Path) -> pa.Table:
+    files = sorted(directory.glob("audit-*.parquet"))
+    return pa.concat_tables([pq.read_table(path) for path in files])
+
+
+def test_audit_log_writes_every_transaction(tmp_path: Path) -> None:
+    audit_log = AuditLog(RotatingWriter(str(tmp_path)), flush_rows=4)
+    audit_log.start()
+    for i in range(5):
+        assert audit_log.submit(_record(3, request_id=f"req-{i}"))
+    audit_log.stop()
+
+    table = _read(tmp_path)
+    assert table.num_rows == 15
+    assert table.column("request_id").to_pylist()[:4] == ["req-0"] * 3 + ["req-1"]
+    assert set(table.column_names) >= {*PREDICTORS, "prediction", "score"}
+    assert table.column("v1").to_pylist() == [1.5] * 15
+    assert audit_log.stats()["written"] == 15
+    assert not list(tmp_path.glob(f"*{IN_PROGRESS_SUFFIX}"))
+
+
+def test_rotating_writer_rotates_by_size(tmp_path: Path) -> None:
+    writer = RotatingWriter(str(tmp_path), file_format="arrow", rotate_bytes=1)
+    for _ in range(3):
+        writer.write(records_table([_record(2)]))
+
+    files = sorted(tmp_path.glob("audit-*.arrow"))
+    assert len(files) == writer.files_written == 3
+    with pa.OSFile(str(files[0])) as f:
+        assert pa.ipc.open_file(f).read_all().num_rows == 2
+
+
+def test_rotating_writer_rotates_by_age(tmp_path: Path) -> None:
+    writer = RotatingWriter(str(tmp_path), rotate_interval_s=0.0)
+    writer.write(pa.table({"a": [1]}))
+    assert writer.files_written == 1
+    assert os.listdir(tmp_path)[0].endswith(".parquet")
+
+
+def test_audit_log_waits_for_room_when_full(tmp_path: Path) -> None:
+    audit_log = AuditLog(RotatingWriter(str(tmp_path)), max_queued_rows=4)
+    assert audit_log.submit(_record(3))
+    assert not audit_log.submit(_record(3))
+
+    # A blocked submit goes through once the writer has taken the queue
+    submitted = threading.Thread(target=audit_log.submit, args=(_record(3), True))
+    submitted.start()
+    audit_log.start()
+    submitted.join(timeout=10)
+    assert not submitted.is_alive()
+    audit_log.stop()
+    assert audit_log.stats()["written"] == 6
+
+
+def test_audit_log_samples_when_full(tmp_path: Path) -> None:
+    audit_log = AuditLog(
+        RotatingWriter(str(tmp_path)), max_queued_rows=100, overflow="sample"
+    )
+    assert audit_log.submit(_record(75))
+    # Half of the room left: each transaction is kept with a probability of 1/2
+    assert audit_log.submit(_record(1000))
+    stats = audit_log.stats()
+    assert 0 < stats["dropped"] < 1000
+    assert stats["queued"] == 75 + 1000 - stats["dropped"]
+
+    audit_log.start()
+    audit_log.stop()
+    sample_rates = _read(tmp_path).column("sample_rate").to_numpy()
+    assert sample_rates[:75] == pytest.approx(1.0)
+    assert sample_rates[75:] == pytest.approx(0.5)
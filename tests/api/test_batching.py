@@ -0,0 +1,53 @@
+"""Tests for `api/batching.py`."""
+
+import numpy as np
+import pytest
+
+from src.api.batching import MicroBatcher
+
+
+def _double_first_feature(X: np.ndarray) -> np.ndarray:
+    return X[:, 0] * 2
+
+
+def test_micro_batcher_scores_queued_rows_together() -> None:
+    batcher = MicroBatcher(_double_first_feature, n_features=3, max_batch_size=4)
+    rows = [np.full((1, 3), i, dtype=np.float32) for i in range(10)]
+    # Queue everything before starting, so that rows are gathered into full batches
+    futures = [batcher.submit(row) for row in rows]
+    batcher.start()
+
+    assert [future.result(timeout=5) for future in futures] == [
+        2 * i for i in range(10)
+    ]
+    batcher.stop()
+    stats = batcher.stats()
+    assert stats["rows"] == 10
+    assert stats["batch_sizes"] == {4: 2, 2: 1}
+
+
+def test_micro_batcher_propagates_errors() -> None:
+    def fail(X: np.ndarray) -> np.ndarray:
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fail, n_features=3)
+    batcher.start()
+    future = batcher.submit(np.zeros(3, dtype=np.float32))
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    batcher.stop()
+
+
+def test_micro_batcher_survives_scores_of_the_wrong_length() -> None:
+    def short(X: np.ndarray) -> np.ndarray:
+        return X[:-1, 0] if len(X) > 1 else X[:, 0]
+
+    batcher = MicroBatcher(short, n_features=3, max_batch_size=2)
+    futures = [batcher.submit(np.zeros(3, dtype=np.float32)) for _ in range(2)]
+    batcher.start()
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    # The thread is still serving
+    assert batcher.submit(np.ones(3, dtype=np.float32)).result(timeout=5) == 1
+    batcher.stop()
@@ -0,0 +1,56 @@
+"""Tests for `api/binary.py`."""
+
+import struct
+
+import numpy as np
+import pytest
+
+from src.api.binary import (
+    RAW_MAGIC,
+    BinaryFormatError,
+    decode_arrow,
+    decode_raw,
+    encode_arrow,
+    encode_raw,
+)
+from src.fraud_detector.constants import PREDICTORS
+
+
+def test_raw_round_trip_without_copy() -> None:
+    matrix = np.arange(2 * len(PREDICTORS), dtype=np.float32).reshape(2, -1)
+    body = encode_raw(matrix, PREDICTORS)
+    decoded = decode_raw(body)
+    np.testing.assert_array_equal(decoded, matrix)
+    assert not decoded.flags.owndata
+
+
+def test_raw_rejects_wrong_columns() -> None:
+    body = encode_raw(np.zeros((1, 2), dtype=np.float32), ["time", "amount"])
+    with pytest.raises(BinaryFormatError):
+        decode_raw(body)
+
+
+def test_raw_rejects_truncated_payload() -> None:
+    body = encode_raw(np.zeros((2, len(PREDICTORS))), PREDICTORS)
+    with pytest.raises(BinaryFormatError):
+        decode_raw(body[:-4])
+
+
+def test_raw_rejects_column_count_not_matching_names() -> None:
+    body = encode_raw(np.zeros((2, len(PREDICTORS))), PREDICTORS)
+    # As many values, laid out as a single row twice as wide
+    header = struct.pack("<4sII", RAW_MAGIC, 1, 2 * len(PREDICTORS))
+    with pytest.raises(BinaryFormatError):
+        decode_raw(header + body[len(header) :])
+
+
+def test_raw_rejects_names_not_utf8() -> None:
+    body = struct.pack("<4sIII", RAW_MAGIC, 0, 1, 4) + b"\xff\xfe\0\0"
+    with pytest.raises(BinaryFormatError):
+        decode_raw(body)
+
+
+def test_arrow_round_trip() -> None:
+    matrix = np.random.default_rng(0).normal(size=(3, len(PREDICTORS)))
+    body = encode_arrow({name: matrix[:, i] for i, name in enumerate(PREDICTORS)})
+    np.testing.assert_array_equal(decode_arrow(body), matrix.astype(np.float32))
@@ -0,0 +1,49 @@
+"""Tests for `api/cache.py`."""
+
+import numpy as np
+
+from src.api.cache import PredictionCache, deduplicate_rows, row_keys
+
+
+def test_row_keys_are_canonical() -> None:
+    features = np.array(
+        [[0.0, np.nan], [-0.0, -np.nan], [1.0, np.nan]], dtype=np.float32
+    )
+    keys = row_keys(features)
+    assert keys[0] == keys[1]
+    assert keys[0] != keys[2]
+
+
+def test_deduplicate_rows_maps_scores_back() -> None:
+    features = np.array([[1, 2], [3, 4], [1, 2], [5, 6], [3, 4]], dtype=np.float32)
+    distinct, inverse = deduplicate_rows(features)
+    assert len(distinct) == 3
+    np.testing.assert_array_equal(distinct[inverse], features)
+
+
+def test_prediction_cache_evicts_least_recently_used() -> None:
+    cache = PredictionCache(max_size=2, ttl_s=60)
+    assert cache.get(b"a", "v1") is None
+    cache.put(b"a", "v1", 0)
+    cache.put(b"b", "v1", 1)
+    assert cache.get(b"a", "v1") == 0
+    cache.put(b"c", "v1", 1)
+    assert cache.get(b"b", "v1") is None
+    assert cache.get(b"a", "v1") == 0
+    assert len(cache) == 2
+
+
+def test_prediction_cache_expires_and_invalidates() -> None:
+    cache = PredictionCache(max_size=10, ttl_s=0)
+    cache.get(b"a", "v1")
+    cache.put(b"a", "v1", 1)
+    assert cache.get(b"a", "v1") is None
+
+    cache = PredictionCache(max_size=10, ttl_s=60)
+    cache.get(b"a", "v1")
+    cache.put(b"a", "v1", 1)
+    # A new model version empties the cache, and late results of the previous
+    # version are not cached
+    assert cache.get(b"a", "v2") is None
+    cache.put(b"a", "v1", 1)
+    assert len(cache) == 0
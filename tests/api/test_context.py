@@ -0,0 +1,37 @@
+"""Tests for `api/context.py`."""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.context import RequestContextMiddleware, current_request
+
+app = FastAPI()
+app.add_middleware(RequestContextMiddleware)
+
+
+@app.get("/request_id")
+def request_id_route() -> dict[str, str | None]:
+    context = current_request()
+    return {"request_id": context.request_id if context else None}
+
+
+client = TestClient(app)
+
+
+def test_request_id_is_generated_and_sent_back() -> None:
+    response = client.get("/request_id")
+    request_id = response.json()["request_id"]
+    assert request_id
+    assert response.headers["x-request-id"] == request_id
+    assert client.get("/request_id").json()["request_id"] != request_id
+
+
+def test_request_id_of_client_is_kept() -> None:
+    response = client.get("/request_id", headers={"X-Request-ID": "abc-123"})
+    assert response.json()["request_id"] == "abc-123"
+    assert response.headers["x-request-id"] == "abc-123"
+
+
+def test_invalid_request_id_of_client_is_replaced() -> None:
+    response = client.get("/request_id", headers={"X-Request-ID": "x" * 1000})
+    assert response.json()["request_id"] != "x" * 1000
@@ -0,0 +1,60 @@
+"""Tests for `api/drift.py`."""
+
+import numpy as np
+
+from src.api.drift import DriftMonitor
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.drift import DriftReference
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _reference() -> DriftReference:
+    rng = np.random.default_rng(0)
+    return DriftReference.fit(
+        rng.normal(size=(2000, len(PREDICTORS))), rng.random(2000), n_bins=10
+    )
+
+
+def test_drift_monitor_windows_slide() -> None:
+    clock = _Clock()
+    monitor = DriftMonitor(
+        _reference(), windows_s=[60.0, 300.0], slot_s=60.0, clock=clock
+    )
+    rng = np.random.default_rng(1)
+    monitor.update(rng.normal(size=(100, len(PREDICTORS))).astype(np.float32))
+    clock.now = 120.0
+    # Shifted traffic, with fraud probabilities
+    monitor.update(
+        rng.normal(3.0, size=(50, len(PREDICTORS))).astype(np.float32),
+        rng.random(50),
+    )
+
+    report = monitor.report()
+    assert report["60s"]["rows"] == 50
+    assert report["60s"]["scored_rows"] == 50
+    assert "v1" in report["60s"]["drifted"]
+    assert "score" not in report["60s"]["drifted"]
+    assert report["300s"]["rows"] == 150
+
+    clock.now = 1000.0
+    report = monitor.report()
+    assert report["300s"]["rows"] == 0
+    assert report["300s"]["histograms"] == {}
+
+
+def test_drift_monitor_memory_is_fixed() -> None:
+    clock = _Clock()
+    monitor = DriftMonitor(_reference(), windows_s=[300.0], slot_s=60.0, clock=clock)
+    row = np.zeros((1, len(PREDICTORS)), dtype=np.float32)
+    for second in range(0, 3600, 10):
+        clock.now = float(second)
+        monitor.update(row)
+    assert monitor._slots.shape[0] == 5
+    assert monitor.report()["300s"]["rows"] == 30
@@ -0,0 +1,91 @@
+"""Tests for `api/executor.py`."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.api.executor import InferenceExecutor
+
+
+class _SumEngine:
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X.sum(axis=1)
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_inference_executor_runs_engine(kind: str) -> None:
+    executor = InferenceExecutor(_SumEngine(), kind=kind, max_workers=1)  # type: ignore[arg-type]
+    X = np.ones((3, 2), dtype=np.float32)
+    try:
+        result = asyncio.run(executor.run("predict", X))
+    finally:
+        executor.shutdown()
+    np.testing.assert_array_equal(result, [2.0, 2.0, 2.0])
+
+
+class _CountingEngine:
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_counted(X)[0]
+
+    def predict_counted(self, X: np.ndarray) -> tuple[np.ndarray, int]:
+        return X.sum(axis=1), int((X[:, 0] > 0).sum())
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_inference_executor_counts_model_rows_in_serving_process(kind: str) -> None:
+    executor = InferenceExecutor(_CountingEngine(), kind=kind, max_workers=1)  # type: ignore[arg-type]
+    X = np.array([[1.0, 1.0], [0.0, 1.0], [2.0, 0.0]], dtype=np.float32)
+    try:
+        result = asyncio.run(executor.run("predict", X))
+        asyncio.run(executor.run("predict", X[:1]))
+        stats = executor.stats()
+    finally:
+        executor.shutdown()
+    np.testing.assert_array_equal(result, [2.0, 1.0, 2.0])
+    assert stats == {"rows": 4, "model_rows": 3}
+
+
+class _ShardRecordingEngine:
+    def __init__(self) -> None:
+        self.shard_sizes: list[int] = []
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        self.shard_sizes.append(len(X))
+        return np.column_stack([X[:, 0], -X[:, 0]])
+
+
+def test_large_batches_are_scored_in_row_shards() -> None:
+    engine = _ShardRecordingEngine()
+    executor = InferenceExecutor(
+        engine,  # type: ignore[arg-type]
+        kind="thread",
+        max_workers=4,
+        parallel_min_rows=100,
+    )
+    assert [executor.n_shards(n) for n in (1, 99, 100, 101, 250, 10_000)] == [
+        1,
+        1,
+        1,
+        2,
+        3,
+        4,
+    ]
+    X = np.arange(1000, dtype=np.float32).reshape(-1, 2)
+    try:
+        small = asyncio.run(executor.run("predict_proba", X[:50]))
+        assert engine.shard_sizes == [50]
+        large = asyncio.run(executor.run("predict_proba", X))
+    finally:
+        executor.shutdown()
+    assert sorted(engine.shard_sizes[1:]) == [125, 125, 125, 125]
+    np.testing.assert_array_equal(small, np.column_stack([X[:50, 0], -X[:50, 0]]))
+    np.testing.assert_array_equal(large, np.column_stack([X[:, 0], -X[:, 0]]))
+
+
+def test_sharding_is_disabled_by_default() -> None:
+    executor = InferenceExecutor(_SumEngine(), kind="thread", max_workers=4)  # type: ignore[arg-type]
+    try:
+        assert executor.n_shards(1_000_000) == 1
+    finally:
+        executor.shutdown()
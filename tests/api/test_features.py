@@ -0,0 +1,58 @@
+"""Tests for `api/features.py`."""
+
+import numpy as np
+import pytest
+
+from src.api.features import (
+    N_FEATURES,
+    check_feature_order,
+    encode_row,
+    encode_rows,
+)
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.types import PredictionInput
+
+
+def _make_input(offset: float = 0.0) -> PredictionInput:
+    # Aliases are the raw data column names: "Time", "V1", ..., "Amount"
+    values = {name.capitalize(): float(i) + offset for i, name in enumerate(PREDICTORS)}
+    values["Time"] = int(values["Time"])
+    return PredictionInput(**values)
+
+
+def test_encode_row_follows_predictors_order() -> None:
+    row = encode_row(_make_input())
+    assert row.dtype == np.float32
+    assert row.shape == (1, N_FEATURES)
+    np.testing.assert_array_equal(row[0], np.arange(N_FEATURES, dtype=np.float32))
+
+
+def test_encode_row_fills_preallocated_row() -> None:
+    batch = np.zeros((2, N_FEATURES), dtype=np.float32)
+    encode_row(_make_input(offset=1.0), out=batch[1])
+    assert not batch[0].any()
+    np.testing.assert_array_equal(batch[1], np.arange(N_FEATURES) + 1.0)
+
+
+def test_encode_rows() -> None:
+    matrix = encode_rows([_make_input(), _make_input(offset=1.0)])
+    assert matrix.shape == (2, N_FEATURES)
+    assert encode_rows([]).shape == (0, N_FEATURES)
+
+
+def test_check_feature_order() -> None:
+    class Model:
+        feature_names_in_ = np.array(PREDICTORS[::-1])
+
+    with pytest.raises(RuntimeError):
+        check_feature_order(Model())
+    Model.feature_names_in_ = np.array(PREDICTORS)
+    check_feature_order(Model())
+
+
+def test_check_feature_order_of_compiled_forest() -> None:
+    class CompiledModel:
+        feature_names = PREDICTORS[::-1]
+
+    with pytest.raises(RuntimeError):
+        check_feature_order(CompiledModel())
@@ -1,16 +1,41 @@
 """Tests for `api/main.py`."""
 
+from collections.abc import Iterator
+from pathlib import Path
+
 from src.api.main import app  # Changed import to use the FastAPI app
-from src.api.main import health_check_route
+from src.api import main
+from src.api.main import health_check_route, model_manager
 
+from src.api.binary import OUTPUT_COLUMNS, RAW_MEDIA_TYPE, decode_raw, encode_raw
+from src.api.audit import AuditLog, RotatingWriter
+from src.api.drift import DriftMonitor
+from src.api.shadow import ShadowScorer
 from src.api.types import HealthRouteOutput
+from src.fraud_detector.cascade import CascadeModel, Prefilter
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.drift import DriftReference
 
 from fastapi.testclient import TestClient
+import json
+import threading
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
 
 # Initialize TestClient with the FastAPI app
 client = TestClient(app)  # Updated initialization
 
 
+@pytest.fixture(scope="module", autouse=True)
+def running_app() -> Iterator[None]:
+    # Run the lifespan of the app, and wait for the model to be loaded
+    with client:
+        assert model_manager.ready.wait(timeout=60)
+        yield
+
+
 def test_health_check_route() -> None:
     assert health_check_route() == HealthRouteOutput(status="ok")
 
@@ -246,3 +271,227 @@ def test_predict_batch_invalid_input_wrong_type() -> None:
     }
     response = client.post("/predict_batch", json=input_data)
     assert response.status_code == 422  # Unprocessable Entity
+
+
+def test_batching_stats_route() -> None:
+    response = client.get("/batching_stats")
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+def test_shadow_stats_route_disabled() -> None:
+    response = client.get("/shadow_stats")
+    assert response.status_code == 200
+    assert response.json()["enabled"] is False
+
+
+def test_predict_batch_is_scored_by_shadow(monkeypatch: pytest.MonkeyPatch) -> None:
+    # The served model as its own shadow: every prediction agrees
+    scorer = ShadowScorer({"served": model_manager.current.engine})
+    monkeypatch.setattr(main, "shadow_scorer", scorer)
+    scorer.start()
+    rows = [{name.capitalize(): float(i) for name in PREDICTORS} for i in range(3)]
+    response = client.post("/predict_batch", json={"inputs": rows})
+    assert response.status_code == 200
+    scorer.stop()
+
+    stats = client.get("/shadow_stats").json()
+    assert stats["enabled"] is True
+    assert stats["shadows"]["served"]["rows"] == 3
+    assert stats["shadows"]["served"]["agreement_rate"] == 1.0
+    assert stats["shadows"]["served"]["max_abs_score_delta"] == 0.0
+
+
+def test_predictions_are_audited(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    audit_log = AuditLog(RotatingWriter(str(tmp_path)))
+    monkeypatch.setattr(main, "audit_log", audit_log)
+    audit_log.start()
+    rows = [{name.capitalize(): float(i) for name in PREDICTORS} for i in range(3)]
+    batch = client.post(
+        "/predict_batch", json={"inputs": rows}, headers={"X-Request-ID": "batch-1"}
+    )
+    one = client.post("/predict_one", json=rows[0])
+    audit_log.stop()
+
+    table = pq.read_table(next(tmp_path.glob("*.parquet")))
+    assert table.column("request_id").to_pylist() == ["batch-1"] * 3 + [
+        one.headers["x-request-id"]
+    ]
+    assert table.column("prediction").to_pylist() == [
+        *batch.json()["predictions"],
+        one.json()["prediction"],
+    ]
+    assert (
+        table.column("model_version").to_pylist() == [model_manager.current.version] * 4
+    )
+
+
+def test_drift_stats_route_disabled() -> None:
+    response = client.get("/drift_stats")
+    assert response.status_code == 200
+    assert response.json() == {"enabled": False, "windows": {}}
+
+
+def test_batches_update_drift_histograms(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(0)
+    reference = DriftReference.fit(
+        rng.normal(size=(100, len(PREDICTORS))), rng.random(100), n_bins=5
+    )
+    monkeypatch.setattr(model_manager.current, "drift_monitor", DriftMonitor(reference))
+    rows = [{name.capitalize(): float(i) for name in PREDICTORS} for i in range(3)]
+    assert client.post("/predict_batch", json={"inputs": rows}).status_code == 200
+    assert client.post("/predict_one", json=rows[0]).status_code == 200
+
+    window = client.get("/drift_stats").json()["windows"]["300s"]
+    assert window["rows"] == 4
+    assert window["scored_rows"] == 3
+    assert set(window["histograms"]) == {*PREDICTORS, "score"}
+    assert 'api_drift_psi{window="300s",histogram="v1"}' in client.get("/metrics").text
+
+
+def test_ready_route() -> None:
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"ready": True}
+
+
+def test_model_status_route() -> None:
+    response = client.get("/model_status")
+    assert response.status_code == 200
+    assert response.json()["source"] == "path"
+    assert response.json()["version"]
+    assert set(response.json()["load_timings"]) == {"load", "build_engine", "warm_up"}
+
+
+@pytest.mark.parametrize(
+    "route",
+    [
+        "/predict_one",
+        "/predict_batch",
+        "/predict_batch_columns",
+        "/predict_batch_binary",
+        "/predict_stream",
+    ],
+)
+def test_predict_routes_ask_to_retry_until_model_is_loaded(
+    monkeypatch: pytest.MonkeyPatch, route: str
+) -> None:
+    row = {name.capitalize(): 0.0 for name in PREDICTORS}
+    payloads = {
+        "/predict_one": row,
+        "/predict_batch": {"inputs": [row]},
+        "/predict_batch_columns": {name: [value] for name, value in row.items()},
+    }
+    monkeypatch.setattr(model_manager, "ready", threading.Event())
+    response = client.post(route, json=payloads.get(route))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_predict_batch_scores_duplicate_rows_once() -> None:
+    rows = [{name.capitalize(): float(i) for name in PREDICTORS} for i in range(3)]
+    response = client.post("/predict_batch", json={"inputs": rows + rows[::-1]})
+    assert response.status_code == 200
+    predictions = response.json()["predictions"]
+    assert predictions == predictions[:3] + predictions[:3][::-1]
+    assert (
+        'api_duplicate_rows_total{route="/predict_batch"} 3.0'
+        in client.get("/metrics").text
+    )
+
+
+def test_metrics_route() -> None:
+    input_data = {name.capitalize(): 0.0 for name in PREDICTORS}
+    assert client.post("/predict_one", json=input_data).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("validate", "encode", "predict", "serialize"):
+        assert f'route="/predict_one",stage="{stage}"' in response.text
+    assert 'api_requests_total{route="/predict_one",status="200"}' in response.text
+    assert "api_model_info{version=" in response.text
+
+
+def test_predict_batch_binary_raw() -> None:
+    features = np.zeros((3, len(PREDICTORS)), dtype=np.float32)
+    response = client.post(
+        "/predict_batch_binary",
+        content=encode_raw(features, PREDICTORS),
+        headers={"content-type": RAW_MEDIA_TYPE},
+    )
+    assert response.status_code == 200
+    result = decode_raw(response.content, OUTPUT_COLUMNS)
+    assert result.shape == (3, len(OUTPUT_COLUMNS))
+
+
+def test_predict_batch_binary_unsupported_media_type() -> None:
+    response = client.post(
+        "/predict_batch_binary", content=b"", headers={"content-type": "text/csv"}
+    )
+    assert response.status_code == 415
+
+
+def test_predict_stream() -> None:
+    transaction = {"Time": 100000, "Amount": 100.0}
+    transaction.update({f"V{i}": 0.1 for i in range(1, 29)})
+    lines = [json.dumps(transaction)] * 3 + ['{"Time": "invalid_type"}']
+    response = client.post(
+        "/predict_stream",
+        content="\n".join(lines),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert len(results) == 4
+    assert all(isinstance(result["prediction"], int) for result in results[:3])
+    assert "error" in results[3]
+
+
+def test_predict_batch_columns_matches_rows() -> None:
+    rng = np.random.default_rng(0)
+    rows = [
+        {name.capitalize(): float(value) for name, value in zip(PREDICTORS, row)}
+        for row in rng.normal(scale=3.0, size=(20, len(PREDICTORS)))
+    ]
+    for row in rows:
+        row["Time"] = int(row["Time"])
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+
+    response = client.post("/predict_batch_columns", json=columns)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    predictions = response.json()["predictions"]
+    assert (
+        predictions
+        == client.post("/predict_batch", json={"inputs": rows}).json()["predictions"]
+    )
+    assert all(isinstance(prediction, int) for prediction in predictions)
+
+
+@pytest.mark.parametrize(
+    "change", [{"V3": [0.0]}, {"V3": [0.0, "invalid_type"]}, {"Other": [0.0, 0.0]}]
+)
+def test_predict_batch_columns_invalid_input(change: dict[str, list]) -> None:
+    columns = {name.capitalize(): [0.0, 0.0] for name in PREDICTORS}
+    columns.update(change)
+    assert client.post("/predict_batch_columns", json=columns).status_code == 422
+
+
+def test_cascade_leaves_score_histogram_out(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(0)
+    reference = DriftReference.fit(
+        rng.normal(size=(100, len(PREDICTORS))), rng.random(100), n_bins=5
+    )
+    served = model_manager.current
+    monkeypatch.setattr(served, "drift_monitor", DriftMonitor(reference))
+    prefilter = Prefilter(np.zeros(len(PREDICTORS)), intercept=0.0)
+    monkeypatch.setattr(served, "engine", CascadeModel(prefilter, served.engine))
+    rows = [{name.capitalize(): float(i) for name in PREDICTORS} for i in range(3)]
+    assert client.post("/predict_batch", json={"inputs": rows}).status_code == 200
+
+    window = client.get("/drift_stats").json()["windows"]["300s"]
+    assert window["rows"] == 3
+    assert window["scored_rows"] == 0
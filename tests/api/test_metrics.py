@@ -0,0 +1,27 @@
+"""Tests for `api/metrics.py`."""
+
+from src.api.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("latency", "Latency.", ["route"], buckets=[0.1, 1.0])
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "/predict_one")
+
+    assert histogram.render() == [
+        "# HELP latency Latency.",
+        "# TYPE latency histogram",
+        'latency_bucket{route="/predict_one",le="0.1"} 2',
+        'latency_bucket{route="/predict_one",le="1.0"} 3',
+        'latency_bucket{route="/predict_one",le="+Inf"} 4',
+        'latency_sum{route="/predict_one"} 2.65',
+        'latency_count{route="/predict_one"} 4',
+    ]
+
+
+def test_counter_escapes_label_values() -> None:
+    counter = Counter("requests", "Requests.", ["route"])
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2.0)
+
+    assert counter.render()[-1] == 'requests{route="a\\"b"} 3.0'
@@ -0,0 +1,228 @@
+"""Tests for `api/model_manager.py`."""
+
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.api.executor import InferenceExecutor
+from src.api.model_manager import ModelManager, load_shadow_models
+from src.api.settings import APISettings
+from src.fraud_detector.cascade import CascadeModel, Prefilter
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.drift import DriftReference
+from src.fraud_detector.inference import CompiledForest
+
+
+def _save_model(path: Path, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(50, len(PREDICTORS))), columns=PREDICTORS)
+    y = rng.integers(0, 2, size=50)
+    model = RandomForestClassifier(n_estimators=3, max_depth=3, random_state=seed)
+    joblib.dump(model.fit(X, y), path)
+
+
+@pytest.fixture
+def manager(tmp_path: Path) -> Iterator[ModelManager]:
+    model_path = tmp_path / "model.pkl"
+    _save_model(model_path, seed=0)
+    manager = ModelManager(APISettings(model_path=str(model_path), inference_workers=1))
+    manager.load()
+    yield manager
+    manager.stop()
+
+
+def test_refresh_swaps_changed_model(manager: ModelManager) -> None:
+    assert not manager.refresh()
+    previous = manager.current
+
+    _save_model(Path(manager.settings.model_path), seed=1)
+    stat = os.stat(manager.settings.model_path)
+    os.utime(manager.settings.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert manager.refresh()
+    assert manager.current is not previous
+    assert previous.retired
+    assert manager.last_error is None
+
+
+def test_refresh_keeps_serving_on_error(manager: ModelManager) -> None:
+    previous = manager.current
+    os.remove(manager.settings.model_path)
+
+    assert not manager.refresh()
+    assert manager.current is previous
+    assert manager.last_error
+
+
+def test_failed_warm_up_releases_executor(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Fitted on fewer features than the API sends, so that warm-up fails
+    model = RandomForestClassifier(n_estimators=2, random_state=0)
+    joblib.dump(model.fit(np.zeros((4, 3)), [0, 1, 0, 1]), tmp_path / "model.pkl")
+    shutdowns = []
+    monkeypatch.setattr(
+        InferenceExecutor, "shutdown", lambda self, wait=True: shutdowns.append(self)
+    )
+    manager = ModelManager(
+        APISettings(
+            model_path=str(tmp_path / "model.pkl"),
+            inference_engine="sklearn",
+            inference_workers=1,
+        )
+    )
+
+    with pytest.raises(ValueError):
+        manager.prepare("broken")
+    assert len(shutdowns) == 1
+
+
+def test_lease_pins_version_across_swap(manager: ModelManager) -> None:
+    row = np.zeros((1, len(PREDICTORS)), dtype=np.float32)
+    with manager.lease() as served:
+        manager.swap(manager.prepare("next"))
+        # The retired version keeps serving the request that leased it
+        assert served.retired
+        assert served.executor.submit("predict", row).result().shape == (1,)
+    assert manager.current.version == "next"
+
+
+def test_serves_compiled_forest(tmp_path: Path) -> None:
+    _save_model(tmp_path / "model.pkl", seed=0)
+    compiled_path = str(tmp_path / "model.compiled")
+    CompiledForest.from_estimator(joblib.load(tmp_path / "model.pkl")).save(
+        compiled_path
+    )
+
+    manager = ModelManager(
+        APISettings(
+            model_path=compiled_path, inference_executor="process", inference_workers=1
+        )
+    )
+    manager.load()
+    try:
+        assert manager.current.engine.path == compiled_path
+        row = np.zeros((1, len(PREDICTORS)), dtype=np.float32)
+        assert manager.current.executor.submit("predict", row).result().shape == (1,)
+    finally:
+        manager.stop()
+
+
+def test_serves_cascade(tmp_path: Path) -> None:
+    _save_model(tmp_path / "model.pkl", seed=0)
+    prefilter_path = str(tmp_path / "prefilter.json")
+    Prefilter(np.zeros(len(PREDICTORS)), intercept=0.0, threshold=1.0).save(
+        prefilter_path
+    )
+
+    manager = ModelManager(
+        APISettings(
+            model_path=str(tmp_path / "model.pkl"),
+            cascade_enabled=True,
+            prefilter_path=prefilter_path,
+            inference_workers=1,
+        )
+    )
+    manager.load()
+    try:
+        assert isinstance(manager.current.engine, CascadeModel)
+        # Every row is cleared by the pre-filter
+        row = np.ones((1, len(PREDICTORS)), dtype=np.float32)
+        assert manager.current.executor.submit("predict", row).result()[0] == 0
+        assert manager.current.executor.stats() == {"rows": 2, "model_rows": 0}
+    finally:
+        manager.stop()
+
+
+def test_sklearn_engine_runs_single_threaded(tmp_path: Path) -> None:
+    model_path = tmp_path / "model.pkl"
+    _save_model(model_path, seed=0)
+    model = joblib.load(model_path)
+    joblib.dump(model.set_params(n_jobs=4), model_path)
+    manager = ModelManager(
+        APISettings(
+            model_path=str(model_path), inference_engine="sklearn", inference_workers=1
+        )
+    )
+    manager.load()
+    try:
+        assert manager.current.engine.n_jobs == 1
+    finally:
+        manager.stop()
+
+
+def test_loads_shadow_models(tmp_path: Path) -> None:
+    _save_model(tmp_path / "candidate.pkl", seed=1)
+    source = str(tmp_path / "candidate.pkl")
+    shadows = load_shadow_models(APISettings(shadow_models=[source]))
+    assert isinstance(shadows[source], CompiledForest)
+    row = np.zeros((1, len(PREDICTORS)), dtype=np.float32)
+    assert shadows[source].predict_proba(row).shape == (1, 2)
+
+
+def test_refresh_swaps_changed_prefilter(tmp_path: Path) -> None:
+    _save_model(tmp_path / "model.pkl", seed=0)
+    prefilter_path = tmp_path / "prefilter.json"
+    Prefilter(np.zeros(len(PREDICTORS)), intercept=0.0, threshold=1.0).save(
+        str(prefilter_path)
+    )
+    manager = ModelManager(
+        APISettings(
+            model_path=str(tmp_path / "model.pkl"),
+            cascade_enabled=True,
+            prefilter_path=str(prefilter_path),
+            inference_workers=1,
+        )
+    )
+    manager.load()
+    try:
+        # Recalibrated with a new model, saved after it
+        Prefilter(np.zeros(len(PREDICTORS)), intercept=0.0, threshold=-1.0).save(
+            str(prefilter_path)
+        )
+        stat = os.stat(prefilter_path)
+        os.utime(prefilter_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert manager.refresh()
+        assert manager.current.engine.prefilter.threshold == -1.0
+    finally:
+        manager.stop()
+
+
+def test_refresh_reloads_drift_reference(tmp_path: Path) -> None:
+    _save_model(tmp_path / "model.pkl", seed=0)
+    reference_path = tmp_path / "drift_reference.json"
+    rng = np.random.default_rng(0)
+    DriftReference.fit(
+        rng.normal(size=(50, len(PREDICTORS))), rng.random(50), n_bins=4
+    ).save(str(reference_path))
+    manager = ModelManager(
+        APISettings(
+            model_path=str(tmp_path / "model.pkl"),
+            drift_enabled=True,
+            drift_reference_path=str(reference_path),
+            inference_workers=1,
+        )
+    )
+    manager.load()
+    try:
+        previous = manager.current.drift_monitor
+        assert previous is not None
+        # Saved by the training of a new model
+        DriftReference.fit(
+            rng.normal(size=(50, len(PREDICTORS))), rng.random(50), n_bins=2
+        ).save(str(reference_path))
+        stat = os.stat(reference_path)
+        os.utime(reference_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert manager.refresh()
+        assert manager.current.drift_monitor is not previous
+        assert manager.current.drift_monitor.reference.n_bins == 2
+    finally:
+        manager.stop()
@@ -0,0 +1,63 @@
+"""Tests for `api/shadow.py`."""
+
+import numpy as np
+import pytest
+
+from src.api.shadow import ShadowScorer
+
+
+class _FirstFeatureModel:
+    """Fraud probability equal to the first feature."""
+
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return np.column_stack([1 - X[:, 0], X[:, 0]]).astype(np.float64)
+
+
+class _FailingModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        raise ValueError("boom")
+
+
+def test_shadow_scorer_compares_with_served_model() -> None:
+    scorer = ShadowScorer({"candidate": _FirstFeatureModel()})
+    features = np.array([[0.9], [0.2], [0.6], [0.1]], dtype=np.float32)
+    scores = np.array([0.8, 0.3, 0.4, 0.1])
+    predictions = (scores > 0.5).astype(np.int64)
+    assert scorer.submit(features, predictions, scores)
+    scorer.start()
+    scorer.stop()
+
+    stats = scorer.stats()
+    assert stats["dropped_batches"] == 0
+    candidate = stats["shadows"]["candidate"]
+    assert candidate["rows"] == 4
+    assert candidate["agreement_rate"] == 0.75
+    assert (candidate["newly_flagged"], candidate["newly_cleared"]) == (1, 0)
+    deltas = features[:, 0] - scores
+    assert candidate["mean_score_delta"] == pytest.approx(deltas.mean())
+    assert candidate["max_abs_score_delta"] == pytest.approx(np.abs(deltas).max())
+
+
+def test_shadow_scorer_drops_batches_when_full() -> None:
+    scorer = ShadowScorer({"candidate": _FirstFeatureModel()}, max_queued_batches=1)
+    batch = (np.zeros((1, 1), dtype=np.float32), np.zeros(1), np.zeros(1))
+    assert scorer.submit(*batch)
+    assert not scorer.submit(*batch)
+    assert scorer.stats()["dropped_batches"] == 1
+    assert scorer.stats()["queued_batches"] == 1
+
+
+def test_shadow_scorer_counts_errors() -> None:
+    scorer = ShadowScorer({"broken": _FailingModel(), "ok": _FirstFeatureModel()})
+    scorer.submit(np.zeros((2, 1), dtype=np.float32), np.zeros(2), np.zeros(2))
+    scorer.start()
+    scorer.stop()
+
+    stats = scorer.stats()["shadows"]
+    assert stats["broken"]["errors"] == 1
+    assert stats["broken"]["rows"] == 0
+    assert stats["ok"]["rows"] == 2
@@ -0,0 +1,65 @@
+"""Tests for `api/streaming.py`."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import numpy as np
+
+from src.api.streaming import iter_lines, score_ndjson
+
+
+async def _chunks(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(
+    chunks: AsyncIterator[bytes], max_line_bytes: int = 1024
+) -> list[bytes | None]:
+    return [line async for line in iter_lines(chunks, max_line_bytes)]
+
+
+def test_iter_lines_splits_across_chunks() -> None:
+    chunks = _chunks(b'{"a": 1}\n{"a"', b": 2}\n\n", b'{"a": 3}')
+    assert asyncio.run(_collect(chunks)) == [b'{"a": 1}', b'{"a": 2}', b'{"a": 3}']
+
+
+def test_iter_lines_discards_overlong_lines() -> None:
+    chunks = _chunks(b"12\n" + b"x" * 5, b"x" * 5, b"x\n34", b"567\n89")
+    assert asyncio.run(_collect(chunks, max_line_bytes=5)) == [
+        b"12",
+        None,
+        b"34567",
+        b"89",
+    ]
+
+
+def test_score_ndjson_reports_failed_chunks() -> None:
+    transaction = {"Time": 0, "Amount": 1.0, **{f"V{i}": 0.0 for i in range(1, 29)}}
+    body = "\n".join([json.dumps(transaction)] * 3 + ["{}"]).encode()
+    calls = 0
+
+    async def fail_first(features: np.ndarray) -> np.ndarray:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("boom")
+        return np.zeros(len(features))
+
+    async def collect() -> list[bytes]:
+        return [
+            chunk
+            async for chunk in score_ndjson(_chunks(body), fail_first, chunk_size=2)
+        ]
+
+    results = [
+        json.loads(line) for line in b"".join(asyncio.run(collect())).splitlines()
+    ]
+    assert [next(iter(result)) for result in results] == [
+        "error",
+        "error",
+        "prediction",
+        "error",
+    ]
+    assert "boom" in results[0]["error"]
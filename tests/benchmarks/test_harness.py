@@ -0,0 +1,34 @@
+"""Tests for `benchmarks/harness.py`."""
+
+from pathlib import Path
+
+from src.benchmarks.harness import compare, measure, read_results, size, write_results
+
+
+def test_measure_calibrates_calls_per_sample() -> None:
+    result = measure(lambda: None, repeat=3, min_sample_time=0.001)
+    assert result["unit"] == "s"
+    assert result["repeat"] == 3
+    assert result["number"] > 1
+    assert result["min"] <= result["value"] <= result["p95"]
+
+
+def test_compare_reports_regressions_beyond_threshold(tmp_path: Path) -> None:
+    baseline = {
+        "fast": {"value": 1.0, "unit": "s"},
+        "slow": {"value": 1.0, "unit": "s"},
+        "model_size": size(1000),
+    }
+    write_results(str(tmp_path / "baseline.json"), baseline)
+    results = {
+        "fast": {"value": 1.1, "unit": "s"},
+        "slow": {"value": 1.5, "unit": "s"},
+        "model_size": size(2000),
+        "new": {"value": 1.0, "unit": "s"},
+    }
+
+    regressions = compare(results, read_results(str(tmp_path / "baseline.json")), 0.2)
+    assert [regression.split(":")[0] for regression in regressions] == [
+        "slow",
+        "model_size",
+    ]
@@ -0,0 +1,44 @@
+"""Tests for `fraud_detector/cascade.py`."""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.benchmarks.synthetic import make_transactions
+from src.fraud_detector.cascade import CascadeModel, Prefilter
+from src.fraud_detector.constants import PREDICTORS, TARGET
+
+
+def _split(seed: int) -> tuple[pd.DataFrame, np.ndarray]:
+    data_df = make_transactions(20_000, seed)
+    data_df.columns = data_df.columns.str.lower()
+    return data_df[PREDICTORS], data_df[TARGET].to_numpy()
+
+
+def test_cascade_clears_most_rows_within_recall_budget(tmp_path: Path) -> None:
+    X_train, y_train = _split(seed=0)
+    X_valid, y_valid = _split(seed=1)
+    forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(
+        X_train, y_train
+    )
+
+    prefilter = Prefilter.fit(X_train, y_train, seed=0)
+    caught = (forest.predict(X_valid) == 1) & (y_valid == 1)
+    calibration = prefilter.calibrate(X_valid, caught, recall_loss=0.05)
+    assert calibration["recall_loss"] <= 0.05
+    assert calibration["stage_two_fraction"] < 0.5
+
+    prefilter.save(str(tmp_path / "prefilter.json"))
+    cascade = CascadeModel(Prefilter.load(str(tmp_path / "prefilter.json")), forest)
+    cascade = pickle.loads(pickle.dumps(cascade))
+    predictions, model_rows = cascade.predict_counted(X_valid)
+
+    uncertain = prefilter.decision_function(X_valid) >= prefilter.threshold
+    np.testing.assert_array_equal(
+        predictions[uncertain], forest.predict(X_valid[uncertain])
+    )
+    assert not predictions[~uncertain].any()
+    assert model_rows == uncertain.sum()
@@ -0,0 +1,100 @@
+"""Tests for `fraud_detector/compact.py`."""
+
+from pathlib import Path
+
+import joblib  # type: ignore
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.fraud_detector.compact import (
+    compact_forest,
+    compaction_report,
+    round_down_float32,
+)
+from src.fraud_detector.inference import CompiledForest
+
+
+def _make_data(n_rows: int, seed: int) -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, 4)), columns=["time", "v1", "v2", "v3"])
+    y = ((X["v1"] + rng.normal(scale=0.5, size=n_rows)) > 1.0).astype(int).values
+    return X, y
+
+
+def _fit_forest() -> RandomForestClassifier:
+    X, y = _make_data(2000, 0)
+    return RandomForestClassifier(
+        n_estimators=10, min_samples_leaf=3, random_state=0, n_jobs=1
+    ).fit(X, y)
+
+
+def test_round_down_float32_splits_float32_values_the_same() -> None:
+    rng = np.random.default_rng(0)
+    thresholds = rng.normal(size=1000)
+    rounded = round_down_float32(thresholds)
+    assert rounded.dtype == np.float32
+    # The float32 values closest to every threshold, on both sides
+    nearest = thresholds.astype(np.float32)
+    for x in (
+        nearest,
+        np.nextafter(nearest, np.float32(np.inf)),
+        np.nextafter(nearest, np.float32(-np.inf)),
+    ):
+        np.testing.assert_array_equal(x <= thresholds, x <= rounded)
+
+
+def test_compact_forest_predicts_as_sklearn() -> None:
+    forest = _fit_forest()
+    compiled = CompiledForest.from_estimator(forest)
+    compact = compact_forest(compiled)
+
+    assert compact.value.shape == (len(compact.feature), 1)
+    assert compact.threshold.dtype == np.float32
+    assert len(compact.feature) <= len(compiled.feature)
+    X, _ = _make_data(3000, 1)
+    np.testing.assert_allclose(
+        compact.predict_proba(X), forest.predict_proba(X), atol=1e-6
+    )
+
+
+def test_pruning_bounds_the_change_in_probability() -> None:
+    forest = _fit_forest()
+    compiled = CompiledForest.from_estimator(forest)
+    pruned = compact_forest(compiled, prune_tolerance=0.2)
+
+    assert len(pruned.feature) < len(compact_forest(compiled).feature)
+    X, _ = _make_data(3000, 1)
+    change = np.abs(pruned.predict_proba(X) - forest.predict_proba(X))
+    assert change.max() <= 0.2 + 1e-6
+
+
+def test_compact_forest_round_trips_and_is_reported(tmp_path: Path) -> None:
+    forest = _fit_forest()
+    model_path = str(tmp_path / "model.pkl")
+    compact_path = str(tmp_path / "model.compiled")
+    joblib.dump(forest, model_path)
+    compact = compact_forest(CompiledForest.from_estimator(forest))
+    compact.save(compact_path)
+
+    X, y = _make_data(500, 1)
+    np.testing.assert_array_equal(
+        CompiledForest.load(compact_path).predict_proba(X), compact.predict_proba(X)
+    )
+    report = compaction_report(model_path, compact_path, X, y)
+    assert report["compact"]["size_bytes"] < report["original"]["size_bytes"]
+    assert report["max_proba_change"] < 1e-6
+    assert report["prediction_agreement"] == 1.0
+    # float32 leaf probabilities may break ties between rows differently
+    assert report["compact"]["roc_auc"] == pytest.approx(
+        report["original"]["roc_auc"], abs=1e-3
+    )
+
+
+def test_only_binary_forests_are_compacted() -> None:
+    X, _ = _make_data(300, 0)
+    y = np.arange(300) % 3
+    forest = RandomForestClassifier(n_estimators=2, random_state=0).fit(X, y)
+    with pytest.raises(ValueError):
+        compact_forest(CompiledForest.from_estimator(forest))
@@ -0,0 +1,53 @@
+"""Tests for `fraud_detector/dataset.py`."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.utils.validation import check_array  # type: ignore
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.dataset import iter_dataset, load_dataset, save_dataset
+
+
+def _make_split() -> pd.DataFrame:
+    rng = np.random.default_rng(2018)
+    data_df = pd.DataFrame(rng.normal(size=(50, len(PREDICTORS))), columns=PREDICTORS)
+    data_df["class"] = rng.integers(0, 2, size=len(data_df))
+    return data_df
+
+
+def test_npy_dataset_is_memory_mapped_without_copy(tmp_path: Path) -> None:
+    data_df = _make_split()
+    csv_path = str(tmp_path / "train.csv")
+    save_dataset(data_df, csv_path, "npy")
+
+    X, y = load_dataset(csv_path, "npy")
+    assert list(X.columns) == PREDICTORS
+    np.testing.assert_array_equal(y, data_df["class"])
+    # What sklearn validates is the memory-mapped matrix itself
+    X_checked = check_array(X, dtype=np.float32)
+    assert X_checked.flags.c_contiguous
+    assert np.shares_memory(X_checked, np.asarray(X))
+
+
+def test_csv_and_npy_datasets_match(tmp_path: Path) -> None:
+    data_df = _make_split()
+    for data_format in ("csv", "npy"):
+        save_dataset(data_df, str(tmp_path / f"{data_format}.csv"), data_format)
+    X_csv, y_csv = load_dataset(str(tmp_path / "csv.csv"), "csv")
+    X_npy, y_npy = load_dataset(str(tmp_path / "npy.csv"), "npy")
+    np.testing.assert_allclose(X_csv, X_npy, rtol=1e-6)
+    np.testing.assert_array_equal(y_csv, y_npy)
+
+
+def test_iter_dataset_chunks_match_whole_dataset(tmp_path: Path) -> None:
+    data_df = _make_split()
+    for data_format in ("csv", "npy"):
+        csv_path = str(tmp_path / f"{data_format}.csv")
+        save_dataset(data_df, csv_path, data_format)
+        X, y = load_dataset(csv_path, data_format)
+        chunks = list(iter_dataset(csv_path, data_format, chunk_size=16))
+        assert [len(X_chunk) for X_chunk, _ in chunks] == [16, 16, 16, 2]
+        np.testing.assert_array_equal(np.concatenate([c[1] for c in chunks]), y)
+        np.testing.assert_array_equal(pd.concat([c[0] for c in chunks]), X)
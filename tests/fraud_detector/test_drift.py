@@ -0,0 +1,81 @@
+"""Tests for `fraud_detector/drift.py`."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.drift import SCORE, DriftReference, ks, psi, quantile_edges
+
+
+def _training_data() -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(5000, len(PREDICTORS))), columns=PREDICTORS)
+    # A mostly constant feature, with fewer distinct bins
+    X["amount"] = np.where(rng.random(5000) < 0.9, 0.0, rng.exponential(size=5000))
+    return X, rng.random(5000)
+
+
+@pytest.fixture
+def reference() -> DriftReference:
+    return DriftReference.fit(*_training_data(), n_bins=10)
+
+
+def test_quantile_edges_isolate_ties() -> None:
+    assert len(quantile_edges(np.arange(1000), 10)) == 9
+    # Below 0, 0, and above 0
+    assert len(quantile_edges(np.zeros(1000), 10)) == 2
+
+
+def test_bin_counts_match_reference(reference: DriftReference) -> None:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(PREDICTORS))).astype(np.float32)
+    X[:, PREDICTORS.index("amount")] = 0.0
+    counts = reference.bin_counts(X)
+
+    assert reference.names == [*PREDICTORS, SCORE]
+    assert counts.shape == reference.counts.shape
+    assert (counts[:-1].sum(axis=1) == 5000).all()
+    # No fraud probabilities given
+    assert counts[-1].sum() == 0
+    # Same distribution as the training data, except for the amount
+    drift = psi(reference.counts, counts)
+    assert drift[: PREDICTORS.index("amount")].max() < 0.05
+    assert drift[PREDICTORS.index("amount")] > 0.2
+
+
+def test_bin_counts_of_training_data_are_reference(
+    reference: DriftReference,
+) -> None:
+    X, scores = _training_data()
+    np.testing.assert_array_equal(
+        reference.bin_counts(X.to_numpy(), scores), reference.counts
+    )
+
+
+def test_bin_counts_in_chunks(reference: DriftReference) -> None:
+    X = np.random.default_rng(1).normal(size=(10_000, len(PREDICTORS)))
+    scores = np.linspace(0, 1, 10_000)
+    counts = reference.bin_counts(X, scores)
+    halves = reference.bin_counts(X[:3], scores[:3]) + reference.bin_counts(
+        X[3:], scores[3:]
+    )
+    np.testing.assert_array_equal(counts, halves)
+
+
+def test_ks_of_shifted_histogram() -> None:
+    expected = np.array([10, 10, 10, 10])
+    assert ks(expected, expected) == 0.0
+    assert ks(expected, np.array([0, 0, 20, 20])) == pytest.approx(0.5)
+    assert psi(expected, expected) == pytest.approx(0.0)
+
+
+def test_save_and_load(reference: DriftReference, tmp_path: Path) -> None:
+    path = str(tmp_path / "drift_reference.json")
+    reference.save(path)
+    loaded = DriftReference.load(path)
+    assert loaded.names == reference.names
+    np.testing.assert_array_equal(loaded.edges, reference.edges)
+    np.testing.assert_array_equal(loaded.counts, reference.counts)
@@ -0,0 +1,101 @@
+"""Tests for `fraud_detector/evaluate.py`."""
+
+import numpy as np
+import pytest
+from sklearn.metrics import (  # type: ignore
+    accuracy_score,
+    average_precision_score,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+
+from src.fraud_detector.evaluate import (
+    accumulate_counts,
+    class_counts,
+    score_bins,
+    summarize,
+    sweep_thresholds,
+)
+from src.fraud_detector.types import EvaluateModelParams
+
+
+def _scores(n_rows: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    # Averages of 100 trees, as a forest predicts
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_rows) < 0.1).astype(np.int8)
+    scores = rng.binomial(100, np.where(y == 1, 0.6, 0.2)) / 100
+    return scores, y
+
+
+def test_sweep_matches_sklearn_at_every_threshold() -> None:
+    scores, y = _scores(2000, 0)
+    counts = class_counts(score_bins(scores, 100), y, 100)
+    curve = sweep_thresholds(counts, cost_fp=1.0, cost_fn=10.0)
+
+    for index in (0, 17, 50, 73, 100):
+        y_pred = scores > index / 100
+        assert curve["accuracy"][index] == pytest.approx(accuracy_score(y, y_pred))
+        assert curve["precision"][index] == pytest.approx(
+            precision_score(y, y_pred, zero_division=0)
+        )
+        assert curve["recall"][index] == pytest.approx(recall_score(y, y_pred))
+        assert curve["f1_score"][index] == pytest.approx(f1_score(y, y_pred))
+        missed = ((y == 1) & ~y_pred).sum()
+        assert curve["cost"][index] == ((y == 0) & y_pred).sum() + 10 * missed
+    assert curve["roc_auc"] == pytest.approx(roc_auc_score(y, scores))
+    assert curve["average_precision"] == pytest.approx(
+        average_precision_score(y, scores)
+    )
+
+
+def test_counts_do_not_depend_on_chunks() -> None:
+    scores, y = _scores(1000, 1)
+    whole, _ = accumulate_counts([(scores, y)], 100, n_bootstrap=0, seed=0)
+    chunked, _ = accumulate_counts(
+        [(scores[i : i + 64], y[i : i + 64]) for i in range(0, 1000, 64)],
+        100,
+        n_bootstrap=0,
+        seed=0,
+    )
+    np.testing.assert_array_equal(whole, chunked)
+    assert whole.sum() == 1000
+
+
+def test_summary_brackets_metrics_with_confidence_intervals() -> None:
+    scores, y = _scores(5000, 2)
+    params = EvaluateModelParams(
+        model_path="model.pkl",
+        valid_csv="valid.csv",
+        evaluation_path="evaluation.json",
+        seed=0,
+        n_thresholds=100,
+        n_bootstrap=100,
+    )
+    counts, resampled = accumulate_counts(
+        [(scores, y)], params.n_thresholds, params.n_bootstrap, params.seed
+    )
+    # Every resample holds about as many rows as the validation set
+    assert resampled.shape == (100, 2, 102)
+    assert abs(resampled.sum(axis=(1, 2)).mean() - 5000) < 50
+
+    metrics, curve = summarize(counts, resampled, params)
+    assert metrics["recall"] == pytest.approx(recall_score(y, scores > 0.5))
+    for name in ("precision", "recall", "roc_auc", "average_precision", "cost"):
+        assert metrics[f"{name}_ci_low"] <= metrics[name] <= metrics[f"{name}_ci_high"]
+    assert len(curve) == 101
+    assert metrics["min_cost"] == curve["cost"].min()
+
+
+@pytest.mark.parametrize("threshold", [0.505, 1.5])
+def test_threshold_must_be_on_the_grid(threshold: float) -> None:
+    with pytest.raises(ValueError, match="threshold"):
+        EvaluateModelParams(
+            model_path="model.pkl",
+            valid_csv="valid.csv",
+            evaluation_path="evaluation.json",
+            seed=0,
+            threshold=threshold,
+            n_thresholds=100,
+        )
@@ -0,0 +1,102 @@
+"""Tests for `fraud_detector/inference.py`."""
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.fraud_detector.inference import CompiledForest, build_engine
+
+
+def _fit_forest(X: pd.DataFrame, y: np.ndarray) -> RandomForestClassifier:
+    return RandomForestClassifier(n_estimators=15, random_state=2018, n_jobs=1).fit(
+        X, y
+    )
+
+
+def _make_data(n_rows: int = 2000) -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(2018)
+    X = pd.DataFrame(
+        rng.normal(size=(n_rows, 5)), columns=["time", "v1", "v2", "v3", "amount"]
+    )
+    y = ((X["v1"] + rng.normal(scale=0.5, size=n_rows)) > 1.0).astype(int).values
+    return X, y
+
+
+def test_compiled_forest_matches_sklearn() -> None:
+    X, y = _make_data()
+    forest = _fit_forest(X, y)
+    compiled = CompiledForest.from_estimator(forest)
+
+    X_new, _ = _make_data(5000)
+    X_new = X_new * 1.5
+    np.testing.assert_array_equal(compiled.predict(X_new), forest.predict(X_new))
+    np.testing.assert_array_equal(
+        compiled.predict_proba(X_new), forest.predict_proba(X_new)
+    )
+
+
+def test_compiled_forest_handles_missing_values() -> None:
+    X, y = _make_data()
+    X.iloc[::7, 1] = np.nan
+    forest = _fit_forest(X, y)
+    compiled = CompiledForest.from_estimator(forest)
+
+    X_new = X.copy()
+    X_new.iloc[::3, 1] = np.nan
+    np.testing.assert_array_equal(
+        compiled.predict_proba(X_new), forest.predict_proba(X_new)
+    )
+
+
+def test_compiled_forest_single_row_numpy() -> None:
+    X, y = _make_data()
+    forest = _fit_forest(X, y)
+    compiled = CompiledForest.from_estimator(forest)
+
+    row = X.to_numpy()[:1]
+    assert compiled.predict(row)[0] == forest.predict(X.iloc[:1])[0]
+
+
+def test_compiled_forest_rejects_wrong_shape() -> None:
+    X, y = _make_data()
+    compiled = CompiledForest.from_estimator(_fit_forest(X, y))
+    with pytest.raises(ValueError):
+        compiled.predict(np.zeros((1, 4)))
+
+
+def test_build_engine() -> None:
+    X, y = _make_data()
+    forest = _fit_forest(X, y)
+    assert build_engine(forest, "sklearn") is forest
+    assert isinstance(build_engine(forest, "compiled"), CompiledForest)
+    with pytest.raises(ValueError):
+        build_engine(forest, "unknown")
+
+
+def test_saved_forest_is_memory_mapped(tmp_path: Path) -> None:
+    X, y = _make_data()
+    compiled = CompiledForest.from_estimator(_fit_forest(X, y))
+    path = str(tmp_path / "model.compiled")
+    compiled.save(path)
+    # Saving again replaces the previous forest
+    compiled.save(path)
+
+    loaded = CompiledForest.load(path)
+    assert isinstance(loaded.value.base, np.memmap)
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
+    assert list(loaded.feature_names) == list(X.columns)
+
+    # Other processes receive the path to map, not a copy of the arrays
+    payload = pickle.dumps(loaded)
+    assert len(payload) < 1000
+    np.testing.assert_array_equal(pickle.loads(payload).predict(X), compiled.predict(X))
+
+    # Once the directory is saved again, the loaded arrays are sent instead
+    CompiledForest.from_estimator(_fit_forest(X, 1 - y)).save(path)
+    unpickled = pickle.loads(pickle.dumps(loaded))
+    assert unpickled.path is None
+    np.testing.assert_array_equal(unpickled.predict(X), compiled.predict(X))
@@ -0,0 +1,77 @@
+"""Tests for `fraud_detector/prepare.py`."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.dataset import load_dataset
+from src.fraud_detector.prepare import (
+    SPLITS,
+    assign_splits,
+    prepare_data_streaming,
+)
+from src.fraud_detector.types import PrepareModelParams
+
+
+def test_assign_splits_is_deterministic_with_expected_shares() -> None:
+    row_ids = np.arange(100_000, dtype=np.uint64)
+    assignment = assign_splits(row_ids, seed=2018, split=0.2)
+    np.testing.assert_array_equal(assignment, assign_splits(row_ids, 2018, 0.2))
+    assert not np.array_equal(assignment, assign_splits(row_ids, 2019, 0.2))
+
+    shares = np.bincount(assignment, minlength=len(SPLITS)) / len(row_ids)
+    np.testing.assert_allclose(shares, [0.64, 0.16, 0.2], atol=0.01)
+
+
+def test_prepare_data_streaming_does_not_depend_on_chunk_size(tmp_path: Path) -> None:
+    rng = np.random.default_rng(2018)
+    raw = pd.DataFrame(rng.normal(size=(1000, len(PREDICTORS))), columns=PREDICTORS)
+    raw["class"] = rng.integers(0, 2, size=len(raw))
+    raw.rename(columns=str.capitalize).to_csv(tmp_path / "raw.csv", index=False)
+
+    outputs = []
+    for chunk_size in (64, 1000):
+        output_dir = tmp_path / str(chunk_size)
+        output_dir.mkdir()
+        params = PrepareModelParams(
+            raw_data=str(tmp_path / "raw.csv"),
+            split=0.2,
+            seed=2018,
+            mode="streaming",
+            chunk_size=chunk_size,
+        )
+        prepare_data_streaming(params, str(output_dir))
+        outputs.append(
+            {name: pd.read_csv(output_dir / f"{name}.csv") for name in SPLITS}
+        )
+
+    assert sum(len(split) for split in outputs[0].values()) == len(raw)
+    assert list(outputs[0]["train"].columns) == [*PREDICTORS, "class"]
+    for name in SPLITS:
+        pd.testing.assert_frame_equal(outputs[0][name], outputs[1][name])
+
+
+def test_prepare_data_streaming_npy_matches_csv(tmp_path: Path) -> None:
+    rng = np.random.default_rng(2018)
+    raw = pd.DataFrame(rng.normal(size=(500, len(PREDICTORS))), columns=PREDICTORS)
+    raw["class"] = rng.integers(0, 2, size=len(raw))
+    raw.rename(columns=str.capitalize).to_csv(tmp_path / "raw.csv", index=False)
+
+    for data_format in ("csv", "npy"):
+        params = PrepareModelParams(
+            raw_data=str(tmp_path / "raw.csv"),
+            split=0.2,
+            seed=2018,
+            mode="streaming",
+            chunk_size=64,
+            data_format=data_format,
+        )
+        prepare_data_streaming(params, str(tmp_path))
+
+    for name in SPLITS:
+        X_csv, y_csv = load_dataset(str(tmp_path / f"{name}.csv"), "csv")
+        X_npy, y_npy = load_dataset(str(tmp_path / f"{name}.csv"), "npy")
+        np.testing.assert_array_equal(X_csv.to_numpy(np.float32), X_npy)
+        np.testing.assert_array_equal(y_csv, y_npy)
@@ -0,0 +1,71 @@
+"""Tests for `fraud_detector/score.py`."""
+
+import json
+from pathlib import Path
+
+import joblib  # type: ignore
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.fraud_detector.constants import PREDICTORS
+from src.fraud_detector.score import score_file
+from src.fraud_detector.types import ScoreFileParams
+
+
+@pytest.fixture
+def scoring_params(tmp_path: Path) -> ScoreFileParams:
+    rng = np.random.default_rng(2018)
+    data = pd.DataFrame(rng.normal(size=(250, len(PREDICTORS))), columns=PREDICTORS)
+    y = (data["v1"] > 1.0).astype(int).values
+    joblib.dump(
+        RandomForestClassifier(n_estimators=5, random_state=2018).fit(data, y),
+        tmp_path / "model.pkl",
+    )
+    # Raw data column names are capitalized
+    data.rename(columns=str.capitalize).to_csv(tmp_path / "input.csv", index=False)
+    return ScoreFileParams(
+        input_path=str(tmp_path / "input.csv"),
+        output_path=str(tmp_path / "output.csv"),
+        model_path=str(tmp_path / "model.pkl"),
+        chunk_size=100,
+        n_workers=2,
+    )
+
+
+def test_score_file_preserves_order(scoring_params: ScoreFileParams) -> None:
+    stats = score_file(scoring_params)
+    assert stats["rows"] == 250
+
+    model = joblib.load(scoring_params.model_path)
+    data = pd.read_csv(scoring_params.input_path).rename(columns=str.lower)
+    output = pd.read_csv(scoring_params.output_path)
+    np.testing.assert_array_equal(output["prediction"], model.predict(data))
+
+
+def test_score_file_resumes_from_last_chunk(scoring_params: ScoreFileParams) -> None:
+    score_file(scoring_params)
+    output_path = Path(scoring_params.output_path)
+    full_output = output_path.read_bytes()
+
+    # Simulate a run interrupted after its first chunk, with a partial second one
+    first_chunk_bytes = len(b"".join(full_output.splitlines(keepends=True)[:101]))
+    output_path.write_bytes(full_output[: first_chunk_bytes + 10])
+    Path(f"{output_path}.progress.json").write_text(
+        json.dumps(
+            {"chunks": 1, "rows": 100, "bytes": first_chunk_bytes, "chunk_size": 100}
+        )
+    )
+
+    stats = score_file(scoring_params.model_copy(update={"resume": True}))
+    assert stats["rows"] == 150
+    assert output_path.read_bytes() == full_output
+
+
+def test_score_file_refuses_to_resume_with_another_chunk_size(
+    scoring_params: ScoreFileParams,
+) -> None:
+    score_file(scoring_params.model_copy(update={"chunk_size": 50}))
+    with pytest.raises(ValueError):
+        score_file(scoring_params.model_copy(update={"resume": True}))
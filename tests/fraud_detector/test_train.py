@@ -0,0 +1,53 @@
+"""Tests for `fraud_detector/train.py`."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier  # type: ignore
+
+from src.fraud_detector.train import extend_forest
+
+
+def _window(seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 4))
+    return X, (X[:, 0] > 0).astype(int)
+
+
+def test_extend_forest_adds_trees_on_new_data_and_drops_oldest() -> None:
+    X, y = _window(0)
+    clf = RandomForestClassifier(n_estimators=4, random_state=0).fit(X, y)
+    old_trees = list(clf.estimators_)
+
+    X_new, y_new = _window(1)
+    extend_forest(clf, X_new, y_new, n_estimators=3, data_window="w1")
+    assert clf.estimators_[:4] == old_trees
+    assert clf.tree_windows_ == ["unknown"] * 4 + ["w1"] * 3
+
+    extend_forest(clf, *_window(2), n_estimators=2, data_window="w2", max_estimators=5)
+    assert clf.tree_windows_ == ["w1"] * 3 + ["w2"] * 2
+    assert len(clf.estimators_) == clf.n_estimators == 5
+    assert clf.predict_proba(X_new).shape == (len(X_new), 2)
+
+
+def test_extend_forest_needs_every_class() -> None:
+    X, y = _window(0)
+    clf = RandomForestClassifier(n_estimators=2, random_state=0).fit(X, y)
+    with pytest.raises(ValueError):
+        extend_forest(clf, X, np.zeros_like(y), n_estimators=2, data_window="w1")
+
+
+def test_extend_forest_never_reuses_tree_seeds() -> None:
+    X, y = _window(0)
+    clf = RandomForestClassifier(n_estimators=4, random_state=0).fit(X, y)
+    seeds = {tree.random_state for tree in clf.estimators_}
+    for window in range(1, 4):
+        extend_forest(
+            clf,
+            *_window(window),
+            n_estimators=2,
+            data_window=f"w{window}",
+            max_estimators=4,
+        )
+        seeds |= {tree.random_state for tree in clf.estimators_}
+    assert len(seeds) == 4 + 3 * 2
+    assert clf.random_state == 0
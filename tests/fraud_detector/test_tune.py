@@ -0,0 +1,122 @@
+"""Tests for `fraud_detector/tune.py`."""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from src.fraud_detector.tune import (
+    _init_worker,
+    best_trial,
+    budgets,
+    score_candidate,
+    shared_arrays,
+    stratified_order,
+    subsample_size,
+    successive_halving,
+    write_train_params,
+)
+
+
+def _dataset(seed: int, n_rows: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 4)).astype(np.float32)
+    return X, (X[:, 0] + 0.5 * rng.normal(size=n_rows) > 1.5).astype(np.int8)
+
+
+def test_budgets_end_with_all_rows() -> None:
+    assert budgets(1 / 9, 3) == pytest.approx([1 / 9, 1 / 3, 1.0])
+    assert budgets(0.1, 3) == pytest.approx([1 / 9, 1 / 3, 1.0])
+    assert budgets(0.2, 3) == pytest.approx([1 / 3, 1.0])
+    assert budgets(1.0, 3) == [1.0]
+    with pytest.raises(ValueError):
+        budgets(0.0, 3)
+
+
+def test_successive_halving_keeps_the_best_candidates() -> None:
+    candidates = [{"n_estimators": n} for n in range(9)]
+    calls: list[tuple[list[int], float]] = []
+
+    def evaluate(round_candidates: list[dict[str, Any]], budget: float) -> list[float]:
+        calls.append(([c["n_estimators"] for c in round_candidates], budget))
+        return [float(c["n_estimators"]) for c in round_candidates]
+
+    trials = successive_halving(candidates, evaluate, min_budget=1 / 9, eta=3)
+    assert [sorted(names) for names, _ in calls] == [list(range(9)), [6, 7, 8], [8]]
+    assert [budget for _, budget in calls] == pytest.approx([1 / 9, 1 / 3, 1.0])
+    assert len(trials) == 13
+    assert best_trial(trials)["params"] == {"n_estimators": 8}
+
+
+def test_successive_halving_sends_the_last_candidate_to_all_rows() -> None:
+    calls: list[float] = []
+
+    def evaluate(round_candidates: list[dict[str, Any]], budget: float) -> list[float]:
+        calls.append(budget)
+        return [0.0] * len(round_candidates)
+
+    trials = successive_halving([{}, {}], evaluate, min_budget=0.01, eta=2)
+    assert calls == [1 / 64, 1.0]
+    assert best_trial(trials)["round"] == len(budgets(0.01, 2)) - 1
+
+
+def test_subsamples_are_stratified_prefixes() -> None:
+    y = np.array([0] * 990 + [1] * 10, dtype=np.int8)
+    order = stratified_order(y, seed=0)
+    assert sorted(order) == list(range(len(y)))
+    y = y[order]
+    n_rows = subsample_size(y, 0.1)
+    assert (y[:n_rows] == 0).sum() == 99 and (y[:n_rows] == 1).sum() == 1
+    assert (y[: subsample_size(y, 0.01)] == 1).sum() == 1
+    assert subsample_size(y, 1.0) == len(y)
+
+
+def test_workers_score_shared_arrays_like_local_ones() -> None:
+    X_train, y_train = _dataset(0, 400)
+    X_valid, y_valid = _dataset(1, 200)
+    arrays = {
+        "X_train": X_train,
+        "y_train": y_train,
+        "X_valid": X_valid,
+        "y_valid": y_valid,
+    }
+    candidate = {"n_estimators": 5, "rfc_metric": "entropy", "min_samples_leaf": 2}
+
+    with (
+        shared_arrays(arrays) as specs,
+        ProcessPoolExecutor(
+            max_workers=1, initializer=_init_worker, initargs=(specs,)
+        ) as pool,
+    ):
+        shared_score = pool.submit(
+            score_candidate, candidate, 0.5, 0, "average_precision"
+        ).result()
+
+    local_score = score_candidate(candidate, 0.5, 0, "average_precision", arrays)
+    assert shared_score == local_score
+    assert 0.0 < local_score <= 1.0
+
+
+def test_write_train_params_keeps_layout(tmp_path: Path) -> None:
+    params_path = tmp_path / "params.yaml"
+    params_path.write_bytes(
+        b"prepare:\r\n"
+        b"  n_estimators: 1\r\n"
+        b"train:\r\n"
+        b"  rfc_metric: 'gini'  # Metric\r\n"
+        b"  n_estimators: 100  # Trees\r\n"
+        b"  n_jobs: 4\r\n"
+    )
+    write_train_params(str(params_path), {"rfc_metric": "entropy", "n_estimators": 50})
+    assert params_path.read_bytes() == (
+        b"prepare:\r\n"
+        b"  n_estimators: 1\r\n"
+        b"train:\r\n"
+        b"  rfc_metric: 'entropy'  # Metric\r\n"
+        b"  n_estimators: 50  # Trees\r\n"
+        b"  n_jobs: 4\r\n"
+    )
+    with pytest.raises(KeyError):
+        write_train_params(str(params_path), {"max_depth": 3})